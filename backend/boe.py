@@ -0,0 +1,553 @@
+"""
+backend/boe.py
+
+Acceso a la API de datos abiertos del BOE con cliente HTTP compartido y cache de sumarios.
+
+Cada consulta de /contracts/{fecha}/{expediente} necesitaba descargar el sumario completo de esa fecha
+(varios MB los dias con muchas secciones), recorrerlo entero y buscar el identificador con un recorrido
+lineal. Aqui:
+    - usamos un unico httpx.AsyncClient por proceso, que reutiliza las conexiones con boe.es;
+    - de cada sumario construimos un indice ``identificador -> (item, departamento)`` y es lo que guardamos;
+    - los indices se guardan en una LRU en memoria y, para fechas pasadas (un sumario publicado ya no
+      cambia), tambien en disco para siempre, asi que una consulta repetida no sale a la red.
+"""
+import asyncio
+import datetime
+import gzip
+import json
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import httpx
+
+#parser JSON incremental (opcional): sin el se descarga y decodifica el sumario entero
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+#errores de un JSON mal formado con uno u otro parser
+JSON_ERRORS = (ValueError,) + ((ijson.JSONError,) if ijson is not None else ())
+
+logger = logging.getLogger(__name__)
+
+BOE_SUMARIO_URL = "https://www.boe.es/datosabiertos/api/boe/sumario/{fecha}"
+#directorio de la cache en disco de sumarios, numero de sumarios en la LRU en memoria
+BOE_CACHE_DIR = Path(os.environ.get("BOE_CACHE_DIR", Path(__file__).resolve().parent.parent / "data" / "boe"))
+BOE_CACHE_SIZE = int(os.environ.get("BOE_CACHE_SIZE", "64"))
+#los sumarios del dia (que aun pueden no estar completos) solo se guardan en memoria y durante este tiempo
+BOE_TODAY_TTL = float(os.environ.get("BOE_TODAY_TTL", "600"))
+BOE_TIMEOUT = float(os.environ.get("BOE_TIMEOUT", "10"))
+#descargas simultaneas de sumarios en las consultas masivas y dias maximos de un rango
+BOE_MAX_CONCURRENCY = int(os.environ.get("BOE_MAX_CONCURRENCY", "4"))
+BOE_MAX_RANGE_DAYS = int(os.environ.get("BOE_MAX_RANGE_DAYS", "62"))
+#limites de una consulta masiva: pares (fecha, expediente), expedientes sin fecha y fechas distintas de los pares
+#(cada fecha distinta es un sumario que se descarga y se guarda en la cache)
+BOE_MAX_BULK_ITEMS = int(os.environ.get("BOE_MAX_BULK_ITEMS", "1000"))
+BOE_MAX_BULK_DATES = int(os.environ.get("BOE_MAX_BULK_DATES", str(BOE_MAX_RANGE_DAYS)))
+
+
+class BOEUnavailable(Exception):
+    """Error de red consultando el BOE."""
+
+
+class SumarioNotFound(Exception):
+    """No hay sumario (o no hay diario) publicado para esa fecha. El mensaje es el detalle que devuelve la API."""
+
+
+@dataclass
+class SumarioIndex:
+    """
+Indice de los anuncios de un sumario del BOE.
+
+Attributes:
+    fecha: Fecha del sumario (AAAAMMDD).
+    items: identificador -> (item tal cual viene del BOE, nombre del departamento).
+    loaded_at: Momento (monotonic) en que se construyo, para caducar los sumarios del dia.
+    """
+    fecha: str
+    items: Dict[str, Tuple[dict, Optional[str]]] = field(default_factory=dict)
+    loaded_at: float = 0.0
+
+    def get(self, identificador: str) -> Optional[Tuple[dict, Optional[str]]]:
+        return self.items.get(identificador)
+
+    def identificadores(self) -> list:
+        return list(self.items)
+
+
+#claves por las que se baja en el arbol del sumario (las mismas que seguia el recorrido recursivo original)
+TREE_KEYS = ("departamento", "seccion", "epigrafe")
+
+
+def iter_sumario_tree(raw: dict) -> Iterator[Tuple[dict, Optional[str]]]:
+    """
+Recorre de forma iterativa (sin recursion ni listas intermedias) un sumario ya decodificado.
+Es la alternativa a SumarioFlattener cuando ijson no esta instalado.
+
+Args:
+    raw: JSON completo devuelto por la API del BOE.
+
+Yields:
+    (item, departamento): cada anuncio con el nombre del departamento (o seccion/epigrafe) que lo contiene.
+
+Raises:
+    SumarioNotFound: Si el JSON no tiene diario.
+    """
+    data = raw.get('data') or raw.get('datos') or raw
+    diario = data.get('sumario', {}).get('diario', [])
+    if not diario:
+        raise SumarioNotFound("No hay datos de diario para esa fecha.")
+    #pila de (nodo, departamento del padre)
+    stack = [(diario[0], None)]
+    while stack:
+        node, parent_dept = stack.pop()
+        if isinstance(node, list):
+            stack.extend((elem, parent_dept) for elem in reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+        dept_name = node.get('nombre') or parent_dept
+        it = node.get('item')
+        if it:
+            for entry in (it if isinstance(it, list) else [it]):
+                yield entry, dept_name
+        stack.extend(reversed([(node[key], dept_name) for key in node if key in TREE_KEYS]))
+
+
+class _ValueBuilder:
+    """Reconstruye un valor JSON a partir de eventos de ijson.basic_parse."""
+
+    def __init__(self):
+        self.value = None
+        self._containers = []
+        self._keys = []
+
+    def _put(self, value):
+        if not self._containers:
+            self.value = value
+        elif isinstance(self._containers[-1], list):
+            self._containers[-1].append(value)
+        else:
+            self._containers[-1][self._keys[-1]] = value
+
+    def event(self, event: str, value) -> bool:
+        """Procesa un evento. Devuelve True cuando el valor esta completo."""
+        if event == "map_key":
+            self._keys[-1] = value
+            return False
+        if event in ("start_map", "start_array"):
+            container = {} if event == "start_map" else []
+            self._put(container)
+            self._containers.append(container)
+            self._keys.append(None)
+            return False
+        if event in ("end_map", "end_array"):
+            self._containers.pop()
+            self._keys.pop()
+            return not self._containers
+        self._put(value)
+        return not self._containers
+
+
+class _Frame:
+    """Contenedor abierto (objeto o lista) durante el recorrido por eventos."""
+    __slots__ = ("is_map", "relevant", "key", "nombre", "items", "owner", "via")
+
+    def __init__(self, is_map, relevant, owner, via):
+        self.is_map = is_map
+        #si estamos dentro del diario, bajando solo por TREE_KEYS
+        self.relevant = relevant
+        self.key = None
+        self.nombre = None
+        #anuncios que toman el departamento de este nodo o de sus ascendientes (propios o pendientes de hijos)
+        self.items = []
+        #objeto relevante mas cercano por encima, para heredar el departamento
+        self.owner = owner
+        #clave por la que se entro en el contenedor
+        self.via = via
+
+
+class SumarioFlattener:
+    """
+Aplana un sumario del BOE a partir de los eventos de un parser JSON incremental (ijson.basic_parse),
+sin construir nunca el arbol completo: solo se reconstruyen los objetos ``item``.
+
+El departamento de un anuncio es el ``nombre`` del nodo que lo contiene o, si no tiene, el del ascendiente
+mas cercano que lo tenga, y ese ``nombre`` puede venir antes o despues de ``item`` en el JSON. Por eso los
+anuncios de un nodo se emiten al cerrarse el nodo si este tiene ``nombre`` o si su ascendiente ya lo tiene;
+si no, se quedan pendientes en el ascendiente hasta que se cierre (y asi hacia arriba). El resultado es el
+mismo que el de iter_sumario_tree con cualquier orden de claves. Se usa de dos formas:
+    - push: ``feed(event, value)`` devuelve los pares listos, para ir alimentandolo con trozos de la respuesta;
+    - pull: ``iter_sumario_events(eventos)`` es un generador sobre cualquier iterable de eventos.
+
+Attributes:
+    found_diario: Si se ha encontrado el diario del sumario.
+    """
+
+    def __init__(self):
+        self._stack: List[_Frame] = []
+        self._builder = None
+        self._builder_frame = None
+        self.found_diario = False
+
+    def feed(self, event: str, value) -> List[Tuple[dict, Optional[str]]]:
+        """Procesa un evento del parser y devuelve los (item, departamento) que han quedado completos."""
+        if self._builder is not None:
+            if self._builder.event(event, value):
+                val = self._builder.value
+                self._builder_frame.items.extend(v for v in (val if isinstance(val, list) else [val])
+                                                 if isinstance(v, dict))
+                self._builder = self._builder_frame = None
+            return []
+        parent = self._stack[-1] if self._stack else None
+        if event == "map_key":
+            parent.key = value
+            return []
+        if event in ("start_map", "start_array"):
+            is_map = event == "start_map"
+            if parent is None:
+                via, relevant = None, False
+            elif parent.is_map:
+                via = parent.key
+                if parent.relevant and via == "item":
+                    #empieza el valor de "item": lo reconstruimos entero
+                    self._builder = _ValueBuilder()
+                    self._builder.event(event, value)
+                    self._builder_frame = parent
+                    return []
+                relevant = parent.relevant and via in TREE_KEYS
+            else:
+                via, relevant = parent.via, parent.relevant
+                if via == "diario" and is_map:
+                    #la raiz del recorrido es el primer diario, como en la version recursiva
+                    relevant = not self.found_diario
+                    self.found_diario = True
+            owner = parent if parent is not None and parent.is_map and parent.relevant else \
+                (parent.owner if parent is not None else None)
+            self._stack.append(_Frame(is_map, relevant, owner, via))
+            return []
+        if event in ("end_map", "end_array"):
+            frame = self._stack.pop()
+            if not frame.items:
+                return []
+            #el nombre de este nodo ya es definitivo; el de un ascendiente abierto sin nombre aun puede llegar
+            owner = frame.owner
+            if frame.nombre or owner is None or owner.nombre:
+                dept = frame.nombre or (owner.nombre if owner is not None else None)
+                return [(it, dept) for it in frame.items]
+            owner.items.extend(frame.items)
+            return []
+        #valor escalar dentro de un objeto del diario
+        if parent is not None and parent.is_map and parent.relevant and parent.key == "nombre" and value:
+            parent.nombre = value
+        return []
+
+
+def iter_sumario_events(events: Iterable[Tuple[str, object]]) -> Iterator[Tuple[dict, Optional[str]]]:
+    """
+Generador de (item, departamento) sobre los eventos de ijson.basic_parse de un sumario.
+Se puede dejar de consumir en cuanto aparece el anuncio buscado.
+
+Raises:
+    SumarioNotFound: Si al terminar no se ha encontrado el diario.
+    """
+    flattener = SumarioFlattener()
+    for event, value in events:
+        yield from flattener.feed(event, value)
+    if not flattener.found_diario:
+        raise SumarioNotFound("No hay datos de diario para esa fecha.")
+
+
+def build_index(fecha: str, raw: dict) -> SumarioIndex:
+    """
+Construye el indice de un sumario a partir del JSON ya decodificado devuelto por la API del BOE.
+
+Raises:
+    SumarioNotFound: Si el JSON no tiene diario.
+    """
+    index = SumarioIndex(fecha=fecha)
+    for it, dept in iter_sumario_tree(raw):
+        index.items[it['identificador']] = (it, dept)
+    return index
+
+
+def contract_details(anuncio: dict, organismo: Optional[str]) -> dict:
+    """Datos de un anuncio tal y como los devuelve /contracts/{fecha}/{expediente}."""
+    return {
+        "identificador": anuncio['identificador'],
+        "titulo": anuncio.get('titulo'),
+        "url_pdf": (anuncio.get('url_pdf') or {}).get('texto'),
+        "organismo": organismo
+    }
+
+
+def date_range(date_from: str, date_to: str) -> List[str]:
+    """
+Fechas (AAAAMMDD) entre date_from y date_to, ambas incluidas.
+
+Raises:
+    ValueError: Si alguna fecha no es valida, el rango esta invertido o supera BOE_MAX_RANGE_DAYS.
+    """
+    start = datetime.datetime.strptime(date_from, "%Y%m%d").date()
+    end = datetime.datetime.strptime(date_to, "%Y%m%d").date()
+    if end < start:
+        raise ValueError("date_to es anterior a date_from")
+    days = (end - start).days + 1
+    if days > BOE_MAX_RANGE_DAYS:
+        raise ValueError(f"El rango no puede superar {BOE_MAX_RANGE_DAYS} dias")
+    return [(start + datetime.timedelta(days=i)).strftime("%Y%m%d") for i in range(days)]
+
+
+def bulk_dates(fechas: Iterable[str]) -> List[str]:
+    """
+Fechas distintas de los pares de una consulta masiva, en el orden en que aparecen.
+
+Raises:
+    ValueError: Si hay mas de BOE_MAX_BULK_DATES fechas distintas.
+    """
+    distinct = list(dict.fromkeys(fechas))
+    if len(distinct) > BOE_MAX_BULK_DATES:
+        raise ValueError(f"Los items no pueden tener mas de {BOE_MAX_BULK_DATES} fechas distintas")
+    return distinct
+
+
+def is_past(fecha: str) -> bool:
+    """Indica si la fecha (AAAAMMDD) es anterior a hoy, y por tanto su sumario ya no va a cambiar."""
+    return fecha < datetime.date.today().strftime("%Y%m%d")
+
+
+# ——————————————————————————————————————————————————————————————————————
+# Cliente HTTP compartido
+# ——————————————————————————————————————————————————————————————————————
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Devuelve el cliente HTTP del proceso (con pool de conexiones), creandolo la primera vez."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=BOE_TIMEOUT,
+            headers={"Accept": "application/json"},
+            limits=httpx.Limits(max_connections=10, max_keepalive_connections=10),
+        )
+    return _client
+
+
+async def close_client():
+    """Cierra el cliente HTTP compartido (al apagar el backend)."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+# ——————————————————————————————————————————————————————————————————————
+# Cache de sumarios
+# ——————————————————————————————————————————————————————————————————————
+class SumarioCache:
+    """
+Cache de indices de sumarios: LRU en memoria y, para fechas pasadas, ficheros en disco.
+
+Args:
+    cache_dir: Directorio de la cache en disco (None para no usar disco).
+    maxsize: Numero maximo de sumarios en memoria.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = BOE_CACHE_DIR, maxsize: int = BOE_CACHE_SIZE):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.maxsize = maxsize
+        self._lru: "OrderedDict[str, SumarioIndex]" = OrderedDict()
+        #un lock por fecha para que varias peticiones simultaneas de la misma fecha descarguen el sumario una sola vez
+        self._locks: Dict[str, asyncio.Lock] = {}
+        #fechas pasadas sin sumario (domingos, festivos...): no vuelven a tenerlo, no hace falta volver a preguntar
+        self._missing: Dict[str, str] = {}
+
+    def _path(self, fecha: str) -> Optional[Path]:
+        return self.cache_dir / f"sumario_{fecha}.json.gz" if self.cache_dir else None
+
+    def _remember(self, index: SumarioIndex):
+        self._lru[index.fecha] = index
+        self._lru.move_to_end(index.fecha)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def _from_memory(self, fecha: str) -> Optional[SumarioIndex]:
+        index = self._lru.get(fecha)
+        if index is None:
+            return None
+        if not is_past(fecha) and asyncio.get_running_loop().time() - index.loaded_at > BOE_TODAY_TTL:
+            del self._lru[fecha]
+            return None
+        self._lru.move_to_end(fecha)
+        return index
+
+    def _load(self, fecha: str) -> Optional[SumarioIndex]:
+        path = self._path(fecha)
+        if path is None or not path.is_file():
+            return None
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                items = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache de sumario corrupta en {path}: {e}")
+            return None
+        return SumarioIndex(fecha=fecha, items={k: (v[0], v[1]) for k, v in items.items()})
+
+    def _save(self, index: SumarioIndex):
+        path = self._path(index.fecha)
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".part")
+        with gzip.open(tmp, "wt", encoding="utf-8") as f:
+            json.dump({k: list(v) for k, v in index.items.items()}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    async def get(self, fecha: str, watch: Optional[Tuple[str, asyncio.Future]] = None) -> SumarioIndex:
+        """
+    Devuelve el indice del sumario de una fecha, de memoria, de disco o descargandolo del BOE.
+    ``watch`` se pasa a _fetch (ver lookup).
+
+    Raises:
+        BOEUnavailable: Error de red consultando el BOE.
+        SumarioNotFound: Si no hay sumario publicado para esa fecha.
+        """
+        index = self._from_memory(fecha)
+        if index is not None:
+            return index
+        if fecha in self._missing:
+            raise SumarioNotFound(self._missing[fecha])
+        lock = self._locks.setdefault(fecha, asyncio.Lock())
+        try:
+            async with lock:
+                index = self._from_memory(fecha)
+                if index is None and fecha in self._missing:
+                    raise SumarioNotFound(self._missing[fecha])
+                if index is None and is_past(fecha):
+                    index = await asyncio.to_thread(self._load, fecha)
+                if index is None:
+                    try:
+                        index = await self._fetch(fecha, watch)
+                    except SumarioNotFound as e:
+                        if is_past(fecha):
+                            self._missing[fecha] = str(e)
+                        raise
+                    if is_past(fecha):
+                        await asyncio.to_thread(self._save, index)
+                index.loaded_at = asyncio.get_running_loop().time()
+                self._remember(index)
+        finally:
+            self._locks.pop(fecha, None)
+        return index
+
+    async def prefetch(self, fechas: Iterable[str],
+                       concurrency: int = BOE_MAX_CONCURRENCY) -> Dict[str, Union[SumarioIndex, Exception]]:
+        """
+    Carga a la vez los sumarios de varias fechas (como mucho ``concurrency`` descargas simultaneas,
+    todas con el cliente compartido) y los deja en la cache.
+
+    Returns:
+        fecha -> SumarioIndex, o la excepcion (BOEUnavailable / SumarioNotFound) si no se pudo cargar.
+        """
+        sem = asyncio.Semaphore(max(1, concurrency))
+
+        async def load(fecha):
+            async with sem:
+                try:
+                    return fecha, await self.get(fecha)
+                except (BOEUnavailable, SumarioNotFound) as e:
+                    return fecha, e
+
+        return dict(await asyncio.gather(*(load(f) for f in dict.fromkeys(fechas))))
+
+    async def _fetch(self, fecha: str, watch: Optional[Tuple[str, asyncio.Future]] = None) -> SumarioIndex:
+        """
+    Descarga el sumario de una fecha y construye su indice.
+
+    Con ijson el cuerpo se parsea por trozos a medida que llega (sin decodificar nunca el arbol completo) y,
+    si se indica ``watch=(identificador, future)``, el future se resuelve con (item, departamento) en cuanto
+    aparece ese anuncio, aunque la descarga siga para completar el indice.
+        """
+        url = BOE_SUMARIO_URL.format(fecha=fecha)
+        logger.debug(f"📡 Fetch BOE: {url}")
+        index = SumarioIndex(fecha=fecha)
+
+        def add(pairs):
+            for it, dept in pairs:
+                ident = it.get('identificador')
+                if ident is None:
+                    continue
+                index.items[ident] = (it, dept)
+                if watch is not None and ident == watch[0] and not watch[1].done():
+                    watch[1].set_result((it, dept))
+
+        try:
+            async with get_client().stream("GET", url) as resp:
+                if resp.status_code != 200:
+                    raise SumarioNotFound("No hay sumario para esa fecha en el BOE.")
+                if ijson is None:
+                    body = await resp.aread()
+                    #sin parser incremental: decodificamos entero, pero fuera del bucle de eventos
+                    raw = await asyncio.to_thread(json.loads, body)
+                    add(iter_sumario_tree(raw))
+                    return index
+                flattener = SumarioFlattener()
+                events = ijson.sendable_list()
+                parser = ijson.basic_parse_coro(events, use_float=True)
+                async for chunk in resp.aiter_bytes():
+                    parser.send(chunk)
+                    for event, value in events:
+                        add(flattener.feed(event, value))
+                    del events[:]
+                parser.close()
+                for event, value in events:
+                    add(flattener.feed(event, value))
+        except httpx.RequestError as e:
+            logger.error(f"Error de red fetching BOE: {e}")
+            raise BOEUnavailable(str(e)) from e
+        except JSON_ERRORS as e:
+            logger.error(f"Sumario del BOE mal formado ({fecha}): {e}")
+            raise BOEUnavailable(str(e)) from e
+        if not flattener.found_diario:
+            raise SumarioNotFound("No hay datos de diario para esa fecha.")
+        return index
+
+    async def lookup(self, fecha: str, identificador: str) -> Tuple[Optional[Tuple[dict, Optional[str]]], Optional[SumarioIndex]]:
+        """
+    Busca un anuncio respondiendo lo antes posible.
+
+    Si el sumario no esta en la cache se descarga y se parsea en streaming: en cuanto aparece el anuncio
+    se devuelve, y la descarga sigue en segundo plano para dejar el indice completo en la cache.
+
+    Returns:
+        ((item, departamento) o None si no esta, indice completo del sumario o None si aun se esta construyendo).
+
+    Raises:
+        BOEUnavailable: Error de red consultando el BOE.
+        SumarioNotFound: Si no hay sumario publicado para esa fecha.
+        """
+        index = self._from_memory(fecha)
+        if index is not None:
+            return index.get(identificador), index
+        found: asyncio.Future = asyncio.get_running_loop().create_future()
+        task = asyncio.create_task(self.get(fecha, watch=(identificador, found)))
+        await asyncio.wait({task, found}, return_when=asyncio.FIRST_COMPLETED)
+        if found.done():
+            task.add_done_callback(_log_background_error)
+            return found.result(), None
+        index = task.result()
+        return index.get(identificador), index
+
+
+def _log_background_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Error completando en segundo plano un sumario del BOE: {task.exception()}")
+
+
+#cache unica del proceso del backend
+sumario_cache = SumarioCache()
@@ -1,19 +1,43 @@
 import fitz     # PyMuPDF
-import os, re, logging
-from typing import List, Tuple, Optional
-from dataclasses import dataclass
+import os, re, io, json, asyncio, hashlib, logging, multiprocessing, zipfile
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Union
+from dataclasses import dataclass, asdict
 
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
+#procesos para extraer texto de PDFs fuera del event loop y paginas por trozo (los PDFs con mas paginas se reparten entre los procesos)
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_SHARD_PAGES = int(os.environ.get("PDF_SHARD_PAGES", "16"))
+#cache de avisos ya procesados por SHA-256 del PDF: en disco y, los ultimos NOTICE_CACHE_SIZE, en memoria
+NOTICE_CACHE_DIR = Path(os.environ.get("NOTICE_CACHE_DIR", Path(__file__).resolve().parent.parent / "data" / "notices"))
+NOTICE_CACHE_SIZE = int(os.environ.get("NOTICE_CACHE_SIZE", "256"))
+#version del extractor de avisos: subirla cuando cambie como se sacan los terminos sin que cambien los patrones
+#ni los ajustes NOTICE_* (ver notice_extractor_version), para que la cache no devuelva resultados viejos
+NOTICE_EXTRACTOR_VERSION = 1
+#extraccion incremental de avisos: paginas que se leen de cada vez, paginas que se miran antes de rendirse y
+#si entonces se extrae el resto del documento (en paralelo) para buscar los campos que falten
+NOTICE_PAGE_WINDOW = int(os.environ.get("NOTICE_PAGE_WINDOW", "1"))
+NOTICE_MAX_PAGES = int(os.environ.get("NOTICE_MAX_PAGES", "5"))
+NOTICE_FULL_FALLBACK = os.environ.get("NOTICE_FULL_FALLBACK", "1") == "1"
+
 #sufijos que quitamos de los nombres de empresa para normalizar el termino lo maximo posible
 SUFFIXES_TO_STRIP = [
     "S.L.U", "S.L.N.E", "S.L.P", "S.L.L", "S.A.U", "S.A.D", "S.L", "S.A",
     "U.T.E", "UTE", "INC", "LTD", "LLC", "GMBH"
 ]
+#todos los sufijos en una sola alternancia compilada al importar (los mas largos primero para que "S.L.U" gane a "S.L")
+SUFFIX_RE = re.compile(
+    r"(,\s*)?(?:" + "|".join(re.escape(suf) for suf in sorted(SUFFIXES_TO_STRIP, key=len, reverse=True)) + r")\.?$",
+    re.IGNORECASE,
+)
 
 def normalize_search_term(term: str) -> str:
     """
 Elimina sufijos legales de una razón social para obtener su nombre base que es lo que realmente nos interesa.
+Si hay varios seguidos (por ejemplo "ACME LTD, INC") se quitan todos.
 
 Args:
     term: Cadena con el nombre completo, incluyendo posibles sufijos.
@@ -21,26 +45,122 @@ Args:
 Returns:
     Nombre simplificado sin sufijos como S.L., S.A., UTE, etc.
     """
-    for suf in SUFFIXES_TO_STRIP:
-        term = re.sub(rf"(,\s*)?{re.escape(suf)}\.?$", "", term, flags=re.IGNORECASE)
-    return term.strip()
+    while True:
+        stripped = SUFFIX_RE.sub("", term, count=1)
+        if stripped == term:
+            return term.strip()
+        term = stripped
+
+#un PDF se puede pasar como ruta o directamente con sus bytes (se abre con fitz.open(stream=...) sin pasar por disco)
+PdfSource = Union[str, bytes, bytearray]
+
+def open_pdf(pdf: PdfSource) -> fitz.Document:
+    if isinstance(pdf, (bytes, bytearray)):
+        return fitz.open(stream=pdf, filetype="pdf")
+    return fitz.open(pdf)
 
-def extract_text_from_pdf(pdf_path: str) -> str:
+def pdf_missing(pdf: PdfSource) -> bool:
+    """True (y lo registra) si el PDF es una ruta que no existe."""
+    if isinstance(pdf, (bytes, bytearray)) or os.path.exists(pdf):
+        return False
+    logging.error(f"Archivo no encontrado: {pdf}")
+    return True
+
+def clean_pdf_text(text: str) -> str:
+    """Unifica los guiones largos y quita espacios de los extremos del texto extraido."""
+    return text.replace('–', '-').replace('—', '-').strip()
+
+def extract_pages(pdf_path: PdfSource, start: int, stop: int) -> str:
     """
-Extrae todo el texto de un PDF manteniendo saltos de línea por página.
+Extrae el texto de las paginas [start, stop) de un PDF. Es lo que ejecuta cada proceso del pool.
 
 Args:
     pdf_path: Ruta al archivo PDF.
+    start: Primera pagina (desde 0).
+    stop: Pagina siguiente a la ultima.
+
+Returns:
+    Texto de esas paginas separado por saltos de linea, sin limpiar.
+    """
+    with open_pdf(pdf_path) as doc:
+        return "\n".join(doc[i].get_text("text") for i in range(start, min(stop, doc.page_count)))
+
+def page_count(pdf_path: PdfSource) -> int:
+    with open_pdf(pdf_path) as doc:
+        return doc.page_count
+
+def page_shards(n_pages: int, shard_pages: int = PDF_SHARD_PAGES, start: int = 0) -> List[Tuple[int, int]]:
+    """Divide las paginas [start, n_pages) en rangos consecutivos [a, b) de como mucho shard_pages paginas."""
+    shard_pages = max(1, shard_pages)
+    return [(i, min(i + shard_pages, n_pages)) for i in range(start, n_pages, shard_pages)]
+
+def extract_page_range(pdf_path: PdfSource, start: int, stop: int, executor: Optional[Executor] = None) -> str:
+    """Texto sin limpiar de las paginas [start, stop), por trozos en el executor si se indica."""
+    shards = page_shards(stop, start=start)
+    if executor is None or len(shards) < 2:
+        return extract_pages(pdf_path, start, stop)
+    return "\n".join(executor.map(extract_pages, *zip(*[(pdf_path, a, b) for a, b in shards])))
+
+async def extract_page_range_async(pdf_path: PdfSource, start: int, stop: int, executor: Optional[Executor]) -> str:
+    """Como extract_page_range pero esperando a los trozos sin bloquear el event loop."""
+    loop = asyncio.get_running_loop()
+    parts = await asyncio.gather(*[
+        loop.run_in_executor(executor, extract_pages, pdf_path, a, b) for a, b in page_shards(stop, start=start)
+    ])
+    return "\n".join(parts)
+
+def extract_text_from_pdf(pdf_path: PdfSource, executor: Optional[Executor] = None) -> str:
+    """
+Extrae todo el texto de un PDF manteniendo saltos de línea por página.
+
+Args:
+    pdf_path: Ruta al archivo PDF (o sus bytes).
+    executor: Pool opcional en el que extraer en paralelo los trozos de paginas de los PDFs grandes.
 
 Returns:
     Texto completo concatenado de todas las paginas, o tambien una cadena vacia en caso de que falle.
     """
-    if not os.path.exists(pdf_path):
-        logging.error(f"Archivo no encontrado: {pdf_path}")
+    if pdf_missing(pdf_path):
         return ""
-    doc = fitz.open(pdf_path)
-    text = "\n".join(page.get_text("text") for page in doc)
-    return text.replace('–', '-').replace('—', '-').strip()
+    return clean_pdf_text(extract_page_range(pdf_path, 0, page_count(pdf_path), executor))
+
+async def extract_text_from_pdf_async(pdf_path: PdfSource, executor: Optional[Executor] = None) -> str:
+    """
+Igual que extract_text_from_pdf pero sin bloquear el event loop: los trozos de paginas se extraen
+a la vez en el executor (por defecto el de pdf_executor) y se unen en orden.
+    """
+    loop = asyncio.get_running_loop()
+    executor = pdf_executor(pdf_path, executor)
+    if pdf_missing(pdf_path):
+        return ""
+    n_pages = await loop.run_in_executor(executor, page_count, pdf_path)
+    return clean_pdf_text(await extract_page_range_async(pdf_path, 0, n_pages, executor))
+
+#pool de procesos del backend para la extraccion de PDFs (se crea la primera vez que se usa)
+_pdf_pool: Optional[ProcessPoolExecutor] = None
+
+def get_pdf_pool() -> ProcessPoolExecutor:
+    global _pdf_pool
+    if _pdf_pool is None:
+        #spawn como en los workers de la cola: los procesos no heredan el estado del backend
+        _pdf_pool = ProcessPoolExecutor(max_workers=max(1, PDF_WORKERS),
+                                        mp_context=multiprocessing.get_context("spawn"))
+    return _pdf_pool
+
+def pdf_executor(pdf: PdfSource, executor: Optional[Executor] = None) -> Optional[Executor]:
+    """
+Executor en el que extraer un PDF si no se indica otro: las rutas van al pool de procesos y los PDFs en memoria
+a los hilos del event loop (None), para no copiar los bytes a otro proceso.
+    """
+    if executor is not None:
+        return executor
+    return None if isinstance(pdf, (bytes, bytearray)) else get_pdf_pool()
+
+def shutdown_pdf_pool():
+    global _pdf_pool
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown(wait=False, cancel_futures=True)
+        _pdf_pool = None
 
 @dataclass
 class SimpleNotice:
@@ -51,58 +171,111 @@ Attributes:
     adjudicatario_nombre: Nombre del adjudicatario de la adjudicacion.
     entidad_adjudicadora: Nombre del organismo o entidad adjudicadora.
     objeto_contrato: Texto que describe el objeto del contrato adjudicado.
+    importe: Importe total de la adjudicacion tal y como aparece (por ejemplo "121.000,00").
+    nif: NIF/CIF que aparece en el aviso (normalmente el del adjudicatario).
+    fecha_adjudicacion: Fecha de adjudicacion tal y como aparece en el aviso.
     """
     adjudicatario_nombre: Optional[str]
     entidad_adjudicadora: Optional[str]
     objeto_contrato:    Optional[str]
+    importe:            Optional[str] = None
+    nif:                Optional[str] = None
+    fecha_adjudicacion: Optional[str] = None
+
+#campos que buscamos en el texto de un aviso: nombre -> patron con un grupo con ese mismo nombre para el valor.
+#Para buscar un campo mas basta con aniadirlo aqui (o pasar otros patrones a NoticeFieldScanner).
+NOTICE_FIELD_PATTERNS = {
+    #1)Adjudicatario: en este caso sabemos que va desde “Adjudicatario:” hasta fin de línea o “Importes de Adjudicación”
+    "adjudicatario_nombre": r"Adjudicatario\s*[:\n]\s*(?P<adjudicatario_nombre>[^\n]+?)(?=\n|Importes de Adjudicación|$)",
+    #2)Entidad adjudicadora: iria desde “Entidad Adjudicadora:” hasta fin de línea o “Objeto del Contrato”
+    "entidad_adjudicadora": r"Entidad Adjudicadora\s*[:\n]\s*(?P<entidad_adjudicadora>[^\n]+?)(?=\n|Objeto del Contrato|$)",
+    #3)Objeto del contrato: iria desde “Objeto del Contrato:” hasta fin de línea o puede darse el caso de que lo siguiente sea: “Descripción” o “Valor estimado”.
+    "objeto_contrato": r"Objeto del Contrato\s*[:\n]\s*(?P<objeto_contrato>[^\n]+?)(?=\n|Descripción|Valor estimado|$)",
+    #4)Importe total (con o sin IVA entre parentesis), solo la cifra
+    "importe": r"Importe total\s*(?:\([^)\n]*\)\s*)?[:\n]\s*(?P<importe>\d[\d.]*(?:,\d+)?)",
+    #5)NIF/CIF de una persona juridica (letra + 7 digitos + control) o fisica (8 digitos + letra)
+    "nif": r"\b[NC]IF\s*[:\n]?\s*(?P<nif>[A-HJNP-SUVW]-?\d{7}[0-9A-J]|\d{8}-?[A-Z])\b",
+    #6)Fecha de adjudicacion: dd/mm/aaaa o "12 de marzo de 2024"
+    "fecha_adjudicacion": r"Fecha de adjudicaci[oó]n\s*[:\n]\s*(?P<fecha_adjudicacion>\d{1,2}(?:/\d{1,2}/\d{4}| de [a-záéíóú]+ de \d{4}))",
+}
+
+class NoticeFieldScanner:
+    """
+Buscador de los campos de un aviso con todos los patrones compilados una sola vez.
+
+Cada campo se queda con su primera aparicion en el texto y, una vez encontrado, ya no se vuelve a buscar.
+Se puede usar sobre el texto completo (``scan``) o ir alimentandolo con el texto acumulado pagina a pagina
+(``feed``): entonces cada campo que falta solo se busca en el texto nuevo (mas un margen de ``overlap``
+caracteres por si la etiqueta quedo al final de la pagina anterior), asi que el documento se recorre una
+sola vez en lugar de volver a buscar en todo el texto tras cada pagina.
+
+Nota: no se usa una unica alternancia con todos los patrones porque el motor ``re`` de CPython pierde con
+ella la busqueda rapida por prefijo literal y resulta mas lento que un patron compilado por campo
+(ver benchmarks/notice_regex.py).
+
+Args:
+    patterns: nombre del campo -> patron, como cadena o ya compilado (por defecto NOTICE_FIELD_PATTERNS).
+    overlap: Caracteres del texto anterior que se vuelven a mirar en cada ``feed``.
+
+Attributes:
+    found: Campos encontrados hasta ahora (nombre -> valor sin espacios en los extremos).
+    """
+
+    def __init__(self, patterns: Optional[Dict[str, Union[str, "re.Pattern"]]] = None, overlap: int = 512):
+        self.regexes = _DEFAULT_FIELD_REGEXES if patterns is None else _compile_fields(patterns)
+        self.overlap = overlap
+        self.found: Dict[str, str] = {}
+        #posicion desde la que se busca cada campo que aun falta
+        self._pos = {name: 0 for name in self.regexes}
+
+    def has(self, names: Iterable[str]) -> bool:
+        return all(name in self.found for name in names)
+
+    def feed(self, text: str, final: bool = False) -> Dict[str, str]:
+        """
+    Busca los campos que faltan en el texto acumulado (que debe empezar por el texto de las llamadas anteriores).
+    Si no es ``final``, una coincidencia que llega justo al final del texto aun puede crecer con la pagina
+    siguiente: no se da por buena y se vuelve a mirar desde su inicio en la proxima llamada.
+        """
+        end = len(text)
+        for name, rx in self.regexes.items():
+            if name in self.found:
+                continue
+            m = rx.search(text, self._pos[name])
+            if m is None:
+                self._pos[name] = max(0, end - self.overlap)
+            elif final or m.end() < end:
+                self.found[name] = m.group(name).strip()
+            else:
+                self._pos[name] = m.start()
+        return self.found
+
+    def scan(self, text: str) -> Dict[str, str]:
+        return self.feed(text, final=True)
+
+def _compile_fields(patterns: Dict[str, Union[str, "re.Pattern"]]) -> Dict[str, "re.Pattern"]:
+    return {name: p if isinstance(p, re.Pattern) else re.compile(p, re.IGNORECASE) for name, p in patterns.items()}
+
+_DEFAULT_FIELD_REGEXES = _compile_fields(NOTICE_FIELD_PATTERNS)
 
 def extract_raw_data(text: str) -> dict:
-    
     """
 Busca patrones claves en el texto extraido para obtener metadato, es la manera en que conseguimos extraer cada uno de los terminos relevantes.
 
-Patrones:
+Patrones (ver NOTICE_FIELD_PATTERNS):
     - Adjudicatario: linea que suele seguir al texto "Adjudicatario".
     - Entidad adjudicadora: línea tras "Entidad Adjudicadora".
     - Objeto del Contrato: linea tras "Objeto del Contrato".
+    - Importe total, NIF/CIF y fecha de adjudicacion.
 
 Args:
     text: Texto completo del PDF.
 
 Returns:
-    Diccionario con claves parciales: "adjudicatario_nombre", "entidad_adjudicadora", "objeto_contrato".
+    Diccionario con claves parciales: "adjudicatario_nombre", "entidad_adjudicadora", "objeto_contrato",
+    "importe", "nif", "fecha_adjudicacion".
     """
-    
-    r = {}
-
-    #1)Adjudicatario: en este caso sabemos que va desde “Adjudicatario:” hasta fin de línea o “Importes de Adjudicación”
-    m = re.search(
-        r"Adjudicatario\s*[:\n]\s*([^\n]+?)(?=\n|Importes de Adjudicación|$)",
-        text,
-        re.IGNORECASE
-    )
-    if m:
-        r["adjudicatario_nombre"] = m.group(1).strip()
-
-    #2)Entidad adjudicadora: iria desde “Entidad Adjudicadora:” hasta fin de línea o “Objeto del Contrato”
-    m = re.search(
-        r"Entidad Adjudicadora\s*[:\n]\s*([^\n]+?)(?=\n|Objeto del Contrato|$)",
-        text,
-        re.IGNORECASE
-    )
-    if m:
-        r["entidad_adjudicadora"] = m.group(1).strip()
-
-    #3)Objeto del contrato: iria desde “Objeto del Contrato:” hasta fin de línea o puede darse el caso de que lo siguiente sea: “Descripción” o “Valor estimado”.
-    m = re.search(
-        r"Objeto del Contrato\s*[:\n]\s*([^\n]+?)(?=\n|Descripción|Valor estimado|$)",
-        text,
-        re.IGNORECASE
-    )
-    if m:
-        r["objeto_contrato"] = m.group(1).strip()
-
-    return r
+    return dict(NoticeFieldScanner().scan(text))
 
 def build_simple_notice(raw: dict) -> SimpleNotice:
     """
@@ -119,26 +292,83 @@ Returns:
         adjudicatario_nombre = clean(raw.get("adjudicatario_nombre")),
         entidad_adjudicadora= clean(raw.get("entidad_adjudicadora")),
         objeto_contrato     = clean(raw.get("objeto_contrato")),
+        importe             = clean(raw.get("importe")),
+        nif                 = clean(raw.get("nif")),
+        fecha_adjudicacion  = clean(raw.get("fecha_adjudicacion")),
     )
 
-def process_award_notice(pdf_path: str) -> Tuple[List[str], SimpleNotice]:
+#campos de SimpleNotice de los que salen los terminos; cuando estan todos dejamos de leer paginas
+#(el resto de campos se quedan con lo que haya en las paginas leidas)
+NOTICE_FIELDS = ("adjudicatario_nombre", "entidad_adjudicadora", "objeto_contrato")
+
+def extract_notice_pages(pdf_path: PdfSource, max_pages: int = NOTICE_MAX_PAGES,
+                         window: int = NOTICE_PAGE_WINDOW) -> Tuple[str, int, bool]:
     """
-Flujo completo para extraer términos de búsqueda y metadatos de un PDF usando las funciones anteriores que acabamos de explicar.
-Los pasos que sigue son:
-1. extrae texto del PDF.
-2. Extrae datos crudos (en este caso: adjudicatario, entidad, objeto).
-3. construye SimpleNotice.
-4. Normalizamos sufijos y obtenemos la lista de términos únicos.
+Lee las primeras paginas de un aviso de ventana en ventana y para en cuanto NoticeFieldScanner encuentra
+los tres campos, que casi siempre estan en la primera o segunda pagina. Cada ventana solo se busca una vez.
 
 Args:
-    pdf_path: ruta al PDF de la adjudicacion.
+    pdf_path: Ruta al archivo PDF (o sus bytes).
+    max_pages: Paginas maximas que se leen.
+    window: Paginas que se leen antes de volver a buscar los campos.
 
 Returns:
-    Una tupla con:
-        - Lista de términos normalizados (sin sufijos ni duplicados).
-        - Instancia de SimpleNotice con metadatos.
+    (texto sin limpiar de las paginas leidas, numero total de paginas del PDF, si estan todos los campos)
+    """
+    window = max(1, window)
+    with open_pdf(pdf_path) as doc:
+        n_pages = doc.page_count
+        pages = []
+        scanner = NoticeFieldScanner()
+        for start in range(0, min(max_pages, n_pages), window):
+            stop = min(start + window, max_pages, n_pages)
+            #los guiones se cambian igual que en clean_pdf_text (misma longitud), el strip se deja para el final
+            pages.extend(doc[i].get_text("text").replace('–', '-').replace('—', '-') for i in range(start, stop))
+            text = "\n".join(pages)
+            scanner.feed(text, final=stop >= n_pages)
+            if scanner.has(NOTICE_FIELDS):
+                return text, n_pages, True
+    return "\n".join(pages), n_pages, False
+
+def extract_notice_text(pdf_path: PdfSource, max_pages: int = NOTICE_MAX_PAGES, window: int = NOTICE_PAGE_WINDOW,
+                        full_fallback: bool = NOTICE_FULL_FALLBACK, executor: Optional[Executor] = None) -> str:
+    """
+Extrae solo el texto necesario para los metadatos de un aviso (ver extract_notice_pages).
+Si en las primeras max_pages paginas falta algun campo y full_fallback esta activo, se extrae el resto del
+documento (por trozos en el executor si se indica), asi que el resultado es el mismo que con el texto completo.
+
+Returns:
+    Texto limpio de las paginas leidas, o una cadena vacia si el archivo no existe.
+    """
+    if pdf_missing(pdf_path):
+        return ""
+    text, n_pages, complete = extract_notice_pages(pdf_path, max_pages, window)
+    if complete or not full_fallback or n_pages <= max_pages:
+        return clean_pdf_text(text)
+    return clean_pdf_text(text + "\n" + extract_page_range(pdf_path, max_pages, n_pages, executor))
+
+async def extract_notice_text_async(pdf_path: PdfSource, executor: Optional[Executor] = None, max_pages: int = NOTICE_MAX_PAGES,
+                                    window: int = NOTICE_PAGE_WINDOW, full_fallback: bool = NOTICE_FULL_FALLBACK) -> str:
+    """Version de extract_notice_text para el backend: todo se extrae en el executor (por defecto el de pdf_executor)."""
+    loop = asyncio.get_running_loop()
+    executor = pdf_executor(pdf_path, executor)
+    if pdf_missing(pdf_path):
+        return ""
+    text, n_pages, complete = await loop.run_in_executor(executor, extract_notice_pages, pdf_path, max_pages, window)
+    if complete or not full_fallback or n_pages <= max_pages:
+        return clean_pdf_text(text)
+    return clean_pdf_text(text + "\n" + await extract_page_range_async(pdf_path, max_pages, n_pages, executor))
+
+def notice_from_text(text: str) -> Tuple[List[str], SimpleNotice]:
+    """
+Extrae los datos crudos del texto de un aviso, construye SimpleNotice y obtiene la lista de términos únicos.
+
+Args:
+    text: Texto completo del PDF.
+
+Returns:
+    (términos normalizados sin sufijos ni duplicados, SimpleNotice con metadatos)
     """
-    text = extract_text_from_pdf(pdf_path)
     raw  = extract_raw_data(text)
     notice = build_simple_notice(raw)
     terms = []
@@ -150,3 +380,178 @@ Returns:
         terms.append(normalize_search_term(notice.objeto_contrato))
     terms = [t for i,t in enumerate(terms) if t and t not in terms[:i]]
     return terms, notice
+
+def process_award_notice(pdf_path: PdfSource) -> Tuple[List[str], SimpleNotice]:
+    """
+Flujo completo para extraer términos de búsqueda y metadatos de un PDF usando las funciones anteriores que acabamos de explicar.
+Los pasos que sigue son:
+1. extrae texto del PDF (solo las paginas necesarias, ver extract_notice_text).
+2. Extrae datos crudos (en este caso: adjudicatario, entidad, objeto).
+3. construye SimpleNotice.
+4. Normalizamos sufijos y obtenemos la lista de términos únicos.
+
+Args:
+    pdf_path: ruta al PDF de la adjudicacion (o sus bytes).
+
+Returns:
+    Una tupla con:
+        - Lista de términos normalizados (sin sufijos ni duplicados).
+        - Instancia de SimpleNotice con metadatos.
+    """
+    return notice_from_text(extract_notice_text(pdf_path))
+
+async def process_award_notice_async(pdf_path: PdfSource, executor: Optional[Executor] = None) -> Tuple[List[str], SimpleNotice]:
+    """Version de process_award_notice para el backend: la extraccion se hace fuera del event loop (ver pdf_executor)."""
+    return notice_from_text(await extract_notice_text_async(pdf_path, executor))
+
+
+def iter_zip_pdfs(data: Union[bytes, bytearray, str, os.PathLike], max_files: int,
+                  max_bytes: int) -> Iterator[Tuple[str, bytes]]:
+    """
+Recorre los PDFs de un ZIP (en cualquier carpeta), ignorando el resto de ficheros.
+
+Args:
+    data: Ruta del ZIP (se lee del disco segun se necesita) o sus bytes.
+    max_files: PDFs maximos que se aceptan.
+    max_bytes: Tamaño maximo descomprimido de cada PDF.
+
+Yields:
+    (nombre dentro del ZIP, bytes del PDF)
+
+Raises:
+    ValueError: Si no es un ZIP valido, tiene demasiados PDFs o alguno es demasiado grande.
+    """
+    try:
+        zf = zipfile.ZipFile(io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data)
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"ZIP no valido: {e}")
+    with zf:
+        #fuera las carpetas y los ficheros de metadatos que mete macOS (__MACOSX/, ._nombre.pdf)
+        members = [info for info in zf.infolist()
+                   if not info.is_dir() and info.filename.lower().endswith(".pdf")
+                   and "__MACOSX" not in info.filename.split("/")
+                   and not os.path.basename(info.filename).startswith("._")]
+        if len(members) > max_files:
+            raise ValueError(f"El ZIP tiene {len(members)} PDFs (maximo {max_files})")
+        for info in members:
+            #no nos fiamos de file_size: leemos como mucho max_bytes + 1 para cortar los ZIP que se inflan
+            with zf.open(info) as f:
+                pdf = f.read(max_bytes + 1)
+            if len(pdf) > max_bytes:
+                raise ValueError(f"{info.filename} supera el tamaño maximo de {max_bytes} bytes")
+            yield info.filename, pdf
+
+def merge_notice_terms(notices: Iterable[Tuple[str, List[str]]]) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+Une los terminos de varios avisos para lanzar un solo crawl. Dos terminos son el mismo si coinciden tras
+normalize_search_term sin distinguir mayusculas ni espacios; se queda la primera forma que aparece.
+
+Args:
+    notices: Pares (id del aviso, terminos del aviso).
+
+Returns:
+    (terminos unicos de todos los avisos, id del aviso -> sus terminos con la forma elegida)
+    """
+    canonical: Dict[str, str] = {}
+    per_notice: Dict[str, List[str]] = {}
+    for notice_id, terms in notices:
+        own = per_notice.setdefault(notice_id, [])
+        for term in terms:
+            term = normalize_search_term(term)
+            key = ' '.join(term.casefold().split())
+            if not key:
+                continue
+            term = canonical.setdefault(key, term)
+            if term not in own:
+                own.append(term)
+    return list(canonical.values()), per_notice
+
+
+def notice_extractor_version() -> str:
+    """
+Huella de todo lo que decide los terminos de un aviso: NOTICE_EXTRACTOR_VERSION, los patrones de
+NOTICE_FIELD_PATTERNS, los campos de los que salen los terminos, los sufijos que se quitan y los ajustes
+NOTICE_* de la extraccion por paginas.
+    """
+    config = {
+        "version": NOTICE_EXTRACTOR_VERSION,
+        "patterns": NOTICE_FIELD_PATTERNS,
+        "fields": NOTICE_FIELDS,
+        "suffixes": SUFFIXES_TO_STRIP,
+        "page_window": NOTICE_PAGE_WINDOW,
+        "max_pages": NOTICE_MAX_PAGES,
+        "full_fallback": NOTICE_FULL_FALLBACK,
+    }
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class NoticeCache:
+    """
+Cache de avisos ya procesados indexada por el SHA-256 del PDF, para que volver a subir el mismo
+aviso devuelva sus terminos y su SimpleNotice sin volver a extraer el texto.
+
+Guarda cada resultado como JSON en ``cache_dir`` y los ultimos ``size`` tambien en memoria. Cada entrada
+lleva la version del extractor con la que se creo: si los patrones, los ajustes NOTICE_* o
+NOTICE_EXTRACTOR_VERSION han cambiado desde entonces, la entrada se ignora y el aviso se vuelve a extraer.
+
+Args:
+    cache_dir: Directorio de la cache en disco (None para usar solo memoria).
+    size: Numero de avisos en la LRU en memoria.
+    version: Version del extractor (por defecto notice_extractor_version()).
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = NOTICE_CACHE_DIR, size: int = NOTICE_CACHE_SIZE,
+                 version: Optional[str] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.size = size
+        self.version = version or notice_extractor_version()
+        self._memory: "OrderedDict[str, Tuple[List[str], SimpleNotice]]" = OrderedDict()
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest: str) -> Optional[Path]:
+        return self.cache_dir / f"{digest}.json" if self.cache_dir else None
+
+    def _remember(self, digest: str, value: Tuple[List[str], SimpleNotice]):
+        self._memory[digest] = value
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+
+    def get(self, digest: str) -> Optional[Tuple[List[str], SimpleNotice]]:
+        value = self._memory.get(digest)
+        if value is not None:
+            self._memory.move_to_end(digest)
+            return value
+        path = self._path(digest)
+        if path is None or not path.exists():
+            return None
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            #entradas de otra version del extractor (o anteriores a que se guardara): se vuelven a extraer
+            if data.get("version") != self.version:
+                return None
+            value = (data["terms"], SimpleNotice(**data["notice"]))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logging.warning(f"Cache de avisos corrupta para {digest}: {e}")
+            return None
+        self._remember(digest, value)
+        return value
+
+    def put(self, digest: str, terms: List[str], notice: SimpleNotice):
+        self._remember(digest, (terms, notice))
+        path = self._path(digest)
+        if path is None:
+            return
+        try:
+            #escribimos a un temporal y renombramos para no dejar nunca un JSON a medias
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"version": self.version, "terms": terms, "notice": asdict(notice)},
+                                      ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            logging.warning(f"No se pudo guardar el aviso {digest} en cache: {e}")
+
+
+#cache unica del proceso del backend
+notice_cache = NoticeCache()
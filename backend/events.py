@@ -0,0 +1,152 @@
+"""
+backend/events.py
+
+Broker de eventos de los jobs para el endpoint ``/jobs/{job_id}/events`` (Server-Sent Events).
+
+Escucha en la direccion de ``corruption_detector.events`` los eventos que publican los workers
+(cambios de estado, progreso del crawl, lotes de resultados) y los reparte entre los clientes
+suscritos a cada job. Guarda los ultimos eventos de cada job para que un cliente que se conecta tarde,
+o que se reconecta con ``Last-Event-ID``, reciba lo que se ha perdido.
+
+Solo un proceso puede escuchar en el canal: con ``uvicorn --workers N`` el primero que arranca se queda el
+socket y los demas no lo tocan (avisan en el log y sus clientes SSE solo reciben los eventos que publica ese
+mismo proceso). Para el stream de eventos completo hay que servir el backend con un unico worker.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import threading
+from collections import OrderedDict, deque
+from multiprocessing.connection import Listener
+from typing import Dict, List, Optional, Set, Tuple
+
+from corruption_detector import ipc
+from corruption_detector.events import get_address, get_authkey
+
+logger = logging.getLogger(__name__)
+
+#estados en los que un job ya no va a generar mas eventos
+TERMINAL_STATUSES = {"finished", "failed", "cancelled"}
+#eventos que guardamos por job y numero de jobs cuyo historial conservamos
+HISTORY_SIZE = int(os.environ.get("JOB_EVENTS_HISTORY", "500"))
+HISTORY_JOBS = 200
+
+#un evento es (id, tipo, datos)
+Event = Tuple[int, str, dict]
+
+
+class EventBroker:
+    """
+Recibe eventos de los workers por el canal local y los reparte entre los suscriptores de cada job.
+
+Args:
+    address: Direccion en la que escuchar (por defecto la de corruption_detector.events).
+    """
+
+    def __init__(self, address: Optional[str] = None):
+        self.address = address
+        self._ids = itertools.count(1)
+        self._history: "OrderedDict[str, deque]" = OrderedDict()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Empieza a aceptar conexiones de los workers en un hilo aparte."""
+        self._loop = loop
+        try:
+            self.address = self.address or get_address()
+            authkey = get_authkey()
+            #solo borramos el socket si esta huerfano: si responde el broker de otro proceso, ese se queda el canal
+            ipc.claim_address(self.address, authkey)
+            self._listener = Listener(self.address, authkey=authkey)
+        except ipc.AddressInUseError:
+            logger.warning(f"Otro proceso del backend ya recibe los eventos de los jobs en {self.address}: "
+                           f"los clientes SSE de este proceso no recibiran los eventos de los workers")
+            return
+        except OSError as e:
+            logger.warning(f"No se pudo abrir el canal de eventos en {self.address}: {e}")
+            return
+        threading.Thread(target=self._accept_loop, name="job-events", daemon=True).start()
+        logger.info(f"Canal de eventos de jobs escuchando en {self.address}")
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    def _accept_loop(self):
+        while self._listener is not None:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                return
+            except Exception as e:
+                logger.warning(f"Conexion de eventos rechazada: {e}")
+                continue
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    job_id, event, data = conn.recv()
+                except (EOFError, OSError):
+                    return
+                except Exception as e:
+                    logger.warning(f"Evento mal formado: {e}")
+                    continue
+                self.publish(job_id, event, data)
+
+    # ——————————————————————————————————————————————————————————————————————
+    # Publicacion y suscripcion
+    # ——————————————————————————————————————————————————————————————————————
+    def publish(self, job_id: str, event: str, data: dict):
+        """
+    Guarda un evento en el historial del job y lo entrega a sus suscriptores.
+    Se puede llamar desde cualquier hilo (tambien lo usa directamente el backend).
+        """
+        with self._lock:
+            ev: Event = (next(self._ids), event, data)
+            history = self._history.get(job_id)
+            if history is None:
+                history = self._history[job_id] = deque(maxlen=HISTORY_SIZE)
+                while len(self._history) > HISTORY_JOBS:
+                    self._history.popitem(last=False)
+            history.append(ev)
+            queues = list(self._subscribers.get(job_id, ()))
+        if self._loop is None:
+            return
+        for q in queues:
+            self._loop.call_soon_threadsafe(q.put_nowait, ev)
+
+    def subscribe(self, job_id: str, last_event_id: int = 0) -> Tuple[asyncio.Queue, List[Event]]:
+        """
+    Suscribe un cliente a un job.
+
+    Args:
+        job_id: UUID del job.
+        last_event_id: Ultimo evento que ya tiene el cliente (0 para recibir todo el historial).
+
+    Returns:
+        (cola de eventos nuevos, eventos del historial posteriores a last_event_id)
+        """
+        q: asyncio.Queue = asyncio.Queue()
+        with self._lock:
+            self._subscribers.setdefault(job_id, set()).add(q)
+            backlog = [ev for ev in self._history.get(job_id, ()) if ev[0] > last_event_id]
+        return q, backlog
+
+    def unsubscribe(self, job_id: str, q: asyncio.Queue):
+        with self._lock:
+            subs = self._subscribers.get(job_id)
+            if subs is not None:
+                subs.discard(q)
+                if not subs:
+                    del self._subscribers[job_id]
+
+
+#broker unico del proceso del backend (se arranca en el lifespan)
+broker = EventBroker()
@@ -0,0 +1,395 @@
+"""
+backend/job_queue.py
+
+Cola persistente de jobs de scraping y procesos worker que los ejecutan.
+
+En lugar de lanzar un ``scrapy crawl`` en un subproceso por cada peticion (sin limite de
+concurrencia ni forma de cancelarlo), los jobs se guardan en la tabla ``jobs`` en estado
+``pending`` y un numero configurable de procesos worker los van recogiendo por orden de llegada
+(``queued_at``, FIFO: cada job ocupa un unico hueco de crawl, asi que un job no puede acaparar los workers, pero
+no hay reparto por cliente porque los jobs no guardan quien los pidio). Cada worker mantiene vivo el reactor de Twisted con un ``CrawlerRunner`` de
+Scrapy y los modelos NLP ya cargados, y ejecuta como mucho ``JOB_WORKER_CONCURRENCY`` crawls a la vez.
+
+Un job se cancela marcandolo como ``cancelled``: si estaba en cola ya no se ejecuta y, si estaba
+en marcha, el worker que lo tiene cierra su spider en el siguiente sondeo.
+
+Cada worker se identifica como ``<host>:<pid>`` (columna ``worker``). Al arrancar, el backend solo devuelve a la
+cola los jobs en running cuyo worker era de esta maquina y ya no existe: los de workers vivos de otro proceso
+del backend (``uvicorn --workers N``, ``--reload``, otra instancia) o de otra maquina no se tocan.
+
+Los workers publican los cambios de estado (y, desde el crawl, el progreso y los resultados) en el
+canal de eventos local que el backend reenvia por ``/jobs/{job_id}/events``.
+
+Los workers arrancan con el backend (``JobScheduler`` en el lifespan de FastAPI) o a mano:
+    python -m backend.job_queue --workers 2
+"""
+import argparse
+import datetime
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import update
+
+from corruption_detector.events import get_publisher
+
+from .db import SessionLocal, init_db
+from .models import ScrapeJob, JobStatus
+
+logger = logging.getLogger(__name__)
+
+#numero de procesos worker, crawls simultaneos por worker y cada cuanto miran la cola (segundos)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_WORKER_CONCURRENCY = int(os.environ.get("JOB_WORKER_CONCURRENCY", "1"))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1.0"))
+
+
+def utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def worker_identity() -> str:
+    """Identificador del worker de este proceso: ``<host>:<pid>``."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def parse_worker_identity(worker: Optional[str]) -> Optional[Tuple[str, int]]:
+    """(host, pid) de un identificador de worker, o None si no tiene ese formato."""
+    host, sep, pid = (worker or "").rpartition(":")
+    if not sep or not host or not pid.isdigit():
+        return None
+    return host, int(pid)
+
+
+def pid_alive(pid: int) -> bool:
+    """Si existe un proceso con ese pid en esta maquina."""
+    if pid <= 0:
+        return False
+    if sys.platform.startswith("win"):
+        #en Windows os.kill(pid, 0) termina el proceso: preguntamos su codigo de salida
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            code = ctypes.c_ulong()
+            return bool(kernel32.GetExitCodeProcess(handle, ctypes.byref(code))) and code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        #existe, pero es de otro usuario
+        return True
+    return True
+
+
+def worker_dead(worker: Optional[str]) -> bool:
+    """Si el worker es de esta maquina y su proceso ya no existe (los demas se dan por vivos)."""
+    identity = parse_worker_identity(worker)
+    if identity is None or identity[0] != socket.gethostname():
+        return False
+    return not pid_alive(identity[1])
+
+
+# ——————————————————————————————————————————————————————————————————————
+# Operaciones sobre la cola (tabla jobs)
+# ——————————————————————————————————————————————————————————————————————
+def enqueue_job(db, job: ScrapeJob) -> ScrapeJob:
+    """
+Mete un job nuevo en la cola en estado pending.
+
+Args:
+    db: Sesion de base de datos.
+    job (ScrapeJob): Job aun no guardado.
+    """
+    job.status = JobStatus.pending
+    job.queued_at = utcnow()
+    db.add(job)
+    db.commit()
+    return job
+
+
+def claim_next_job(worker_id: str) -> Optional[ScrapeJob]:
+    """
+Reserva el job pendiente mas antiguo para este worker (orden FIFO por queued_at).
+
+La reserva es un UPDATE condicionado a que el job siga en pending, asi que si dos workers
+intentan coger el mismo job solo uno lo consigue.
+
+Returns:
+    ScrapeJob reservado (ya en running) o None si la cola esta vacia.
+    """
+    db = SessionLocal()
+    try:
+        while True:
+            job = (db.query(ScrapeJob)
+                     .filter(ScrapeJob.status == JobStatus.pending)
+                     .order_by(ScrapeJob.queued_at, ScrapeJob.created_at)
+                     .first())
+            if job is None:
+                return None
+            res = db.execute(
+                update(ScrapeJob)
+                .where(ScrapeJob.id == job.id, ScrapeJob.status == JobStatus.pending)
+                .values(status=JobStatus.running, started_at=utcnow(), worker=worker_id)
+            )
+            db.commit()
+            if res.rowcount == 1:
+                db.refresh(job)
+                db.expunge(job)
+                return job
+            #otro worker se nos ha adelantado, probamos con el siguiente
+            db.expire_all()
+    finally:
+        db.close()
+
+
+def finish_job(job_id: str, status: JobStatus) -> Optional[JobStatus]:
+    """
+Marca un job como terminado (finished o failed) y guarda finished_at.
+Si mientras tanto se habia cancelado, se respeta el estado cancelled.
+
+Returns:
+    JobStatus final del job, o None si no existe.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(ScrapeJob, job_id)
+        if job is None:
+            return None
+        if job.status != JobStatus.cancelled:
+            job.status = status
+        job.finished_at = utcnow()
+        db.commit()
+        return job.status
+    finally:
+        db.close()
+
+
+def cancel_job(db, job: ScrapeJob) -> ScrapeJob:
+    """
+Cancela un job. Si estaba en cola se cierra ya; si estaba en marcha, su worker lo parara.
+    """
+    if job.status in (JobStatus.pending, JobStatus.running):
+        if job.status == JobStatus.pending:
+            job.finished_at = utcnow()
+        job.status = JobStatus.cancelled
+        db.commit()
+    return job
+
+
+def cancelled_ids(job_ids) -> set:
+    """Devuelve cuales de los jobs indicados se han cancelado."""
+    if not job_ids:
+        return set()
+    db = SessionLocal()
+    try:
+        rows = (db.query(ScrapeJob.id)
+                  .filter(ScrapeJob.id.in_(list(job_ids)), ScrapeJob.status == JobStatus.cancelled)
+                  .all())
+        return {r[0] for r in rows}
+    finally:
+        db.close()
+
+
+def requeue_orphaned_jobs() -> int:
+    """
+Devuelve a la cola los jobs que quedaron en running porque su worker murio (caida del backend o del worker).
+
+Solo se reencolan los jobs cuyo worker era de esta maquina y su proceso ya no existe (``worker_dead``); los que
+esta ejecutando un worker vivo, de este u otro proceso del backend, siguen en running. Tambien se reencolan los
+jobs en running sin worker: claim_next_job siempre lo anota, asi que son de antes de la cola (cuando el crawl era un
+subproceso del backend) y ya nadie los va a terminar.
+
+Returns:
+    int: numero de jobs reencolados.
+    """
+    db = SessionLocal()
+    try:
+        running = db.query(ScrapeJob.id, ScrapeJob.worker).filter(ScrapeJob.status == JobStatus.running).all()
+        n = 0
+        for job_id, worker in running:
+            if worker is not None and not worker_dead(worker):
+                continue
+            #condicionado al mismo worker y estado, por si otro backend lo reencola a la vez
+            same_worker = ScrapeJob.worker.is_(None) if worker is None else ScrapeJob.worker == worker
+            res = db.execute(
+                update(ScrapeJob)
+                .where(ScrapeJob.id == job_id, ScrapeJob.status == JobStatus.running, same_worker)
+                .values(status=JobStatus.pending, started_at=None, worker=None)
+            )
+            n += res.rowcount
+        db.commit()
+        return n
+    finally:
+        db.close()
+
+
+# ——————————————————————————————————————————————————————————————————————
+# Proceso worker
+# ——————————————————————————————————————————————————————————————————————
+class CrawlWorker:
+    """
+Worker que vive en su propio proceso con un reactor de Twisted y un CrawlerRunner siempre arrancados.
+
+Args:
+    worker_id: Nombre del worker (se guarda en la columna worker del job).
+    concurrency: Crawls simultaneos maximos.
+    poll_interval: Segundos entre sondeos de la cola.
+    """
+
+    def __init__(self, worker_id: str, concurrency: int = 1, poll_interval: float = 1.0):
+        from scrapy.crawler import CrawlerRunner
+        from scrapy.utils.project import get_project_settings
+
+        self.worker_id = worker_id
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.runner = CrawlerRunner(get_project_settings())
+        #crawls en marcha: job_id -> crawler
+        self.active: Dict[str, object] = {}
+
+    def spider_kwargs(self, job: ScrapeJob) -> dict:
+        """Argumentos del spider para un job."""
+        #los terminos van como lista JSON (job.terms ya lo es): unidos por comas, un termino de un aviso que lleva
+        #comas se partiria y no coincidiria con sus terminos en notice_terms
+        #job_id lo usa JobEventsExtension para publicar el progreso del crawl
+        kwargs = {"contract_terms": job.terms, "result_path": job.result_path, "job_id": job.id}
+        if job.mode == "index_then_crawl":
+            kwargs["mode"] = "index_then_crawl"
+        if job.notices:
+            kwargs["notice_terms"] = job.notices
+        return kwargs
+
+    def poll(self):
+        """Para los crawls cancelados y arranca jobs nuevos mientras haya hueco."""
+        for job_id in cancelled_ids(self.active):
+            crawler = self.active[job_id]
+            if getattr(crawler, "spider", None) is not None and crawler.engine is not None:
+                logger.info(f"[{self.worker_id}] Cancelando job {job_id}")
+                crawler.engine.close_spider(crawler.spider, "cancelled")
+        while len(self.active) < self.concurrency:
+            job = claim_next_job(self.worker_id)
+            if job is None:
+                return
+            self.start(job)
+
+    def start(self, job: ScrapeJob):
+        from corruption_detector.spiders.corruption_spider import MultiSourceSpider
+
+        logger.info(f"[{self.worker_id}] Iniciando job {job.id}")
+        crawler = self.runner.create_crawler(MultiSourceSpider)
+        self.active[job.id] = crawler
+        get_publisher().publish(job.id, "status", {"status": JobStatus.running.value,
+                                                   "started_at": utcnow().isoformat()})
+        d = self.runner.crawl(crawler, **self.spider_kwargs(job))
+        d.addCallbacks(self._done, self._failed, callbackArgs=(job.id, crawler), errbackArgs=(job.id,))
+
+    def _done(self, _, job_id: str, crawler):
+        self.active.pop(job_id, None)
+        reason = crawler.stats.get_value("finish_reason") if crawler.stats else None
+        logger.info(f"[{self.worker_id}] Job {job_id} terminado ({reason})")
+        self._publish_final(job_id, finish_job(job_id, JobStatus.finished))
+
+    def _failed(self, failure, job_id: str):
+        self.active.pop(job_id, None)
+        logger.error(f"[{self.worker_id}] Error durante el scraping del job {job_id}: {failure.value}")
+        self._publish_final(job_id, finish_job(job_id, JobStatus.failed))
+
+    def _publish_final(self, job_id: str, status: Optional[JobStatus]):
+        if status is not None:
+            get_publisher().publish(job_id, "status", {"status": status.value,
+                                                       "finished_at": utcnow().isoformat()})
+
+    def run(self):
+        """Arranca el sondeo de la cola y el reactor (bloquea hasta que se para el proceso)."""
+        from twisted.internet import reactor, task
+
+        loop = task.LoopingCall(self.poll)
+        loop.start(self.poll_interval, now=True).addErrback(
+            lambda f: logger.error(f"[{self.worker_id}] Error sondeando la cola: {f.value}")
+        )
+        reactor.run()
+
+
+def worker_main(concurrency: int = 1, poll_interval: float = 1.0):
+    """
+Punto de entrada de un proceso worker: instala el reactor asyncio que necesita scrapy-playwright
+y se queda atendiendo la cola. El worker se identifica con worker_identity() (host y pid de su proceso).
+    """
+    os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "corruption_detector.settings")
+    from scrapy.utils.log import configure_logging
+    from scrapy.utils.project import get_project_settings
+    from scrapy.utils.reactor import install_reactor
+
+    settings = get_project_settings()
+    install_reactor(settings.get("TWISTED_REACTOR"))
+    configure_logging(settings)
+    CrawlWorker(worker_identity(), concurrency, poll_interval).run()
+
+
+class JobScheduler:
+    """
+Arranca y para los procesos worker desde el backend.
+
+Args:
+    workers: Numero de procesos worker (0 para no arrancar ninguno y usar workers externos).
+    concurrency: Crawls simultaneos por worker.
+    poll_interval: Segundos entre sondeos de la cola.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, concurrency: int = JOB_WORKER_CONCURRENCY,
+                 poll_interval: float = JOB_POLL_INTERVAL):
+        self.workers = workers
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.processes = []
+
+    def start(self):
+        if self.workers <= 0:
+            return
+        n = requeue_orphaned_jobs()
+        if n:
+            logger.warning(f"{n} jobs que se quedaron en running se han devuelto a la cola")
+        #spawn en todas las plataformas: cada worker empieza limpio e instala su propio reactor
+        ctx = multiprocessing.get_context("spawn")
+        for i in range(self.workers):
+            p = ctx.Process(
+                target=worker_main,
+                args=(self.concurrency, self.poll_interval),
+                name=f"crawl-worker-{i}",
+                daemon=True,
+            )
+            p.start()
+            self.processes.append(p)
+        logger.info(f"Arrancados {self.workers} workers de scraping")
+
+    def stop(self, timeout: float = 5.0):
+        for p in self.processes:
+            p.terminate()
+        for p in self.processes:
+            p.join(timeout)
+        self.processes = []
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Workers de la cola de jobs de scraping")
+    parser.add_argument("--workers", type=int, default=max(1, JOB_WORKERS))
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY)
+    parser.add_argument("--poll-interval", type=float, default=JOB_POLL_INTERVAL)
+    args = parser.parse_args()
+    init_db()
+    if args.workers == 1:
+        worker_main(args.concurrency, args.poll_interval)
+    else:
+        scheduler = JobScheduler(args.workers, args.concurrency, args.poll_interval)
+        scheduler.start()
+        for proc in scheduler.processes:
+            proc.join()
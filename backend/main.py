@@ -3,32 +3,46 @@ Main module del backend FastAPI para el TFG "Analizador de Irregularidades".
 Basicamente es una API REST que permite interactuar con el sistema de scraping
 y analisis de contratos públicos en España, centrándose en la detección de
 irregularidades. Este módulo expone los endpoints para:
-1. Subir y procesar un PDF de contrato.
+1. Subir y procesar un PDF de contrato, o un lote de avisos que se buscan en un solo job.
 2. Consultar detalles de un contrato en el BOE.
-3. Crear, monitorizar y recuperar resultados de jobs de scraping.
+3. Crear, encolar, cancelar, monitorizar (tambien en streaming con SSE) y recuperar resultados de jobs de scraping.
 4. Exportar resultados a CSV.
+5. Buscar al momento en el indice de articulos ya scrapeados.
 
 También configura CORS, monta ficheros estáticos y gestiona el ciclo de vida de la aplicación.
 """
 
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Query, Path as PathParam, status
+from fastapi import FastAPI, HTTPException, Depends, Query, Path as PathParam, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, Response
+from fastapi import Request
 from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from email.utils import formatdate
 from uuid import uuid4
-import os, json, logging, httpx
+import os, json, logging, httpx, base64, zlib, asyncio, hashlib
 from corruption_detector.spiders.corruption_spider import BASE_CORRUPTION_INDICATORS
+from corruption_detector.nlp_server import NLPClient, start_server_process
+from corruption_detector.results_io import ResultsWriter, iter_results, iter_csv_chunks, read_page, count_results
+from corruption_detector.article_index import ArticleIndex
+from corruption_detector.index_search import search_index
+from corruption_detector.ingester import start_ingester_process
+from corruption_detector.settings import ARTICLE_INDEX_PATH
 from .db import SessionLocal, init_db
 from .models import ScrapeJob, JobStatus
-from .schemas import JobInfo, Item, ScrapeRequest
-from .scraper import launch_scrape
+from .schemas import JobInfo, Item, ScrapeRequest, BulkContractsRequest, BulkContractsResponse, BatchUploadResponse
+from .job_queue import JobScheduler, enqueue_job, cancel_job, utcnow
+from .events import broker, TERMINAL_STATUSES
 from pathlib import Path as FSPath
-from .contract_processor import process_award_notice 
-from fastapi import UploadFile, File             
+from .contract_processor import (process_award_notice_async, notice_cache, shutdown_pdf_pool, iter_zip_pdfs,
+                                 merge_notice_terms)
+from .boe import (sumario_cache, close_client, contract_details, date_range, bulk_dates, BOEUnavailable,
+                  SumarioNotFound)
+from fastapi import UploadFile, File, Form
 
 
 
@@ -47,6 +61,31 @@ logger = logging.getLogger(__name__)
 RESULTS_DIR = FSPath(__file__).resolve().parent / "results"
 UPLOAD_DIR = RESULTS_DIR / "uploads"
 UPLOAD_DIR.mkdir(exist_ok=True)
+#Los resultados de cada job se guardan en JSON Lines; si RESULTS_COMPRESS esta activo, comprimidos con gzip.
+RESULTS_COMPRESS = os.environ.get("RESULTS_COMPRESS") == "1"
+RESULTS_SUFFIX = ".jsonl.gz" if RESULTS_COMPRESS else ".jsonl"
+#Tamaño maximo de un PDF subido, trozos en los que se lee y, con UPLOAD_IN_MEMORY=1, los PDFs no se guardan en
+#UPLOAD_DIR sino que sus bytes se pasan directamente a PyMuPDF (fitz.open(stream=...)).
+UPLOAD_MAX_BYTES = int(os.environ.get("UPLOAD_MAX_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+UPLOAD_IN_MEMORY = os.environ.get("UPLOAD_IN_MEMORY") == "1"
+#Lotes de avisos (/upload_contracts): PDFs maximos por lote y tamaño maximo de cada ZIP. El ZIP se guarda por trozos
+#en un temporal de UPLOAD_DIR (no en memoria) y de el solo se descomprime un PDF cada vez; el limite acota el disco
+#que ocupa un lote mientras se procesa (200 PDFs de ~1 MB caben de sobra).
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", "200"))
+BATCH_MAX_BYTES = int(os.environ.get("BATCH_MAX_BYTES", str(256 * 1024 * 1024)))
+#Numero maximo de aciertos del indice de articulos que se guardan en un job en modo index / index_then_crawl.
+INDEX_SEARCH_LIMIT = int(os.environ.get("INDEX_SEARCH_LIMIT", "500"))
+
+#indice de texto completo de articulos, compartido con el spider y el ingester (se abre la primera vez que se usa)
+_article_index = None
+
+
+def get_article_index() -> ArticleIndex:
+    global _article_index
+    if _article_index is None:
+        _article_index = ArticleIndex(os.environ.get("ARTICLE_INDEX_PATH", ARTICLE_INDEX_PATH))
+    return _article_index
 
 
 # ——————————————————————————————————————————————————————————————————————
@@ -56,7 +95,26 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 async def lifespan(app: FastAPI):
     #Arranque: inicializamos la base de datos y crea la tabla jobs en caso de que no exista.
     init_db()
+    #Si CD_NLP_AUTOSTART=1 arrancamos el servidor NLP persistente para que los jobs no recarguen spaCy y pysentimiento cada vez.
+    nlp_proc = None
+    if os.environ.get("CD_NLP_AUTOSTART") == "1" and NLPClient.connect() is None:
+        nlp_proc = start_server_process(wait=0)
+    #Abrimos el canal local por el que los workers nos envian el progreso de los jobs (/jobs/{job_id}/events).
+    broker.start(asyncio.get_running_loop())
+    #Arrancamos los procesos worker que van sacando jobs de la cola (JOB_WORKERS, 0 para usar workers externos).
+    scheduler = JobScheduler()
+    scheduler.start()
+    #Si CD_INGEST_AUTOSTART=1 arrancamos tambien el ingester que mantiene al dia el indice de articulos.
+    ingester_proc = start_ingester_process() if os.environ.get("CD_INGEST_AUTOSTART") == "1" else None
     yield  
+    if ingester_proc:
+        ingester_proc.terminate()
+    scheduler.stop()
+    broker.stop()
+    await close_client()
+    shutdown_pdf_pool()
+    if nlp_proc:
+        nlp_proc.terminate()
 
 
 # ——————————————————————————————————————————————————————————————————————
@@ -68,6 +126,8 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True,
     allow_methods=["*"], allow_headers=["*"],
+    #cabeceras de paginacion y cache que el frontend necesita poder leer
+    expose_headers=["ETag", "Last-Modified", "Link", "X-Next-Cursor", "X-Total-Count"],
 )
 
 """Dependency de FastAPI: proporciona una sesión de base de datos y la cierra al finalizar de forma segura."""
@@ -93,10 +153,114 @@ def get_indicators():
 # ——————————————————————————————————————————————————————————————————————
 # 1) Endpoint para subir un contrato en PDF
 # ——————————————————————————————————————————————————————————————————————
+async def receive_upload(file: UploadFile, in_memory: bool = False, max_bytes: Optional[int] = None,
+                         spool: bool = False):
+    """
+Lee un PDF subido por trozos de UPLOAD_CHUNK_SIZE, calculando su SHA-256 a medida que llegan los bytes y cortando
+con 413 en cuanto pasa de max_bytes (por defecto UPLOAD_MAX_BYTES).
+
+En disco se escribe a un temporal que luego se renombra a ``<sha256>.pdf``; si ese PDF ya estaba subido el temporal
+se borra, asi que UPLOAD_DIR no acumula copias iguales.
+
+Args:
+    file: El PDF enviado por el usuario.
+    in_memory: Devolver los bytes en lugar de guardarlos en UPLOAD_DIR.
+    max_bytes: Tamaño maximo aceptado.
+    spool: Dejar el fichero en su temporal ``.part`` de UPLOAD_DIR y devolver esa ruta (p. ej. un ZIP del que
+        solo se van a sacar los PDFs); el llamante tiene que borrarlo.
+
+Returns:
+    (sha256 en hexadecimal, ruta del PDF en UPLOAD_DIR o sus bytes si in_memory)
+    """
+    max_bytes = max_bytes or UPLOAD_MAX_BYTES
+    sha = hashlib.sha256()
+    size = 0
+    buf = bytearray() if in_memory else None
+    tmp = None if in_memory else UPLOAD_DIR / f"{uuid4()}.part"
+    out = open(tmp, "wb") if tmp else None
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                    detail=f"{file.filename or 'El fichero'} supera el tamaño maximo de {max_bytes} bytes")
+            sha.update(chunk)
+            if buf is not None:
+                buf += chunk
+            else:
+                out.write(chunk)
+    except BaseException:
+        if out:
+            out.close()
+            tmp.unlink(missing_ok=True)
+        raise
+    digest = sha.hexdigest()
+    if buf is not None:
+        return digest, buf
+    out.close()
+    if spool:
+        return digest, tmp
+    job_pdf = UPLOAD_DIR / f"{digest}.pdf"
+    if job_pdf.exists():
+        tmp.unlink()
+    else:
+        os.replace(tmp, job_pdf)
+    return digest, job_pdf
+
+
+def store_pdf(data: bytes):
+    """
+Guarda en UPLOAD_DIR (como ``<sha256>.pdf``, sin duplicar) un PDF que ya tenemos en memoria, por ejemplo
+sacado de un ZIP. Con UPLOAD_IN_MEMORY no se guarda.
+
+Returns:
+    (sha256 en hexadecimal, ruta del PDF o sus bytes si UPLOAD_IN_MEMORY)
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    if UPLOAD_IN_MEMORY:
+        return digest, data
+    job_pdf = UPLOAD_DIR / f"{digest}.pdf"
+    if not job_pdf.exists():
+        tmp = UPLOAD_DIR / f"{uuid4()}.part"
+        tmp.write_bytes(data)
+        os.replace(tmp, job_pdf)
+    return digest, job_pdf
+
+
+def store_zip_pdfs(name: str, zip_path, max_files: int) -> list:
+    """
+Guarda con store_pdf los PDFs de un ZIP ya en disco, descomprimiendolos de uno en uno.
+
+Returns:
+    Lista de (nombre del ZIP/nombre dentro del ZIP, sha256, ruta del PDF o sus bytes si UPLOAD_IN_MEMORY).
+
+Raises:
+    ValueError: Si el ZIP no es valido, tiene demasiados PDFs o alguno es demasiado grande.
+    """
+    return [(f"{name}/{member}", *store_pdf(pdf)) for member, pdf in iter_zip_pdfs(zip_path, max_files, UPLOAD_MAX_BYTES)]
+
+
+async def process_uploaded_notice(digest: str, pdf):
+    """
+Terminos y SimpleNotice de un PDF subido: de la cache de avisos si ya lo habiamos procesado y, si no,
+extrayendolo fuera del event loop (los PDFs grandes en disco por trozos de paginas en el pool de procesos).
+    """
+    cached = notice_cache.get(digest)
+    if cached is not None:
+        return cached
+    terms, notice = await process_award_notice_async(pdf if isinstance(pdf, (bytes, bytearray)) else str(pdf))
+    notice_cache.put(digest, terms, notice)
+    return terms, notice
+
+
 @app.post("/upload_contract")
 async def upload_contract(file: UploadFile = File(...)) -> dict:
     """
-Sube un PDF de contrato, lo guarda y extrae términos y metadatos.
+Sube un PDF de contrato, lo guarda (por trozos, ver receive_upload) y extrae términos y metadatos.
+Los resultados se cachean por SHA-256 del PDF, asi que volver a subir el mismo aviso responde al momento.
 
 Args:
 file (UploadFile): El PDF enviado por el usuario.
@@ -107,67 +271,106 @@ dict: {
 "notice": {
 "adjudicatario": str,
 "entidad": str,
-"objeto": str
+"objeto": str,
+"importe": str,
+"nif": str,
+"fecha_adjudicacion": str
 }
 }
     """
-    job_pdf = UPLOAD_DIR / f"{uuid4()}.pdf"
-    with open(job_pdf, "wb") as f:
-        f.write(await file.read())
-    terms, notice = process_award_notice(str(job_pdf))
+    digest, pdf = await receive_upload(file, in_memory=UPLOAD_IN_MEMORY)
+    #si ya hemos procesado este mismo PDF devolvemos lo que sacamos entonces sin volver a extraer el texto
+    terms, notice = await process_uploaded_notice(digest, pdf)
+    return {"terms": terms, "notice": notice_dict(notice)}
+
+
+def notice_dict(notice) -> dict:
     return {
-        "terms": terms,
-        "notice": {
-            "adjudicatario": notice.adjudicatario_nombre,
-            "entidad":      notice.entidad_adjudicadora,
-            "objeto":       notice.objeto_contrato,
-        }
+        "adjudicatario": notice.adjudicatario_nombre,
+        "entidad":      notice.entidad_adjudicadora,
+        "objeto":       notice.objeto_contrato,
+        "importe":      notice.importe,
+        "nif":          notice.nif,
+        "fecha_adjudicacion": notice.fecha_adjudicacion,
     }
 
 
-# ——————————————————————————————————————————————————————————————————————
-# 2) Endpoint de detalle de contrato BOE
-# ——————————————————————————————————————————————————————————————————————
-
-def extract_items_and_depts(node, dept_map=None, parent_dept=None):
+@app.post("/upload_contracts", response_model=BatchUploadResponse, status_code=status.HTTP_202_ACCEPTED)
+async def upload_contracts_batch(
+    files: List[UploadFile] = File(...),
+    mode: str = Form("crawl"),
+    db: Session = Depends(get_db),
+):
     """
-Recorre recursivamente la estructura JSON del BOE y extrae todos los items,
-de esta manera conseguiremos construir un mapa identificador --> departamento.
+Sube un lote de avisos de adjudicacion (varios PDFs, por ejemplo una carpeta, y/o ZIPs con PDFs dentro),
+los procesa a la vez en el pool de extraccion y lanza un unico job con los terminos de todos ellos.
+
+Los terminos se unen sin repetidos entre avisos (merge_notice_terms) y el job guarda que terminos tiene
+cada aviso, asi que cada articulo del resultado lleva en ``notices`` los ids de los avisos a los que
+corresponde. Un crawl para cincuenta contratos en lugar de cincuenta crawls.
 
 Args:
-    node: Nodo actual (dict o list) en el JSON.
-    dept_map: Mapa acumulado de identificador a departamento.
-    parent_dept: Nombre del departamento padre.
+    files (List[UploadFile]): PDFs y/o ZIPs.
+    mode (str): Modo del job, igual que en /scrape (crawl, index o index_then_crawl).
+    db (Session): Sesión de base de datos inyectada.
 
 Returns:
-    Lista de diccionarios con los ítems encontrados.
-    """
-    if dept_map is None:
-        dept_map = {}
-    items = []
-    if isinstance(node, dict):
-        dept_name = node.get('nombre') or parent_dept
-        it = node.get('item')
-        if it:
-            if isinstance(it, list):
-                for entry in it:
-                    items.append(entry)
-                    dept_map[entry['identificador']] = dept_name
-            else:
-                items.append(it)
-                dept_map[it['identificador']] = dept_name
-        for key, value in node.items():
-            if key in ('departamento', 'seccion', 'epigrafe'):
-                items += extract_items_and_depts(value, dept_map, dept_name)
-    elif isinstance(node, list):
-        for elem in node:
-            items += extract_items_and_depts(elem, dept_map, parent_dept)
-    return items
+    BatchUploadResponse: el job creado, sus terminos y el resultado de cada aviso.
 
+Raises:
+    HTTPException(400): Si no hay PDFs, hay demasiados, un ZIP no es valido o no sale ningun termino.
+    HTTPException(413): Si algun fichero es demasiado grande.
+    """
+    if mode not in ("crawl", "index", "index_then_crawl"):
+        raise HTTPException(status_code=400, detail=f"Modo desconocido: {mode}")
+    #(nombre del fichero, sha256, ruta o bytes del PDF)
+    sources = []
+    for file in files:
+        name = file.filename or ""
+        if name.lower().endswith(".zip") or file.content_type in ("application/zip", "application/x-zip-compressed"):
+            _, spooled = await receive_upload(file, max_bytes=BATCH_MAX_BYTES, spool=True)
+            try:
+                #descomprimir y guardar los PDFs es trabajo sincrono de disco: fuera del event loop
+                sources.extend(await run_in_threadpool(store_zip_pdfs, name, spooled, BATCH_MAX_FILES - len(sources)))
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=f"{name}: {e}")
+            finally:
+                spooled.unlink(missing_ok=True)
+        else:
+            sources.append((name, *await receive_upload(file, in_memory=UPLOAD_IN_MEMORY)))
+        if len(sources) > BATCH_MAX_FILES:
+            raise HTTPException(status_code=400, detail=f"El lote tiene mas de {BATCH_MAX_FILES} PDFs")
+    if not sources:
+        raise HTTPException(status_code=400, detail="El lote no tiene ningun PDF")
+
+    #cada PDF distinto se procesa una vez; todos a la vez (el pool de procesos limita cuantos se extraen en paralelo)
+    unique = {digest: pdf for _, digest, pdf in sources}
+    processed = dict(zip(unique, await asyncio.gather(
+        *(process_uploaded_notice(digest, pdf) for digest, pdf in unique.items()), return_exceptions=True)))
+    for digest, res in processed.items():
+        if isinstance(res, Exception):
+            logger.warning(f"No se pudo procesar el aviso {digest}: {res}")
+
+    terms, per_notice = merge_notice_terms(
+        (digest, res[0]) for digest, res in processed.items() if not isinstance(res, Exception))
+    if not terms:
+        raise HTTPException(status_code=400, detail="No se ha encontrado ningun termino en los avisos del lote")
+    #submit_scrape_job es sincrono (SQLAlchemy): fuera del event loop para no bloquear las demas peticiones
+    job = await run_in_threadpool(submit_scrape_job, db, terms, mode, notices=per_notice)
+
+    notices = []
+    for name, digest, _ in sources:
+        res = processed[digest]
+        if isinstance(res, Exception):
+            notices.append({"id": digest, "filename": name, "error": f"No se pudo procesar el PDF: {res}"})
+        else:
+            notices.append({"id": digest, "filename": name, "terms": per_notice.get(digest, []),
+                            "notice": notice_dict(res[1])})
+    return {"job": JobInfo.from_job(job), "terms": terms, "notices": notices}
 
 
 # ——————————————————————————————————————————————————————————————————————
-# 3) Endpoint de consulta de contrato en el BOE, el procesamiento se hace en extract_items_and_depts(el anterior).
+# 2) y 3) Endpoint de detalle de contrato BOE, el sumario se descarga, indexa y cachea en backend/boe.py.
 # ——————————————————————————————————————————————————————————————————————
 @app.get("/contracts/{fecha}/{expediente:path}")
 async def get_contract_details(
@@ -176,6 +379,8 @@ async def get_contract_details(
 ):
     """
 Obtiene detalles de un contrato concreto desde la API abierta del BOE.
+El sumario de cada fecha se indexa por identificador y se cachea (en memoria y, si la fecha ya ha pasado, en disco),
+asi que las consultas repetidas no vuelven a descargarlo.
 
 Args:
 fecha (str): Fecha en formato AAAAMMDD.
@@ -193,44 +398,78 @@ Raises:
 HTTPException(503): Error de red al consultar el BOE.
 HTTPException(404): Si no existe sumario o no se encuentra el expediente.
     """
-    url = f"https://www.boe.es/datosabiertos/api/boe/sumario/{fecha}"
-    logger.debug(f"📡 Fetch BOE: {url}")
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.get(url, headers={"Accept": "application/json"})
-    except httpx.RequestError as e:
-        logger.error(f"Error de red fetching BOE: {e}")
+        #si el sumario no esta en la cache se parsea en streaming y respondemos en cuanto aparece el anuncio
+        found, index = await sumario_cache.lookup(fecha, expediente)
+    except BOEUnavailable:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                             detail="Error de red consultando el BOE.")
-    if resp.status_code != 200:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail="No hay sumario para esa fecha en el BOE.")
-
-    raw = resp.json()
-    data = raw.get('data') or raw.get('datos') or raw
-    sumario = data.get('sumario', {})
-    diario = sumario.get('diario', [])
-    if not diario:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
-                            detail="No hay datos de diario para esa fecha.")
-    diario = diario[0]
-
-    dept_map = {}
-    flat_items = extract_items_and_depts(diario, dept_map)
-    anuncio = next((it for it in flat_items if it.get('identificador') == expediente), None)
-    if not anuncio:
-        disponibles = [it['identificador'] for it in flat_items]
+    except SumarioNotFound as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+
+    if not found:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail={"error": "Identificador no encontrado", "disponibles": disponibles}
+            detail={"error": "Identificador no encontrado", "disponibles": index.identificadores()}
         )
+    return contract_details(*found)
 
-    return {
-        "identificador": anuncio['identificador'],
-        "titulo": anuncio.get('titulo'),
-        "url_pdf": anuncio.get('url_pdf', {}).get('texto'),
-        "organismo": dept_map.get(anuncio['identificador'])
-    }
+
+@app.post("/contracts/bulk", response_model=BulkContractsResponse)
+async def get_contracts_bulk(request: BulkContractsRequest):
+    """
+Resuelve muchos contratos del BOE en una sola peticion.
+
+Se cargan a la vez (con un maximo de BOE_MAX_CONCURRENCY descargas simultaneas y reutilizando las
+conexiones) los sumarios distintos de todos los pares (fecha, expediente) y de todas las fechas del rango
+date_from..date_to. Los sumarios quedan en la cache, asi que las consultas individuales posteriores de esas
+fechas no salen a la red: con solo el rango (sin items ni expedientes) sirve para precargar un periodo.
+
+Args:
+    request (BulkContractsRequest): pares (fecha, expediente), rango de fechas y/o expedientes a buscar en el rango.
+
+Returns:
+    BulkContractsResponse: un resultado por contrato pedido y el estado de cada sumario cargado.
+
+Raises:
+    HTTPException(400): Si el rango de fechas no es valido, los items tienen demasiadas fechas distintas o no se pide nada.
+    HTTPException(422): Si items o expedientes tienen mas de BOE_MAX_BULK_ITEMS elementos.
+    """
+    try:
+        fechas = bulk_dates(it.fecha for it in request.items)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    rango = []
+    if request.date_from or request.date_to:
+        try:
+            rango = date_range(request.date_from or request.date_to, request.date_to or request.date_from)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif request.expedientes:
+        raise HTTPException(status_code=400, detail="Para buscar expedientes sin fecha indica date_from/date_to")
+    if not fechas and not rango:
+        raise HTTPException(status_code=400, detail="Indica items o un rango de fechas")
+
+    loaded = await sumario_cache.prefetch(fechas + rango)
+
+    def lookup(fecha, expediente):
+        index = loaded[fecha]
+        if isinstance(index, Exception):
+            return {"expediente": expediente, "fecha": fecha, "found": False,
+                    "error": "Error de red consultando el BOE." if isinstance(index, BOEUnavailable) else str(index)}
+        found = index.get(expediente)
+        if not found:
+            return {"expediente": expediente, "fecha": fecha, "found": False, "error": "Identificador no encontrado"}
+        return {"expediente": expediente, "fecha": fecha, "found": True, "contract": contract_details(*found)}
+
+    results = [lookup(it.fecha, it.expediente) for it in request.items]
+    for expediente in request.expedientes:
+        fecha = next((f for f in rango if not isinstance(loaded[f], Exception) and loaded[f].get(expediente)), None)
+        results.append(lookup(fecha, expediente) if fecha else
+                       {"expediente": expediente, "found": False, "error": "No encontrado en el rango de fechas"})
+
+    sumarios = {f: (len(ix.items) if not isinstance(ix, Exception) else str(ix)) for f, ix in loaded.items()}
+    return {"results": results, "sumarios": sumarios}
 
 
 # ——————————————————————————————————————————————————————————————————————
@@ -240,19 +479,23 @@ HTTPException(404): Si no existe sumario o no se encuentra el expediente.
 @app.post("/scrape", response_model=JobInfo, status_code=status.HTTP_202_ACCEPTED)
 def create_scrape_job(
     request: ScrapeRequest,
-    background: BackgroundTasks,
     db: Session = Depends(get_db),
 ):
     """
-Crea un nuevo job de scraping.
+Crea un nuevo job de scraping y lo deja en la cola (estado pending) para que lo ejecute un worker.
+
+Segun request.mode:
+    - crawl: solo el crawl, como siempre.
+    - index: responde con los aciertos del indice de articulos; el job queda terminado al momento y no se encola.
+    - index_then_crawl: guarda los aciertos del indice al momento (ya se pueden consultar) y encola un
+      crawl que aniade al mismo fichero los articulos que no estaban en el indice.
 
 Args:
-    request (ScrapeRequest): Esto incluye la lista de términos y la fecha y expediente.
-    background (BackgroundTasks): Nos permite ejecutar launch_scrape en segundo plano.
+    request (ScrapeRequest): Esto incluye la lista de términos, la fecha, el expediente y el modo.
     db (Session): Sesión de base de datos inyectada.
 
 Returns:
-    JobInfo: { id: str, status: str, created_at: str }
+    JobInfo: { id: str, status: str, created_at: str, queued_at: str, ... }
 
 Raises:
     HTTPException(400): Si no hay términos indicados para realizar la busqueda por el usuario.
@@ -260,24 +503,90 @@ Raises:
     if not request.terms:
         raise HTTPException(status_code=400, detail="Debes indicar al menos un término de búsqueda")
 
+    job = submit_scrape_job(db, request.terms, request.mode)
+    return JobInfo.from_job(job)
+
+
+def submit_scrape_job(db: Session, terms: List[str], mode: str = "crawl", notices: Optional[dict] = None) -> ScrapeJob:
+    """
+Crea un job con sus terminos y lo encola, o lo resuelve al momento en modo index (ver create_scrape_job).
+
+Args:
+    db (Session): Sesión de base de datos.
+    terms (List[str]): Terminos a buscar.
+    mode (str): crawl, index o index_then_crawl.
+    notices (Optional[dict]): En un lote de avisos, id del aviso -> sus terminos, para atribuir los articulos.
+
+Returns:
+    ScrapeJob: el job ya guardado.
+    """
     job_id = str(uuid4())
     RESULTS_DIR.mkdir(exist_ok=True)
-    result_path = str(RESULTS_DIR / f"{job_id}.json")
+    result_path = str(RESULTS_DIR / f"{job_id}{RESULTS_SUFFIX}")
 
-    terms_json = json.dumps(request.terms, ensure_ascii=False)
+    terms_json = json.dumps(terms, ensure_ascii=False)
     job = ScrapeJob(
         id=job_id,
         terms=terms_json,
-        status=JobStatus.running,
         result_path=result_path,
+        mode=mode,
+        notices=json.dumps(notices, ensure_ascii=False) if notices else None,
     )
-    
-    db.add(job)
-    db.commit()
+    if mode != "crawl":
+        write_index_results(result_path, terms, notices)
+    if mode == "index":
+        now = utcnow()
+        job.status = JobStatus.finished
+        job.queued_at = job.started_at = job.finished_at = now
+        db.add(job)
+        db.commit()
+    else:
+        enqueue_job(db, job)
+    broker.publish(job_id, "status", {"status": job.status.value})
+    return job
+
+
+def write_index_results(result_path: str, terms: List[str], notices: Optional[dict] = None) -> int:
+    """
+Guarda en el fichero de resultados de un job los aciertos del indice de articulos para sus terminos
+(atribuidos a sus avisos si el job es de un lote).
 
-    background.add_task(launch_scrape, request.terms, result_path, job_id)
+Returns:
+    int: numero de items escritos.
+    """
+    writer = ResultsWriter(result_path)
+    try:
+        for item in search_index(get_article_index(), terms, limit=INDEX_SEARCH_LIMIT, notice_terms=notices):
+            writer.write(item)
+    finally:
+        writer.close()
+    return writer.count
 
-    return JobInfo(id=job_id, status=job.status.value, created_at=job.created_at.isoformat())
+
+# ——————————————————————————————————————————————————————————————————————
+# Busqueda en el indice de articulos
+# ——————————————————————————————————————————————————————————————————————
+@app.get("/search", response_model=List[Item])
+def search_articles(
+    terms: List[str] = Query(..., min_length=1),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    """
+Busca al momento, sin lanzar ningun crawl, los articulos ya indexados que contienen alguno de los
+terminos indicados y algun indicador de corrupcion (BASE_CORRUPTION_INDICATORS).
+
+Args:
+    terms (List[str]): Terminos del contrato (?terms=a&terms=b).
+    limit (int): Numero maximo de items.
+
+Returns:
+    List[Item]: Items con el mismo formato que los resultados de un job, ordenados por risk_score.
+    """
+    items = search_index(get_article_index(), terms, limit=limit)
+    for it in items:
+        if not it.get("publication_date"):
+            it.pop("publication_date", None)
+    return items
 
 
 # ——————————————————————————————————————————————————————————————————————
@@ -294,7 +603,7 @@ Args:
     db (Session): Sesión de base de datos.
 
 Returns:
-    JobInfo: id, status, created_at.
+    JobInfo: id, status, created_at y los tiempos de cola/ejecucion.
 
 Raises:
     HTTPException(404): Si no existe el job.
@@ -303,27 +612,192 @@ Raises:
           else db.query(ScrapeJob).filter_by(id=job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail={"error":"Job no encontrado", "job_id":job_id})
-    return JobInfo(id=job.id, status=job.status.value, created_at=job.created_at.isoformat())
+    return JobInfo.from_job(job)
+
+
+@app.post("/jobs/{job_id}/cancel", response_model=JobInfo)
+def cancel_scrape_job(job_id: str, db: Session = Depends(get_db)):
+    """
+Cancela un job. Si todavia estaba en la cola no llega a ejecutarse; si estaba en marcha,
+el worker que lo ejecuta cierra el spider en su siguiente sondeo.
+
+Args:
+    job_id (str): UUID del job.
+    db (Session): Sesión de base de datos.
+
+Returns:
+    JobInfo: el job con su nuevo estado.
+
+Raises:
+    HTTPException(404): Si no existe el job.
+    HTTPException(409): Si el job ya habia terminado.
+    """
+    job = db.get(ScrapeJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail={"error":"Job no encontrado", "job_id":job_id})
+    if job.status not in (JobStatus.pending, JobStatus.running):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail=f"El job ya ha terminado ({job.status.value}).")
+    was_pending = job.status == JobStatus.pending
+    cancel_job(db, job)
+    #si estaba en cola ya ha terminado; si estaba en marcha el estado final lo publica su worker
+    if was_pending:
+        broker.publish(job_id, "status", {"status": job.status.value})
+    return JobInfo.from_job(job)
+
+
+#segundos sin eventos tras los que enviamos un comentario para mantener viva la conexion SSE
+SSE_KEEPALIVE = 15.0
+
+
+def sse_message(event_id: Optional[int], event: str, data: dict) -> str:
+    """Formatea un evento Server-Sent Events."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, request: Request):
+    """
+Envia en streaming (Server-Sent Events) la evolucion de un job, en lugar de tener que consultar /jobs/{job_id} periodicamente.
+
+Eventos:
+    - status: cambios de estado ({"status": "running", ...}). El primero es siempre el estado actual.
+    - progress: paginas procesadas por fuente, articulos descargados e items encontrados.
+    - items: lotes de resultados en cuanto se escriben ({"items": [...]}).
+    - closed: el spider ha terminado ({"reason": ...}).
+El stream se cierra tras el status final (finished, failed o cancelled). Un cliente que se reconecta
+con Last-Event-ID recibe los eventos que se ha perdido.
+
+Args:
+    job_id (str): UUID del job.
+
+Raises:
+    HTTPException(404): Si no existe el job.
+    """
+    #una unica consulta a la base de datos al conectar; el resto llega por el canal de eventos
+    db = SessionLocal()
+    try:
+        job = db.get(ScrapeJob, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail={"error":"Job no encontrado", "job_id":job_id})
+        snapshot = JobInfo.from_job(job).model_dump(mode="json")
+    finally:
+        db.close()
+    try:
+        last_event_id = int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        last_event_id = 0
+
+    async def event_stream():
+        q, backlog = broker.subscribe(job_id, last_event_id)
+        try:
+            yield sse_message(None, "status", snapshot)
+            if snapshot["status"] in TERMINAL_STATUSES:
+                return
+            pending = list(backlog)
+            while True:
+                if pending:
+                    ev = pending.pop(0)
+                else:
+                    try:
+                        ev = await asyncio.wait_for(q.get(), timeout=SSE_KEEPALIVE)
+                    except asyncio.TimeoutError:
+                        if await request.is_disconnected():
+                            return
+                        yield ": keepalive\n\n"
+                        continue
+                event_id, event, data = ev
+                yield sse_message(event_id, event, data)
+                if event == "status" and data.get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            broker.unsubscribe(job_id, q)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 
 # ——————————————————————————————————————————————————————————————————————
 # 5) Endpoint de consulta de resultados de job
 # ——————————————————————————————————————————————————————————————————————
 
+def results_available(job: ScrapeJob) -> bool:
+    """
+Indica si ya se pueden leer los resultados de un job: cuando ha terminado o, en modo
+index_then_crawl, en cuanto estan guardados los aciertos del indice (el crawl los completara despues).
+    """
+    if job.status == JobStatus.finished:
+        return True
+    return job.mode == "index_then_crawl" and bool(job.result_path) and os.path.isfile(job.result_path)
+
+
+def encode_cursor(position: int) -> str:
+    """Codifica la posicion del siguiente item como un cursor opaco para el cliente."""
+    return base64.urlsafe_b64encode(f"i{position}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decodifica un cursor generado por encode_cursor. Lanza HTTPException(400) si no es valido."""
+    try:
+        value = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        if not value.startswith("i") or not value[1:].isdigit():
+            raise ValueError(value)
+        return int(value[1:])
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Cursor no válido")
+
+
+def results_validators(path: str) -> tuple:
+    """
+Calcula el ETag y la cabecera Last-Modified de un fichero de resultados a partir de su inodo, tamanio y fecha de
+modificacion en nanosegundos (el fichero se reescribe con un renombrado atomico, asi que cada version es otro inodo).
+
+Returns:
+    (etag, last_modified)
+    """
+    st = os.stat(path)
+    etag = f'W/"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"'
+    return etag, formatdate(st.st_mtime, usegmt=True)
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """
+Indica si el cliente ya tiene la version actual segun If-None-Match.
+
+If-Modified-Since no se usa para responder 304: tiene resolucion de un segundo y el fichero se puede reescribir
+dentro del mismo segundo (index_then_crawl le aniade el crawl), asi que daria por buenos resultados que han cambiado.
+    """
+    inm = request.headers.get("if-none-match")
+    if inm is None:
+        return False
+    return etag in [t.strip() for t in inm.split(",")] or inm.strip() == "*"
+
+
 @app.get("/jobs/{job_id}/results", response_model=List[Item])
 def get_job_results(
     job_id: str,
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
     db: Session = Depends(get_db),
 ):
     """
 Recuperamos la lista de resultados en formato JSON de un job finalizado, incluyendo paginación.
 
+La pagina se sirve saltando directamente al item pedido gracias al indice de offsets del fichero
+de resultados, asi que no se vuelve a leer el fichero entero en cada peticion. Ademas de skip/limit
+se puede paginar con cursores: la respuesta incluye X-Next-Cursor (y una cabecera Link rel="next")
+que se pasa como ?cursor= para pedir la pagina siguiente. Las respuestas llevan ETag y Last-Modified,
+de forma que una pagina que no ha cambiado se revalida (con If-None-Match) con un 304 sin cuerpo.
+
 Args:
     job_id (str): UUID del job.
     skip (int): Offset a omitir.
     limit (int): Número máximo de items a devolver.
+    cursor (str): Cursor devuelto por la pagina anterior (si se indica, se ignora skip).
     db (Session): Sesión de base de datos.
 
 Returns:
@@ -332,22 +806,42 @@ Returns:
 Raises:
     HTTPException(404): Si no existe el job.
     HTTPException(202): Si el job aún no ha terminado.
+    HTTPException(400): Si el cursor no es valido.
     """
     job = db.get(ScrapeJob, job_id) if hasattr(db, "get") \
           else db.query(ScrapeJob).filter_by(id=job_id).first()
     if not job:
         raise HTTPException(status_code=404, detail="Job no encontrado")
-    if job.status != JobStatus.finished:
+    if not results_available(job):
         raise HTTPException(status_code=status.HTTP_202_ACCEPTED,
                             detail="Job en curso, inténtalo más tarde por favor.")
     if not os.path.isfile(job.result_path) or os.path.getsize(job.result_path) == 0:
         return []
 
-    with open(job.result_path, encoding="utf-8") as f:
-        raw = json.load(f)
+    etag, last_modified = results_validators(job.result_path)
+    cache_headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "no-cache"}
+    if not_modified(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
+
+    total = count_results(job.result_path)
+    if cursor:
+        #el cursor es una posicion del indice .idx: una posicion que no esta en el fichero no es un cursor nuestro
+        skip = decode_cursor(cursor)
+        if total is not None and skip > total:
+            raise HTTPException(status_code=400, detail="Cursor no válido")
+    page, next_position = read_page(job.result_path, skip=skip, limit=limit)
+
+    response.headers.update(cache_headers)
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    if next_position is not None:
+        next_cursor = encode_cursor(next_position)
+        response.headers["X-Next-Cursor"] = next_cursor
+        next_url = request.url.include_query_params(cursor=next_cursor, limit=limit).remove_query_params("skip")
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
 
     cleaned = []
-    for it in raw[skip : skip + limit]:
+    for it in page:
         if not it.get("publication_date"):
             it.pop("publication_date", None)
         cleaned.append(it)
@@ -359,13 +853,39 @@ Raises:
 # 6) Endpoint para exportar resultados a CSV
 # ——————————————————————————————————————————————————————————————————————
 
+#columnas del CSV exportado por /jobs/{job_id}/results.csv
+EXPORT_CSV_HEADERS = ["title","link","source","publication_date","indicator_count","content_length","sentiment_polarity","entities"]
+
+
+def gzip_stream(chunks):
+    """Comprime en gzip un flujo de trozos de texto sin acumularlo en memoria."""
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = comp.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield comp.flush()
+
+
 @app.get("/jobs/{job_id}/results.csv")
-def export_results_csv(job_id: str, db: Session = Depends(get_db)):
+def export_results_csv(
+    job_id: str,
+    request: Request,
+    chunk_rows: int = Query(500, ge=1, le=10000),
+    gzip: bool = Query(True),
+    db: Session = Depends(get_db),
+):
     """
 Exporta los resultados de un job a CSV mediante un streaming.
 
+Los items se leen del fichero de resultados de uno en uno y se escriben con csv.writer en un buffer
+que se vacia cada chunk_rows filas, asi que la memoria usada no depende del tamanio del job.
+Si el cliente acepta gzip (Accept-Encoding) y no se desactiva con gzip=false, la respuesta se comprime al vuelo.
+
 Args:
     job_id (str): UUID del job.
+    chunk_rows (int): Filas por cada trozo enviado.
+    gzip (bool): Permite comprimir la respuesta con Content-Encoding: gzip.
     db (Session): Sesión de base de datos.
 
 Returns:
@@ -376,26 +896,12 @@ Raises:
     """
     job = db.get(ScrapeJob, job_id) if hasattr(db, "get") \
           else db.query(ScrapeJob).filter_by(id=job_id).first()
-    if not job or job.status != JobStatus.finished:
+    if not job or not results_available(job):
         raise HTTPException(status_code=404, detail="Job no encontrado o no finalizado")
 
-    def iter_csv():
-        headers = ["title","link","source","publication_date","indicator_count","content_length","sentiment_polarity","entities"]
-        yield ",".join(headers) + "\n"
-        with open(job.result_path, encoding="utf-8") as f:
-            data = json.load(f)
-        for it in data:
-            ents = ";".join(f"{e['text']}[{e['label']}]" for e in it.get("entities", []))
-            row = [
-                it.get("title","").replace(",", " "),
-                it.get("link",""),
-                it.get("source",""),
-                it.get("publication_date",""),             
-                str(it.get("indicator_count", 0)),        
-                str(it.get("content_length", 0)),         
-                str(it.get("sentiment_polarity","")),
-                ents
-            ]
-            yield ",".join(row) + "\n"
-
-    return StreamingResponse(iter_csv(), media_type="text/csv")
+    chunks = iter_csv_chunks(iter_results(job.result_path), EXPORT_CSV_HEADERS, chunk_rows)
+    headers = {"Content-Disposition": f'attachment; filename="{job_id}.csv"', "Vary": "Accept-Encoding"}
+    if gzip and "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(gzip_stream(chunks), media_type="text/csv", headers=headers)
+    return StreamingResponse(chunks, media_type="text/csv", headers=headers)
@@ -13,11 +13,13 @@ Attributes:
     running:   El job esta en ejecución actualmente.
     finished:  El job ha finalizado correctamente.
     failed:    El job ha terminado pero con error.
+    cancelled: El job se ha cancelado antes de terminar.
     """
-    pending  = "pending"
-    running  = "running"
-    finished = "finished"
-    failed   = "failed"
+    pending   = "pending"
+    running   = "running"
+    finished  = "finished"
+    failed    = "failed"
+    cancelled = "cancelled"
 
 
 class ScrapeJob(Base):
@@ -48,6 +50,26 @@ Atributos de columna:
     result_path (str):
         Ruta al fichero JSON donde se vuelcan los resultados.  
         Puede ser nulo hasta que el job acabe.
+
+    queued_at (datetime):
+        Momento en que el job entro en la cola (estado pending).
+
+    started_at (datetime):
+        Momento en que un worker lo recogio y empezo el crawl.
+
+    finished_at (datetime):
+        Momento en que termino (finished, failed o cancelled).
+
+    worker (str):
+        Identificador del worker que lo esta ejecutando o lo ejecuto.
+
+    mode (str):
+        Modo del job: "crawl", "index" (solo busqueda en el indice de articulos) o
+        "index_then_crawl" (aciertos del indice y despues un crawl que los completa).
+
+    notices (str):
+        Para los jobs de un lote de avisos (/upload_contracts), JSON id del aviso -> sus terminos, con el
+        que se atribuye cada articulo a sus avisos. Nulo en los jobs normales.
     """
     __tablename__ = "jobs"
     id          = Column(String, primary_key=True, index=True)
@@ -61,3 +83,9 @@ Atributos de columna:
     )
     status      = Column(Enum(JobStatus), default=JobStatus.pending, nullable=False)
     result_path = Column(String, nullable=True)
+    queued_at   = Column(DateTime(timezone=True), nullable=True, index=True)
+    started_at  = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    worker      = Column(String, nullable=True)
+    mode        = Column(String, nullable=True, default="crawl")
+    notices     = Column(String, nullable=True)
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, HttpUrl, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 from datetime import date, datetime
+from .boe import BOE_MAX_BULK_ITEMS
 
 class ScrapeRequest(BaseModel):
     """
@@ -14,10 +15,14 @@ Attributes:
         Fecha del contrato. Debe ser con el formato: `YYYYMMDD`.
     terms (List[str]):
         Lista de terminos de busqueda para el scraper.
+    mode (str):
+        `crawl` (por defecto) lanza un crawl; `index` responde solo con el indice de articulos;
+        `index_then_crawl` guarda los aciertos del indice al momento y los completa con un crawl.
     """
     expediente: str = Field(..., pattern=r"^BOE-[AB]-\d{4}-\d+$")
     date: str  
     terms: List[str]
+    mode: Literal["crawl", "index", "index_then_crawl"] = "crawl"
 
 class JobInfo(BaseModel):
     """
@@ -27,13 +32,38 @@ Attributes:
     id (str):
         UUID que identifica el job.
     status (str):
-        Estado actual del job (`pending`, `running`, `finished`, `failed`).
+        Estado actual del job (`pending`, `running`, `finished`, `failed`, `cancelled`).
     created_at (datetime):
         Marca de tiempo de cuando se creó el job.
+    queued_at (Optional[datetime]):
+        Cuando entró en la cola.
+    started_at (Optional[datetime]):
+        Cuando un worker empezó a ejecutarlo.
+    finished_at (Optional[datetime]):
+        Cuando terminó (`finished`, `failed` o `cancelled`).
+    mode (Optional[str]):
+        Modo del job (`crawl`, `index` o `index_then_crawl`).
     """
     id: str
     status: str
     created_at: datetime
+    queued_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    mode: Optional[str] = None
+
+    @classmethod
+    def from_job(cls, job) -> "JobInfo":
+        """Construye el JobInfo a partir de un ScrapeJob de la base de datos."""
+        return cls(
+            id=job.id,
+            status=job.status.value,
+            created_at=job.created_at,
+            queued_at=job.queued_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+            mode=job.mode or "crawl",
+        )
 
 class ContractDetails(BaseModel):
     """
@@ -54,6 +84,111 @@ Attributes:
     url_pdf: HttpUrl
     organismo: Optional[str]
 
+class ContractLookup(BaseModel):
+    """
+Un contrato a consultar en el BOE.
+
+Attributes:
+    fecha (str):
+        Fecha del sumario en formato `YYYYMMDD`.
+    expediente (str):
+        Identificador BOE del anuncio.
+    """
+    fecha: str = Field(..., pattern=r"^\d{8}$")
+    expediente: str
+
+class BulkContractsRequest(BaseModel):
+    """
+Consulta masiva de contratos del BOE.
+
+Attributes:
+    items (List[ContractLookup]):
+        Pares (fecha, expediente) a resolver (como mucho `BOE_MAX_BULK_ITEMS`, de `BOE_MAX_BULK_DATES` fechas distintas).
+    date_from (Optional[str]):
+        Inicio (`YYYYMMDD`) de un rango de fechas cuyos sumarios se precargan.
+    date_to (Optional[str]):
+        Fin (`YYYYMMDD`, incluido) del rango.
+    expedientes (List[str]):
+        Identificadores sin fecha conocida, que se buscan en todos los sumarios del rango (como mucho `BOE_MAX_BULK_ITEMS`).
+    """
+    items: List[ContractLookup] = Field([], max_length=BOE_MAX_BULK_ITEMS)
+    date_from: Optional[str] = Field(None, pattern=r"^\d{8}$")
+    date_to: Optional[str] = Field(None, pattern=r"^\d{8}$")
+    expedientes: List[str] = Field([], max_length=BOE_MAX_BULK_ITEMS)
+
+class BulkContractResult(BaseModel):
+    """
+Resultado de un contrato en una consulta masiva.
+
+Attributes:
+    expediente (str):
+        Identificador consultado.
+    fecha (Optional[str]):
+        Fecha del sumario en el que se ha buscado (o encontrado, si se buscaba en un rango).
+    found (bool):
+        Si se ha encontrado.
+    contract (Optional[dict]):
+        Mismos campos que `/contracts/{fecha}/{expediente}` (identificador, titulo, url_pdf, organismo).
+    error (Optional[str]):
+        Motivo por el que no se ha encontrado.
+    """
+    expediente: str
+    fecha: Optional[str] = None
+    found: bool
+    contract: Optional[dict] = None
+    error: Optional[str] = None
+
+class BulkContractsResponse(BaseModel):
+    """
+Respuesta de la consulta masiva de contratos.
+
+Attributes:
+    results (List[BulkContractResult]):
+        Un resultado por cada par de `items` y por cada identificador de `expedientes`, en el mismo orden.
+    sumarios (dict):
+        Para cada fecha cargada, el numero de anuncios de su sumario o el error al cargarlo.
+    """
+    results: List[BulkContractResult]
+    sumarios: dict
+
+class BatchNotice(BaseModel):
+    """
+Un aviso de un lote subido a `/upload_contracts`.
+
+Attributes:
+    id (str):
+        SHA-256 del PDF; es el id con el que se atribuyen los articulos (`Item.notices`).
+    filename (str):
+        Nombre del fichero (dentro del ZIP si venia en uno).
+    terms (List[str]):
+        Terminos del aviso tal y como se buscan en el crawl conjunto.
+    notice (Optional[dict]):
+        Metadatos del aviso (adjudicatario, entidad, objeto).
+    error (Optional[str]):
+        Motivo por el que no se ha podido procesar.
+    """
+    id: str
+    filename: str
+    terms: List[str] = []
+    notice: Optional[dict] = None
+    error: Optional[str] = None
+
+class BatchUploadResponse(BaseModel):
+    """
+Respuesta de la subida de un lote de avisos.
+
+Attributes:
+    job (JobInfo):
+        Job unico que busca los terminos de todos los avisos.
+    terms (List[str]):
+        Terminos del job, sin repetidos entre avisos.
+    notices (List[BatchNotice]):
+        Un elemento por PDF recibido, en el orden de subida.
+    """
+    job: JobInfo
+    terms: List[str]
+    notices: List[BatchNotice]
+
 class Item(BaseModel):
     """
 Representa un articulo resultante del scraping que contendra lo siguiente:.
@@ -83,6 +218,8 @@ Attributes:
         Fecha y hora en que se realizo el scraping.
     entities (List[dict]):
         Entidades reconocidas, esto lo hacemos con NLP (pueden ser: personas, organizaciones, etc.).
+    notices (List[str]):
+        En los jobs de un lote de avisos, ids de los avisos cuyos terminos aparecen en el articulo.
     """
     title: str
     link: HttpUrl
@@ -96,4 +233,5 @@ Attributes:
     risk_score: Optional[int] = None
     alert_level: Optional[str] = None
     date_scraped: datetime
-    entities: List[dict]    
\ No newline at end of file
+    entities: List[dict]
+    notices: List[str] = []    
\ No newline at end of file
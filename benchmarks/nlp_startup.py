@@ -0,0 +1,85 @@
+"""
+Benchmark del tiempo de arranque de un job con y sin el servidor NLP persistente.
+
+Mide lo que paga cada proceso ``scrapy crawl`` antes de descargar la primera pagina:
+    - en frio: importar y cargar spaCy + pysentimiento en el propio proceso.
+    - en caliente: conectar con el servidor NLP y hacer una primera peticion de NER y sentimiento.
+
+Cada medida se hace en un subproceso nuevo, igual que un job real.
+
+Uso (desde la raiz del proyecto):
+    python benchmarks/nlp_startup.py --runs 3
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE = "El Ministerio de Defensa adjudica a Indra un contrato investigado por presunta malversación en Madrid."
+
+COLD = f"""
+import time
+t0 = time.perf_counter()
+from corruption_detector.nlp_server import load_spacy
+from pysentimiento import create_analyzer
+nlp = load_spacy()
+analyzer = create_analyzer(task="sentiment", lang="es")
+nlp({SAMPLE!r}).ents
+analyzer.predict({SAMPLE!r})
+print(time.perf_counter() - t0)
+"""
+
+WARM = f"""
+import time
+t0 = time.perf_counter()
+from corruption_detector.nlp_server import NLPClient
+client = NLPClient.connect()
+assert client is not None, "servidor NLP no disponible"
+client.ner([{SAMPLE!r}])
+client.sentiment([{SAMPLE!r}])
+print(time.perf_counter() - t0)
+"""
+
+
+def run(code: str) -> float:
+    """Ejecuta el fragmento en un interprete nuevo y devuelve los segundos que imprime."""
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="repeticiones de cada medida")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    from corruption_detector.nlp_server import NLPClient, start_server_process
+
+    cold = [run(COLD) for _ in range(args.runs)]
+
+    proc = None
+    client = NLPClient.connect()
+    if client:
+        client.close()
+    else:
+        t0 = time.perf_counter()
+        proc = start_server_process()
+        print(f"servidor NLP arrancado en {time.perf_counter() - t0:.2f}s (coste unico)")
+    try:
+        warm = [run(WARM) for _ in range(args.runs)]
+    finally:
+        if proc:
+            proc.terminate()
+
+    cold_med, warm_med = statistics.median(cold), statistics.median(warm)
+    print(f"arranque en frio (carga en proceso): mediana {cold_med:.2f}s  {['%.2f' % c for c in cold]}")
+    print(f"arranque en caliente (servidor NLP): mediana {warm_med:.2f}s  {['%.2f' % w for w in warm]}")
+    print(f"tiempo ahorrado por job: {cold_med - warm_med:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark de la normalizacion de terminos y la extraccion de campos de los avisos de adjudicacion.
+
+Compara, sobre un corpus de avisos de ejemplo generado aqui mismo, las versiones anteriores de
+``backend.contract_processor`` con las actuales:
+    - normalize_search_term: una expresion por sufijo construida en cada llamada frente a una sola
+      alternancia compilada al importar.
+    - extract_raw_data: tres re.search con el patron como cadena (pasando por la cache de ``re``) frente a
+      NoticeFieldScanner con los patrones ya compilados.
+    - lectura por paginas (extract_notice_pages): volver a buscar en todo el texto acumulado tras cada
+      pagina frente a ``NoticeFieldScanner.feed``, que solo mira el texto nuevo.
+
+Antes de medir comprueba que las dos versiones dan los mismos resultados.
+
+Uso (desde la raiz del proyecto):
+    python benchmarks/notice_regex.py --notices 200 --runs 5
+"""
+
+import argparse
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+FILLER = [
+    "El plazo de ejecución será de doce meses a contar desde la formalización del contrato.",
+    "Procedimiento abierto con varios criterios de adjudicación y tramitación ordinaria.",
+    "Las ofertas se presentarán a través de la Plataforma de Contratación del Sector Público.",
+    "Se valorará la reducción del plazo de entrega y las mejoras en el servicio de mantenimiento.",
+    "Lugar de ejecución: término municipal, incluidos los núcleos de población dispersos.",
+]
+COMPANIES = ["Construcciones Norte", "Limpiezas Integrales del Sur", "Indra Sistemas", "Servicios Sanitarios Unidos",
+             "Ferrovial Servicios", "Tecnologías de la Información Levante", "Obras y Viales", "Acme Ibérica"]
+SUFFIXES = ["S.L.", "S.A.", "S.L.U.", "S.A.U", ", S.L.", "UTE", "", "SLNE", ", S.L.P.", "GmbH", "Inc."]
+ENTITIES = ["Ayuntamiento de {}", "Diputación Provincial de {}", "Consejería de Sanidad de {}", "Ministerio de Defensa"]
+CITIES = ["Madrid", "Sevilla", "Valencia", "Zaragoza", "Ourense", "Cáceres"]
+
+
+def make_notice(rng: random.Random, i: int) -> list:
+    """Genera un aviso como lista de paginas, con los campos en las primeras paginas o ausentes."""
+    company = f"{rng.choice(COMPANIES)} {i} {rng.choice(SUFFIXES)}".strip()
+    entity = rng.choice(ENTITIES).format(rng.choice(CITIES))
+    fields = [
+        f"1. Entidad adjudicadora: {entity}",
+        f"2. Objeto del contrato: Servicio número {i} de mantenimiento",
+        f"6. Formalización del contrato:\n a) Fecha de adjudicación: {rng.randint(1, 28)}/0{rng.randint(1, 9)}/2024",
+        f" c) Adjudicatario: {company} (NIF B{rng.randint(1000000, 9999999)}{rng.randint(0, 9)})",
+        f" d) Importe total: {rng.randint(10, 999)}.{rng.randint(100, 999)},00 euros.",
+    ]
+    #en uno de cada diez avisos falta el adjudicatario: hay que recorrer el documento entero
+    if i % 10 == 0:
+        fields.pop(3)
+    n_pages = rng.randint(5, 40)
+    pages = [[] for _ in range(n_pages)]
+    first = rng.choice([0, 0, 0, 1, 2])
+    for k, field in enumerate(fields):
+        pages[min(first + k // 3, n_pages - 1)].append(field)
+    for page in pages:
+        page.extend(rng.choice(FILLER) for _ in range(40))
+        rng.shuffle(page)
+    return ["\n".join(p) + "\n" for p in pages]
+
+
+# ——————————————————————————————————————————————————————————————————————
+# Versiones anteriores
+# ——————————————————————————————————————————————————————————————————————
+def legacy_normalize_search_term(term: str, suffixes) -> str:
+    for suf in suffixes:
+        term = re.sub(rf"(,\s*)?{re.escape(suf)}\.?$", "", term, flags=re.IGNORECASE)
+    return term.strip()
+
+
+def legacy_extract_raw_data(text: str) -> dict:
+    r = {}
+    m = re.search(r"Adjudicatario\s*[:\n]\s*([^\n]+?)(?=\n|Importes de Adjudicación|$)", text, re.IGNORECASE)
+    if m:
+        r["adjudicatario_nombre"] = m.group(1).strip()
+    m = re.search(r"Entidad Adjudicadora\s*[:\n]\s*([^\n]+?)(?=\n|Objeto del Contrato|$)", text, re.IGNORECASE)
+    if m:
+        r["entidad_adjudicadora"] = m.group(1).strip()
+    m = re.search(r"Objeto del Contrato\s*[:\n]\s*([^\n]+?)(?=\n|Descripción|Valor estimado|$)", text, re.IGNORECASE)
+    if m:
+        r["objeto_contrato"] = m.group(1).strip()
+    return r
+
+
+def legacy_windowed(pages: list, fields) -> dict:
+    for k in range(1, len(pages) + 1):
+        raw = legacy_extract_raw_data("\n".join(pages[:k]).strip())
+        if all(f in raw for f in fields):
+            break
+    return raw
+
+
+def windowed(pages: list, fields, scanner_cls, patterns=None) -> dict:
+    scanner = scanner_cls(patterns)
+    for k in range(1, len(pages) + 1):
+        scanner.feed("\n".join(pages[:k]), final=k == len(pages))
+        if scanner.has(fields):
+            break
+    return {f: scanner.found[f] for f in fields if f in scanner.found}
+
+
+def timeit(fn, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+
+def report(name: str, old: float, new: float):
+    print(f"{name:<28} antes {old * 1000:9.2f} ms   ahora {new * 1000:9.2f} ms   x{old / new:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notices", type=int, default=200, help="avisos del corpus")
+    parser.add_argument("--runs", type=int, default=5, help="repeticiones de cada medida")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    from backend.contract_processor import (
+        NOTICE_FIELDS, NOTICE_FIELD_PATTERNS, SUFFIXES_TO_STRIP, NoticeFieldScanner, extract_raw_data,
+        normalize_search_term,
+    )
+    #los tres campos de la version anterior, compilados una vez
+    core_regexes = {f: re.compile(NOTICE_FIELD_PATTERNS[f], re.IGNORECASE) for f in NOTICE_FIELDS}
+
+    rng = random.Random(args.seed)
+    corpus = [make_notice(rng, i) for i in range(args.notices)]
+    texts = ["\n".join(pages).strip() for pages in corpus]
+    names = [f"{rng.choice(COMPANIES)} {rng.choice(SUFFIXES)}".strip() for _ in range(args.notices * 20)]
+
+    #mismos resultados antes de medir
+    assert [legacy_normalize_search_term(n, SUFFIXES_TO_STRIP) for n in names] == [normalize_search_term(n) for n in names]
+    core = lambda raw: {f: raw[f] for f in NOTICE_FIELDS if f in raw}
+    assert [legacy_extract_raw_data(t) for t in texts] == [core(extract_raw_data(t)) for t in texts]
+    assert [legacy_windowed(p, NOTICE_FIELDS) for p in corpus] == [windowed(p, NOTICE_FIELDS, NoticeFieldScanner) for p in corpus]
+    print(f"{len(corpus)} avisos, {sum(map(len, corpus))} paginas, {sum(map(len, texts)) // 1024} KB de texto")
+
+    report("normalize_search_term",
+           timeit(lambda: [legacy_normalize_search_term(n, SUFFIXES_TO_STRIP) for n in names], args.runs),
+           timeit(lambda: [normalize_search_term(n) for n in names], args.runs))
+    report("extract_raw_data (3 campos)",
+           timeit(lambda: [legacy_extract_raw_data(t) for t in texts], args.runs),
+           timeit(lambda: [NoticeFieldScanner(core_regexes).scan(t) for t in texts], args.runs))
+    report("lectura por paginas",
+           timeit(lambda: [legacy_windowed(p, NOTICE_FIELDS) for p in corpus], args.runs),
+           timeit(lambda: [windowed(p, NOTICE_FIELDS, NoticeFieldScanner, core_regexes) for p in corpus], args.runs))
+    new_all = timeit(lambda: [extract_raw_data(t) for t in texts], args.runs)
+    print(f"{'extract_raw_data (6 campos)':<28} ahora {new_all * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
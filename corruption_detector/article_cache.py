@@ -0,0 +1,174 @@
+"""
+Cache local de articulos compartida entre jobs.
+
+Todos los jobs recorren las mismas portadas de SOURCES y, casi siempre, los mismos articulos: lo
+unico que cambia son los terminos del contrato. Aqui guardamos en SQLite, por URL canonica, lo que
+extraemos de cada articulo (titulo, parrafos, autor, fecha y el texto ya normalizado) y la lista de
+enlaces de cada portada. Un job que encuentra un articulo fresco en la cache solo tiene que pasarle
+el matcher de terminos, sin descargar ni renderizar nada.
+
+Las entradas caducan (ARTICLE_CACHE_TTL / ARTICLE_CACHE_LISTING_TTL). Si un articulo caducado tiene
+ETag o Last-Modified, el spider lo revalida con una peticion condicional y, si el servidor contesta
+304, se sigue usando la copia guardada.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+#la clave de la cache es la forma canonica de la URL (sin seguimiento ni variante AMP); se reexporta aqui
+#porque el resto del proyecto la importaba de este modulo
+from corruption_detector.urlnorm import canonical_url
+
+
+@dataclass
+class CachedArticle:
+    """
+Articulo guardado en la cache.
+
+Attributes:
+    url: URL canonica.
+    title, paragraphs, author, pub_date: Lo que devolvio extract_article_content (con la fecha ya resuelta).
+    norm_text: Titulo + contenido normalizados con MultiSourceSpider.normalize.
+    etag, last_modified: Validadores HTTP de la respuesta original (si los habia).
+    fetched_at: Momento (epoch) en que se descargo o revalido por ultima vez.
+    fresh: Si la entrada sigue dentro de su TTL.
+    """
+    url: str
+    title: str
+    paragraphs: List[str]
+    author: str
+    pub_date: str
+    norm_text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+    fresh: bool
+
+    def validators(self) -> dict:
+        """Cabeceras para revalidar la entrada con una peticion condicional."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ArticleCache:
+    """
+Almacen SQLite de articulos y portadas.
+
+Args:
+    path: Ruta del fichero SQLite.
+    ttl: Segundos que un articulo se considera fresco.
+    listing_ttl: Segundos que se reutiliza la lista de enlaces de una portada.
+    """
+
+    def __init__(self, path: str, ttl: float = 86400, listing_ttl: float = 3600):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.listing_ttl = listing_ttl
+        self._lock = threading.Lock()
+        #varios workers pueden compartir la cache, asi que usamos WAL y esperamos si la base esta ocupada
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                url           TEXT PRIMARY KEY,
+                title         TEXT NOT NULL,
+                paragraphs    TEXT NOT NULL,
+                author        TEXT,
+                pub_date      TEXT,
+                norm_text     TEXT NOT NULL,
+                etag          TEXT,
+                last_modified TEXT,
+                fetched_at    REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS listings (
+                url        TEXT PRIMARY KEY,
+                links      TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["ArticleCache"]:
+        """Crea la cache con los ajustes ARTICLE_CACHE_* o devuelve None si esta desactivada."""
+        if not settings.getbool("ARTICLE_CACHE_ENABLED", True):
+            return None
+        return cls(
+            settings.get("ARTICLE_CACHE_PATH"),
+            ttl=settings.getfloat("ARTICLE_CACHE_TTL", 86400),
+            listing_ttl=settings.getfloat("ARTICLE_CACHE_LISTING_TTL", 3600),
+        )
+
+    # ——————————————————————————————————————————————————————————————————————
+    # Articulos
+    # ——————————————————————————————————————————————————————————————————————
+    def get(self, url: str) -> Optional[CachedArticle]:
+        """Devuelve el articulo guardado para esa URL (fresco o caducado) o None si no esta."""
+        key = canonical_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, paragraphs, author, pub_date, norm_text, etag, last_modified, fetched_at "
+                "FROM articles WHERE url = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        title, paragraphs, author, pub_date, norm_text, etag, last_modified, fetched_at = row
+        return CachedArticle(
+            url=key, title=title, paragraphs=json.loads(paragraphs), author=author or "",
+            pub_date=pub_date or "", norm_text=norm_text, etag=etag, last_modified=last_modified,
+            fetched_at=fetched_at, fresh=time.time() - fetched_at < self.ttl,
+        )
+
+    def put(self, url: str, title: str, paragraphs: List[str], author: str, pub_date: str,
+            norm_text: str, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        """Guarda (o reemplaza) un articulo recien extraido."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (canonical_url(url), title, json.dumps(paragraphs, ensure_ascii=False), author or "",
+                 pub_date or "", norm_text, etag, last_modified, time.time()),
+            )
+            self._conn.commit()
+
+    def touch(self, url: str):
+        """Renueva el TTL de un articulo tras una revalidacion con respuesta 304."""
+        with self._lock:
+            self._conn.execute("UPDATE articles SET fetched_at = ? WHERE url = ?", (time.time(), canonical_url(url)))
+            self._conn.commit()
+
+    # ——————————————————————————————————————————————————————————————————————
+    # Portadas
+    # ——————————————————————————————————————————————————————————————————————
+    def get_listing(self, url: str) -> Optional[List[Tuple[str, str]]]:
+        """Devuelve los enlaces (title, link) de una portada si siguen frescos."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT links, fetched_at FROM listings WHERE url = ?", (canonical_url(url),)
+            ).fetchone()
+        if row is None or time.time() - row[1] >= self.listing_ttl:
+            return None
+        return [tuple(link) for link in json.loads(row[0])]
+
+    def put_listing(self, url: str, links: List[Tuple[str, str]]):
+        """Guarda los enlaces (title, link absoluto) extraidos de una portada."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO listings VALUES (?, ?, ?)",
+                (canonical_url(url), json.dumps(links, ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
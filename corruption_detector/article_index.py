@@ -0,0 +1,208 @@
+"""
+Indice de texto completo de los articulos scrapeados.
+
+Cada articulo que extrae el spider (en un job normal o en el ingester de fondo) se guarda aqui con
+su texto ya normalizado (``MultiSourceSpider.normalize``) en una tabla SQLite con un indice FTS5.
+Asi una busqueda con los terminos de un contrato y los indicadores de corrupcion se resuelve con una
+consulta al indice en milisegundos, sin tener que lanzar un crawl de varios minutos.
+
+Junto al texto guardamos el resultado de sentimiento cuando ya se ha calculado (el ingester lo
+calcula para todos los articulos), para que la busqueda pueda puntuar el riesgo sin cargar el modelo.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+from corruption_detector.article_cache import canonical_url
+
+
+@dataclass
+class IndexedArticle:
+    """
+Articulo guardado en el indice.
+
+Attributes:
+    url: URL del articulo.
+    source: Dominio de la fuente (clave de SOURCES).
+    title, author, pub_date, preview: Metadatos del articulo.
+    norm_text: Titulo + contenido normalizados.
+    sentiment: Etiqueta de sentimiento ('POS', 'NEG', 'NEU') o None si aun no se ha calculado.
+    pos, neg: Probabilidades positiva y negativa.
+    indexed_at: Momento (epoch) en que se indexo.
+    """
+    url: str
+    source: str
+    title: str
+    author: str
+    pub_date: str
+    preview: str
+    norm_text: str
+    sentiment: Optional[str]
+    pos: float
+    neg: float
+    indexed_at: float
+
+
+def phrase_query(terms: Iterable[str]) -> str:
+    """
+Construye una consulta FTS5 que encuentra cualquiera de los terminos como frase exacta.
+
+Args:
+    terms: Terminos ya normalizados (minusculas, sin acentos ni puntuacion).
+
+Returns:
+    str: p. ej. '"licitacion amanada" OR "cohecho"' (vacio si no hay terminos).
+    """
+    phrases = []
+    for term in terms:
+        term = term.replace('"', " ").strip()
+        if term:
+            phrases.append(f'"{term}"')
+    return " OR ".join(sorted(set(phrases)))
+
+
+class ArticleIndex:
+    """
+Indice SQLite FTS5 de articulos.
+
+Args:
+    path: Ruta del fichero SQLite.
+    """
+
+    _COLUMNS = "url, source, title, author, pub_date, preview, norm_text, sentiment, pos, neg, indexed_at"
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        #el ingester, los workers y el backend comparten el indice: WAL para que las lecturas no esperen a las escrituras
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                id         INTEGER PRIMARY KEY,
+                url        TEXT NOT NULL UNIQUE,
+                source     TEXT,
+                title      TEXT,
+                author     TEXT,
+                pub_date   TEXT,
+                preview    TEXT,
+                norm_text  TEXT NOT NULL,
+                sentiment  TEXT,
+                pos        REAL,
+                neg        REAL,
+                indexed_at REAL NOT NULL
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+                norm_text, content='docs', content_rowid='id', tokenize='unicode61'
+            );
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["ArticleIndex"]:
+        """Crea el indice con los ajustes ARTICLE_INDEX_* o devuelve None si esta desactivado."""
+        if not settings.getbool("ARTICLE_INDEX_ENABLED", True):
+            return None
+        return cls(settings.get("ARTICLE_INDEX_PATH"))
+
+    # ——————————————————————————————————————————————————————————————————————
+    # Escritura
+    # ——————————————————————————————————————————————————————————————————————
+    def add(self, url: str, source: str, title: str, author: str, pub_date: str,
+            preview: str, norm_text: str) -> bool:
+        """
+    Indexa (o actualiza) un articulo. Si ya estaba con el mismo texto no se toca, y si el texto ha
+    cambiado se descarta el sentimiento guardado porque ya no corresponde.
+
+    Returns:
+        bool: True si el indice ha cambiado.
+        """
+        key = canonical_url(url)
+        with self._lock:
+            row = self._conn.execute("SELECT id, norm_text FROM docs WHERE url = ?", (key,)).fetchone()
+            if row is not None and row[1] == norm_text:
+                return False
+            if row is not None:
+                #en una tabla FTS5 con contenido externo hay que borrar la entrada vieja pasando su texto
+                self._conn.execute("INSERT INTO docs_fts(docs_fts, rowid, norm_text) VALUES('delete', ?, ?)", row)
+                self._conn.execute(
+                    "UPDATE docs SET source=?, title=?, author=?, pub_date=?, preview=?, norm_text=?, "
+                    "sentiment=NULL, pos=NULL, neg=NULL, indexed_at=? WHERE id=?",
+                    (source, title, author or "", pub_date or "", preview, norm_text, time.time(), row[0]),
+                )
+                doc_id = row[0]
+            else:
+                cur = self._conn.execute(
+                    "INSERT INTO docs (url, source, title, author, pub_date, preview, norm_text, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, source, title, author or "", pub_date or "", preview, norm_text, time.time()),
+                )
+                doc_id = cur.lastrowid
+            self._conn.execute("INSERT INTO docs_fts(rowid, norm_text) VALUES (?, ?)", (doc_id, norm_text))
+            self._conn.commit()
+        return True
+
+    def set_sentiment(self, url: str, score):
+        """Guarda el SentimentScore calculado para un articulo ya indexado."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE docs SET sentiment=?, pos=?, neg=? WHERE url=?",
+                (score.output, score.probas.get("POS", 0.0), score.probas.get("NEG", 0.0), canonical_url(url)),
+            )
+            self._conn.commit()
+
+    def has_sentiment(self, url: str) -> bool:
+        """Indica si el articulo esta indexado y ya tiene su sentimiento calculado."""
+        with self._lock:
+            row = self._conn.execute("SELECT sentiment FROM docs WHERE url = ?", (canonical_url(url),)).fetchone()
+        return row is not None and row[0] is not None
+
+    # ——————————————————————————————————————————————————————————————————————
+    # Consultas
+    # ——————————————————————————————————————————————————————————————————————
+    def _article(self, row) -> IndexedArticle:
+        url, source, title, author, pub_date, preview, norm_text, sentiment, pos, neg, indexed_at = row
+        return IndexedArticle(
+            url=url, source=source or "", title=title or "", author=author or "", pub_date=pub_date or "",
+            preview=preview or "", norm_text=norm_text, sentiment=sentiment, pos=pos or 0.0, neg=neg or 0.0,
+            indexed_at=indexed_at,
+        )
+
+    def search(self, contract_terms: Iterable[str], indicators: Iterable[str],
+               limit: int = 1000) -> Iterator[IndexedArticle]:
+        """
+    Devuelve los articulos que contienen al menos un termino de contrato y al menos un indicador.
+
+    Args:
+        contract_terms: Terminos del contrato, normalizados.
+        indicators: Indicadores de corrupcion, normalizados.
+        limit: Numero maximo de candidatos, por relevancia (bm25).
+        """
+        contract_q = phrase_query(contract_terms)
+        indicator_q = phrase_query(indicators)
+        if not contract_q or not indicator_q:
+            return iter(())
+        query = f"({contract_q}) AND ({indicator_q})"
+        cols = ", ".join(f"d.{c.strip()}" for c in self._COLUMNS.split(","))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {cols} FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid "
+                f"WHERE docs_fts MATCH ? ORDER BY bm25(docs_fts) LIMIT ?",
+                (query, limit),
+            ).fetchall()
+        return (self._article(r) for r in rows)
+
+    def count(self) -> int:
+        """Numero de articulos indexados."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,171 @@
+"""
+Capa de Playwright del spider: bloqueo de recursos, pool de contextos y reciclado de paginas.
+
+- Bloqueo de recursos (``abort_request``, que se registra como PLAYWRIGHT_ABORT_REQUEST): para leer un
+  articulo solo necesitamos el documento y los scripts que pintan el contenido, asi que abortamos imagenes,
+  fuentes, hojas de estilo, audio/video... y cualquier peticion a dominios de publicidad o analitica. Cada
+  modulo de ``sources`` puede cambiar los tipos bloqueados con ``BLOCKED_RESOURCE_TYPES``.
+- Pool de contextos: cada fuente se asigna a uno de PLAYWRIGHT_CONTEXT_POOL_SIZE contextos (por defecto uno
+  por nucleo), en lugar de pasar todo por un unico contexto de cuatro pestañas.
+- Reciclado de paginas (``PagePool``): cuando el spider termina con una pagina la devuelve al pool de su
+  contexto y la siguiente peticion renderizada de ese contexto navega en ella, en lugar de cerrar la pestaña
+  y abrir otra. Cada pagina se cierra tras PLAYWRIGHT_PAGE_MAX_USES usos para no acumular memoria.
+"""
+
+import functools
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+#tipos de recurso de Playwright que abortamos si la fuente no dice otra cosa (se dejan document, script, xhr y fetch)
+DEFAULT_BLOCKED_RESOURCE_TYPES = frozenset({
+    "image", "media", "font", "stylesheet", "texttrack", "manifest", "eventsource", "websocket", "other",
+})
+
+#dominios de publicidad, analitica y widgets de terceros (se bloquea tambien cualquier subdominio)
+BLOCKED_HOSTS = (
+    "doubleclick.net", "googlesyndication.com", "googletagservices.com", "googletagmanager.com",
+    "google-analytics.com", "adservice.google.com", "amazon-adsystem.com", "adnxs.com", "criteo.com",
+    "criteo.net", "rubiconproject.com", "pubmatic.com", "smartadserver.com", "taboola.com", "outbrain.com",
+    "scorecardresearch.com", "chartbeat.com", "chartbeat.net", "hotjar.com", "quantserve.com",
+    "facebook.net", "connect.facebook.net", "twitter.com", "platform.twitter.com", "tiktok.com",
+)
+
+
+def url_host(url: str) -> str:
+    """Host de una URL en minusculas ("" si no tiene)."""
+    return (urlsplit(url).hostname or "").lower()
+
+
+def match_domain(host: str, domains) -> Optional[str]:
+    """Devuelve el dominio de ``domains`` al que pertenece host (el mismo o un subdominio), o None."""
+    for domain in domains:
+        if host == domain or host.endswith("." + domain):
+            return domain
+    return None
+
+
+class ResourcePolicy:
+    """
+Decide que peticiones de una pagina renderizada se abortan.
+
+Args:
+    sources: Dominio -> modulo de la fuente (SOURCES del spider).
+    blocked_types: Tipos de recurso bloqueados por defecto.
+    blocked_hosts: Dominios cuyas peticiones se bloquean siempre.
+    """
+
+    def __init__(self, sources: dict, blocked_types=DEFAULT_BLOCKED_RESOURCE_TYPES, blocked_hosts=BLOCKED_HOSTS):
+        self.default_types = frozenset(blocked_types)
+        self.blocked_hosts = tuple(blocked_hosts)
+        self.source_types = {
+            domain: frozenset(getattr(module, "BLOCKED_RESOURCE_TYPES", self.default_types))
+            for domain, module in sources.items()
+        }
+
+    def blocked_types(self, page_url: str) -> frozenset:
+        """Tipos bloqueados para una pagina, segun la fuente a la que pertenece."""
+        domain = match_domain(url_host(page_url), self.source_types)
+        return self.source_types[domain] if domain else self.default_types
+
+    def should_abort(self, request) -> bool:
+        """
+    Si hay que abortar una peticion de Playwright.
+
+    Args:
+        request (playwright.async_api.Request): Peticion que va a hacer el navegador.
+        """
+        if match_domain(url_host(request.url), self.blocked_hosts):
+            return True
+        if request.resource_type == "document":
+            return False
+        try:
+            page_url = request.frame.url
+        except Exception:
+            #peticiones de service workers: no tienen frame
+            page_url = ""
+        return request.resource_type in self.blocked_types(page_url)
+
+
+@functools.lru_cache(maxsize=1)
+def default_policy() -> ResourcePolicy:
+    #importamos SOURCES aqui para no crear un import circular con el spider
+    from corruption_detector.spiders.corruption_spider import SOURCES
+    return ResourcePolicy(SOURCES)
+
+
+def abort_request(request) -> bool:
+    """Funcion para PLAYWRIGHT_ABORT_REQUEST: aplica la ResourcePolicy de las fuentes del spider."""
+    return default_policy().should_abort(request)
+
+
+class PagePool:
+    """
+Paginas de Playwright libres, por contexto, para reutilizarlas entre peticiones.
+
+Args:
+    contexts: Numero de contextos entre los que se reparten las fuentes.
+    max_uses: Navegaciones tras las que una pagina se cierra en lugar de reciclarse.
+    max_idle: Paginas libres que se guardan como mucho por contexto (las demas se cierran).
+    """
+
+    def __init__(self, contexts: int = 1, max_uses: int = 20, max_idle: int = 4):
+        self.contexts = max(1, contexts)
+        self.max_uses = max_uses
+        self.max_idle = max_idle
+        self._idle: Dict[str, List] = {}
+        self._uses: Dict[int, int] = {}
+        self._slots: Dict[str, int] = {}
+
+    @classmethod
+    def from_settings(cls, settings) -> "PagePool":
+        """
+    Crea el pool con PLAYWRIGHT_CONTEXT_POOL_SIZE y PLAYWRIGHT_PAGE_MAX_USES. Las paginas libres ocupan sitio en el
+    limite PLAYWRIGHT_MAX_PAGES_PER_CONTEXT de scrapy-playwright, asi que guardamos como mucho una menos: siempre
+    queda un hueco para la peticion que llego cuando no habia ninguna libre y espera a abrir pagina.
+        """
+        return cls(
+            contexts=settings.getint("PLAYWRIGHT_CONTEXT_POOL_SIZE", 1),
+            max_uses=settings.getint("PLAYWRIGHT_PAGE_MAX_USES", 20),
+            max_idle=settings.getint("PLAYWRIGHT_MAX_PAGES_PER_CONTEXT", 4) - 1,
+        )
+
+    def context_for(self, domain: str) -> str:
+        """Nombre del contexto de una fuente: las fuentes se reparten por orden de llegada entre los contextos."""
+        slot = self._slots.setdefault(domain, len(self._slots) % self.contexts)
+        return f"pool-{slot}"
+
+    def acquire(self, context: str):
+        """Devuelve una pagina libre y abierta de ese contexto, o None si no hay ninguna."""
+        idle = self._idle.get(context)
+        while idle:
+            page = idle.pop()
+            if not page.is_closed():
+                return page
+            self._uses.pop(id(page), None)
+        return None
+
+    async def release(self, page, context: Optional[str]):
+        """Devuelve una pagina al pool de su contexto o la cierra si ya se ha usado max_uses veces."""
+        if page.is_closed():
+            self._uses.pop(id(page), None)
+            return
+        uses = self._uses[id(page)] = self._uses.get(id(page), 0) + 1
+        idle = self._idle.setdefault(context, []) if context else None
+        if idle is None or uses >= self.max_uses or len(idle) >= self.max_idle:
+            #con el pool lleno la cerramos, para liberar su hueco en el contexto
+            self._uses.pop(id(page), None)
+            await page.close()
+            return
+        idle.append(page)
+
+    def idle_count(self) -> int:
+        return sum(len(pages) for pages in self._idle.values())
+
+    async def close(self):
+        """Cierra las paginas libres (al cerrar el spider)."""
+        for pages in self._idle.values():
+            for page in pages:
+                if not page.is_closed():
+                    await page.close()
+        self._idle.clear()
+        self._uses.clear()
@@ -0,0 +1,110 @@
+"""
+Canal local de eventos de los jobs de scraping.
+
+Los workers de la cola (y la extension ``JobEventsExtension`` dentro de cada crawl) publican aqui
+los cambios de estado, el progreso por fuente y los lotes de resultados de cada job. El backend
+escucha en la misma direccion (``backend.events.EventBroker``) y los reenvia a los clientes
+conectados a ``/jobs/{job_id}/events``.
+
+El canal es ``multiprocessing.connection`` sobre un socket Unix (o una named pipe en Windows), igual
+que el servidor NLP, con la misma proteccion: socket en el directorio privado del usuario y clave
+CD_EVENTS_AUTHKEY o la aleatoria de la instalacion (``corruption_detector.ipc``). Si el backend no esta
+escuchando los eventos simplemente se descartan: el estado del job sigue estando en la base de datos.
+"""
+
+import logging
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from typing import Optional
+
+from corruption_detector import ipc
+
+logger = logging.getLogger(__name__)
+
+#segundos que esperamos antes de reintentar la conexion con el backend tras un fallo
+RECONNECT_DELAY = 5.0
+
+
+def get_address() -> str:
+    """Direccion del canal de eventos: la variable de entorno CD_EVENTS_ADDRESS o un socket en el directorio privado."""
+    return ipc.channel_address("events", "CD_EVENTS_ADDRESS")
+
+
+def get_authkey() -> bytes:
+    """Clave compartida entre el backend y los workers: CD_EVENTS_AUTHKEY o la clave aleatoria de la instalacion."""
+    return ipc.channel_authkey("events", "CD_EVENTS_AUTHKEY")
+
+
+class EventPublisher:
+    """
+Cliente del canal de eventos. Se conecta bajo demanda, se reconecta si el backend se reinicia y
+nunca lanza excepciones al publicar: si no hay nadie escuchando el evento se pierde.
+
+Args:
+    address: Direccion del backend (por defecto get_address()).
+    """
+
+    def __init__(self, address: Optional[str] = None):
+        self.address = address
+        self._conn = None
+        self._lock = threading.Lock()
+        self._retry_at = 0.0
+
+    def _connect(self):
+        if self._conn is not None or time.monotonic() < self._retry_at:
+            return self._conn
+        try:
+            self.address = self.address or get_address()
+            self._conn = Client(self.address, authkey=get_authkey())
+        except (OSError, EOFError, AuthenticationError) as e:
+            logger.debug(f"Canal de eventos no disponible en {self.address}: {e}")
+            self._retry_at = time.monotonic() + RECONNECT_DELAY
+        return self._conn
+
+    def publish(self, job_id: str, event: str, data: dict):
+        """
+    Publica un evento de un job.
+
+    Args:
+        job_id: UUID del job.
+        event: Tipo de evento ("status", "progress", "items", ...).
+        data: Contenido serializable del evento.
+        """
+        if not job_id:
+            return
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.send((job_id, event, data))
+            except (OSError, EOFError, ValueError) as e:
+                logger.debug(f"Error publicando el evento {event} del job {job_id}: {e}")
+                self._close()
+                self._retry_at = time.monotonic() + RECONNECT_DELAY
+
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+        self._conn = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+#publicador compartido por todo el proceso (el worker y las extensiones de sus crawls)
+_publisher = None
+
+
+def get_publisher() -> EventPublisher:
+    """Devuelve el EventPublisher de este proceso, creandolo la primera vez."""
+    global _publisher
+    if _publisher is None:
+        _publisher = EventPublisher()
+    return _publisher
@@ -0,0 +1,108 @@
+"""
+Extensiones de Scrapy del proyecto.
+
+- JobEventsExtension: publica en el canal de eventos (``corruption_detector.events``) el progreso de
+  un crawl y los items en cuanto se escriben, para que el backend los empuje por ``/jobs/{job_id}/events``.
+"""
+
+from collections import Counter
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from itemadapter import ItemAdapter
+
+from corruption_detector.events import get_publisher
+
+
+class JobEventsExtension:
+    """
+Escucha las señales del crawler y publica eventos del job al que pertenece el spider.
+
+Solo se activa para spiders con atributo ``job_id`` (los que lanza la cola de jobs). Publica:
+    - progress: paginas de listado procesadas por fuente (``spider._pages_done``), articulos
+      descargados por fuente e items encontrados, como mucho una vez cada JOB_EVENTS_INTERVAL segundos.
+    - items: los items ya procesados por los pipelines, en lotes de hasta JOB_EVENTS_BATCH_SIZE.
+    - closed: cuando el spider termina, con el motivo.
+
+Args:
+    interval: Segundos entre eventos de progreso y vaciados de items.
+    batch_size: Items maximos por evento "items".
+    """
+
+    def __init__(self, interval: float = 1.0, batch_size: int = 20):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.publisher = get_publisher()
+        self.job_id = None
+        self.spider = None
+        self._items = []
+        self._item_count = 0
+        self._articles = Counter()
+        self._last_progress = None
+        self._loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("JOB_EVENTS_ENABLED", True):
+            raise NotConfigured
+        ext = cls(
+            interval=crawler.settings.getfloat("JOB_EVENTS_INTERVAL", 1.0),
+            batch_size=crawler.settings.getint("JOB_EVENTS_BATCH_SIZE", 20),
+        )
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        return ext
+
+    def spider_opened(self, spider):
+        from twisted.internet import task
+
+        self.job_id = getattr(spider, "job_id", None)
+        if not self.job_id:
+            return
+        self.spider = spider
+        self._loop = task.LoopingCall(self.tick)
+        self._loop.start(self.interval, now=False)
+
+    def response_received(self, response, request, spider):
+        #contamos los articulos descargados de cada fuente (las portadas ya las cuenta el spider)
+        if self.job_id and request.callback == getattr(spider, "parse_article", None):
+            self._articles[request.meta.get("source_domain", "")] += 1
+
+    def item_scraped(self, item, response, spider):
+        if not self.job_id:
+            return
+        self._item_count += 1
+        self._items.append(dict(ItemAdapter(item)))
+        if len(self._items) >= self.batch_size:
+            self.flush_items()
+
+    def flush_items(self):
+        batch, self._items = self._items, []
+        if batch:
+            self.publisher.publish(self.job_id, "items", {"items": batch})
+
+    def progress(self) -> dict:
+        """Estado de avance actual del crawl."""
+        return {
+            "pages": dict(getattr(self.spider, "_pages_done", {})),
+            "articles": dict(self._articles),
+            "items": self._item_count,
+        }
+
+    def tick(self):
+        """Publica los items pendientes y el progreso si ha cambiado desde el ultimo evento."""
+        self.flush_items()
+        progress = self.progress()
+        if progress != self._last_progress:
+            self._last_progress = progress
+            self.publisher.publish(self.job_id, "progress", progress)
+
+    def spider_closed(self, spider, reason):
+        if not self.job_id:
+            return
+        if self._loop is not None and self._loop.running:
+            self._loop.stop()
+        self.tick()
+        self.publisher.publish(self.job_id, "closed", {"reason": reason})
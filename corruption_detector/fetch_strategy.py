@@ -0,0 +1,176 @@
+"""
+Estrategia de descarga por fuente: HTML estatico primero y Playwright solo cuando hace falta.
+
+Renderizar una pagina en Chromium es, con diferencia, lo mas caro de cada articulo, y la mayoria de las
+fuentes sirven el cuerpo del articulo en el HTML estatico. Cada modulo de ``sources`` puede declarar:
+
+    STATIC_LISTING = True / False    la portada trae los enlaces sin JavaScript (o no)
+    STATIC_ARTICLES = True / False   los articulos traen los parrafos sin JavaScript (o no)
+
+Si no lo declara, se aprende: el spider pide primero la pagina sin Playwright y, si los selectores del
+modulo vuelven vacios, la vuelve a pedir renderizada. Las veces que el HTML estatico ha bastado (o no) se
+guardan por dominio y tipo de pagina en SQLite, asi que los siguientes jobs saben de antemano que fuentes
+necesitan navegador. Una fuente marcada como "necesita navegador" se vuelve a probar en estatico de vez en
+cuando (FETCH_STATIC_PROBE_EVERY) por si la web ha cambiado.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+#tipos de pagina de los que llevamos la cuenta
+LISTING = "listing"
+ARTICLE = "article"
+
+_DECLARED = {LISTING: "STATIC_LISTING", ARTICLE: "STATIC_ARTICLES"}
+
+
+@dataclass
+class FetchCounts:
+    """
+Intentos de una fuente y tipo de pagina.
+
+Attributes:
+    static_ok: Descargas sin Playwright en las que los selectores encontraron contenido.
+    static_empty: Descargas sin Playwright que volvieron vacias (hubo que renderizar).
+    rendered: Paginas renderizadas con Playwright.
+    """
+    static_ok: int = 0
+    static_empty: int = 0
+    rendered: int = 0
+
+    @property
+    def static_tries(self) -> int:
+        return self.static_ok + self.static_empty
+
+    @property
+    def static_rate(self) -> float:
+        return self.static_ok / self.static_tries if self.static_tries else 1.0
+
+
+class FetchStrategy:
+    """
+Decide, por fuente y tipo de pagina, si se pide sin Playwright o renderizada, y guarda los resultados.
+
+Args:
+    path: Fichero SQLite donde persisten los contadores, o None para llevarlos solo en memoria.
+    min_samples: Intentos estaticos necesarios antes de decidir que una fuente necesita navegador.
+    min_rate: Proporcion minima de descargas estaticas con contenido para seguir intentandolo.
+    probe_every: Cada cuantas paginas de una fuente que necesita navegador se vuelve a probar en estatico
+        (0 para no volver a probar).
+    """
+
+    def __init__(self, path: Optional[str] = None, min_samples: int = 10, min_rate: float = 0.2,
+                 probe_every: int = 20):
+        self.path = path
+        self.min_samples = min_samples
+        self.min_rate = min_rate
+        self.probe_every = probe_every
+        self._lock = threading.Lock()
+        self._counts: Dict[Tuple[str, str], FetchCounts] = {}
+        #lo que ha cambiado en este crawl, que se suma a lo guardado al cerrar (varios workers comparten el fichero)
+        self._pending: Dict[Tuple[str, str], FetchCounts] = {}
+        self._decisions: Dict[Tuple[str, str], int] = {}
+        self._conn = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS fetch_stats (
+                    domain       TEXT NOT NULL,
+                    kind         TEXT NOT NULL,
+                    static_ok    INTEGER NOT NULL DEFAULT 0,
+                    static_empty INTEGER NOT NULL DEFAULT 0,
+                    rendered     INTEGER NOT NULL DEFAULT 0,
+                    updated_at   REAL NOT NULL,
+                    PRIMARY KEY (domain, kind)
+                )
+            """)
+            self._conn.commit()
+            for domain, kind, ok, empty, rendered in self._conn.execute(
+                "SELECT domain, kind, static_ok, static_empty, rendered FROM fetch_stats"
+            ):
+                self._counts[(domain, kind)] = FetchCounts(ok, empty, rendered)
+
+    @classmethod
+    def from_settings(cls, settings) -> "FetchStrategy":
+        """Crea la estrategia con los ajustes FETCH_*; sin FETCH_STATS_ENABLED los contadores no se guardan."""
+        path = settings.get("FETCH_STATS_PATH") if settings.getbool("FETCH_STATS_ENABLED", True) else None
+        return cls(
+            path,
+            min_samples=settings.getint("FETCH_STATIC_MIN_SAMPLES", 10),
+            min_rate=settings.getfloat("FETCH_STATIC_MIN_RATE", 0.2),
+            probe_every=settings.getint("FETCH_STATIC_PROBE_EVERY", 20),
+        )
+
+    def counts(self, domain: str, kind: str) -> FetchCounts:
+        """Contadores acumulados (guardados + este crawl) de una fuente y tipo de pagina."""
+        with self._lock:
+            c = self._counts.get((domain, kind))
+            return FetchCounts(c.static_ok, c.static_empty, c.rendered) if c else FetchCounts()
+
+    def use_static(self, domain: str, module, kind: str = ARTICLE) -> bool:
+        """
+    Si la siguiente pagina de ese tipo de la fuente se pide sin Playwright.
+
+    Args:
+        domain: Dominio de la fuente (clave de SOURCES).
+        module: Modulo de la fuente, por si declara STATIC_LISTING / STATIC_ARTICLES.
+        kind: LISTING o ARTICLE.
+        """
+        declared = getattr(module, _DECLARED[kind], None)
+        if declared is not None:
+            return bool(declared)
+        c = self.counts(domain, kind)
+        if c.static_tries < self.min_samples or c.static_rate >= self.min_rate:
+            return True
+        #la fuente necesita navegador, pero de vez en cuando la volvemos a probar en estatico
+        with self._lock:
+            n = self._decisions[(domain, kind)] = self._decisions.get((domain, kind), 0) + 1
+        return bool(self.probe_every) and n % self.probe_every == 0
+
+    def record(self, domain: str, kind: str, static: bool, ok: bool = True):
+        """
+    Anota el resultado de una descarga.
+
+    Args:
+        static: Si se pidio sin Playwright.
+        ok: En las estaticas, si los selectores del modulo encontraron contenido.
+        """
+        with self._lock:
+            for counts in (self._counts, self._pending):
+                c = counts.setdefault((domain, kind), FetchCounts())
+                if not static:
+                    c.rendered += 1
+                elif ok:
+                    c.static_ok += 1
+                else:
+                    c.static_empty += 1
+
+    def flush(self):
+        """Suma al fichero los contadores de este crawl."""
+        if self._conn is None:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            now = time.time()
+            for (domain, kind), c in pending.items():
+                self._conn.execute(
+                    "INSERT INTO fetch_stats VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(domain, kind) DO UPDATE SET static_ok = static_ok + excluded.static_ok, "
+                    "static_empty = static_empty + excluded.static_empty, rendered = rendered + excluded.rendered, "
+                    "updated_at = excluded.updated_at",
+                    (domain, kind, c.static_ok, c.static_empty, c.rendered, now),
+                )
+            self._conn.commit()
+
+    def close(self):
+        self.flush()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,118 @@
+"""
+Huellas persistentes de las URLs de articulos ya descargados, para deduplicar entre crawls.
+
+El dupefilter de Scrapy vive en memoria y solo dura un crawl, y solo ve URLs: un articulo enlazado con otra
+ruta (la que luego declara su ``<link rel="canonical">`` u ``og:url``) es una peticion distinta. Aqui se guarda
+en SQLite una huella de 64 bits por URL canonica (``urlnorm.url_fingerprint``) y, para las URLs que resultaron
+ser alias de otra, la URL canonica a la que apuntan. Antes de programar los articulos de una portada,
+el spider resuelve sus enlaces contra este almacen: un alias conocido se pide (o se busca en la cache)
+directamente con su URL canonica y ya no se descarga dos veces.
+
+La tabla es ``WITHOUT ROWID`` con la huella como clave, asi que cada URL ocupa unos pocos bytes en disco
+(mas la URL canonica en los alias) y en memoria solo esta la cache de paginas de SQLite, limitada por
+URL_FINGERPRINTS_CACHE_MB: sirve igual con millones de URLs. La probabilidad de colision de 64 bits con
+diez millones de URLs es del orden de 1e-6.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from corruption_detector.urlnorm import canonical_url, url_fingerprint
+
+#SQLite limita el numero de parametros por consulta
+_CHUNK = 500
+
+
+class FingerprintStore:
+    """
+Almacen SQLite de huellas de URLs.
+
+Args:
+    path: Ruta del fichero SQLite.
+    cache_mb: Memoria maxima de la cache de paginas de SQLite.
+    """
+
+    def __init__(self, path: str, cache_mb: int = 8):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA cache_size=-{max(1, int(cache_mb)) * 1024}")
+        #canonical es NULL cuando la URL es su propia canonica
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS url_fingerprints (
+                fp         INTEGER PRIMARY KEY,
+                canonical  TEXT,
+                first_seen REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["FingerprintStore"]:
+        """Crea el almacen con los ajustes URL_FINGERPRINTS_* o devuelve None si esta desactivado."""
+        if not settings.getbool("URL_FINGERPRINTS_ENABLED", True):
+            return None
+        return cls(settings.get("URL_FINGERPRINTS_PATH"), cache_mb=settings.getint("URL_FINGERPRINTS_CACHE_MB", 8))
+
+    def resolve(self, urls: Iterable[str]) -> Dict[str, str]:
+        """
+    Busca URLs en el almacen.
+
+    Args:
+        urls: URLs tal y como salen de la portada.
+
+    Returns:
+        Dict[str, str]: Para cada URL ya vista, su URL canonica (la de la propia URL si no es un alias).
+        """
+        fps = {}
+        for url in urls:
+            fps.setdefault(url_fingerprint(url), []).append(url)
+        found = {}
+        items = list(fps)
+        with self._lock:
+            for i in range(0, len(items), _CHUNK):
+                chunk = items[i:i + _CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT fp, canonical FROM url_fingerprints WHERE fp IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for fp, canonical in rows:
+                    for url in fps[fp]:
+                        found[url] = canonical or canonical_url(url)
+        return found
+
+    def add(self, url: str, canonical: Optional[str] = None):
+        """
+    Registra una URL descargada.
+
+    Args:
+        url: URL con la que se pidio el articulo.
+        canonical: URL canonica que declara la pagina, si es otra; ``url`` queda guardada como alias suyo.
+        """
+        now = time.time()
+        rows = [(url_fingerprint(url), None, now)]
+        if canonical and canonical_url(canonical) != canonical_url(url):
+            rows = [(url_fingerprint(canonical), None, now), (url_fingerprint(url), canonical_url(canonical), now)]
+        with self._lock:
+            #la canonica se inserta solo si no estaba; un alias se actualiza por si la pagina cambio de canonica
+            self._conn.execute("INSERT OR IGNORE INTO url_fingerprints VALUES (?, ?, ?)", rows[0])
+            if len(rows) > 1:
+                self._conn.execute(
+                    "INSERT INTO url_fingerprints VALUES (?, ?, ?) "
+                    "ON CONFLICT(fp) DO UPDATE SET canonical = excluded.canonical", rows[1]
+                )
+            self._conn.commit()
+
+    def count(self) -> int:
+        """Numero de URLs guardadas (canonicas y alias)."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM url_fingerprints").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,198 @@
+"""
+Frontera de crawl persistente: paginacion de las portadas y registro de lo ya visitado entre ejecuciones.
+
+Antes solo se miraba la primera pagina de cada fuente. Ahora el spider sigue el ``next_page`` que devuelven los
+``extract_article_links`` de los modulos (y las ``SECTION_URLS`` que declaren) hasta FRONTIER_MAX_DEPTH paginas
+por cadena, y en SQLite guardamos:
+
+- cada articulo visto en una portada, con cuando se descargo por ultima vez y su fecha de publicacion.
+- cada portada descargada, con su ``next_page`` (para poder seguir paginando aunque la portada salga de la cache).
+
+Con eso la paginacion es incremental: se deja de bajar por una cadena de portadas en cuanto una pagina no trae
+ningun articulo nuevo (ya estamos en lo que vio el crawl anterior) o todos los articulos conocidos de la pagina
+son mas antiguos que FRONTIER_HORIZON_DAYS. El ingester, ademas, no vuelve a descargar los articulos que ya
+descargo hace menos de FRONTIER_REVISIT_AFTER segundos.
+"""
+
+import datetime
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+from corruption_detector.article_cache import canonical_url
+
+#SQLite limita el numero de parametros por consulta
+_CHUNK = 500
+
+
+@dataclass
+class FrontierEntry:
+    """
+Articulo conocido por la frontera.
+
+Attributes:
+    first_seen: Primera vez (epoch) que aparecio en una portada.
+    last_crawled: Ultima vez que se descargo, o None si todavia no se ha descargado.
+    pub_date: Fecha de publicacion extraida del articulo ("" si no se conoce).
+    """
+    first_seen: float
+    last_crawled: Optional[float]
+    pub_date: str
+
+
+def parse_pub_date(value: str) -> Optional[datetime.datetime]:
+    """Fecha de publicacion ISO (con o sin hora / zona) como datetime en UTC, o None si no se entiende."""
+    if not value:
+        return None
+    try:
+        dt = datetime.datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            dt = datetime.datetime.fromisoformat(value.strip()[:10])
+        except ValueError:
+            return None
+    return dt if dt.tzinfo else dt.replace(tzinfo=datetime.timezone.utc)
+
+
+class CrawlFrontier:
+    """
+Almacen SQLite de la frontera de crawl.
+
+Args:
+    path: Ruta del fichero SQLite.
+    revisit_after: Segundos durante los que un articulo descargado no se vuelve a descargar en la ingesta.
+    horizon_days: Antigüedad a partir de la cual se deja de paginar (None o 0 para no usar fecha).
+    """
+
+    def __init__(self, path: str, revisit_after: float = 7 * 86400, horizon_days: Optional[float] = 7):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.revisit_after = revisit_after
+        self.horizon_days = horizon_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS frontier_articles (
+                url          TEXT PRIMARY KEY,
+                source       TEXT NOT NULL,
+                first_seen   REAL NOT NULL,
+                last_crawled REAL,
+                pub_date     TEXT
+            );
+            CREATE TABLE IF NOT EXISTS frontier_listings (
+                url          TEXT PRIMARY KEY,
+                source       TEXT NOT NULL,
+                next_page    TEXT,
+                last_crawled REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["CrawlFrontier"]:
+        """Crea la frontera con los ajustes FRONTIER_* o devuelve None si esta desactivada."""
+        if not settings.getbool("FRONTIER_ENABLED", True):
+            return None
+        return cls(
+            settings.get("FRONTIER_PATH"),
+            revisit_after=settings.getfloat("FRONTIER_REVISIT_AFTER", 7 * 86400),
+            horizon_days=settings.getfloat("FRONTIER_HORIZON_DAYS", 7),
+        )
+
+    # ——————————————————————————————————————————————————————————————————————
+    # Articulos
+    # ——————————————————————————————————————————————————————————————————————
+    def known(self, urls: Iterable[str]) -> Dict[str, FrontierEntry]:
+        """Entradas de los articulos que la frontera ya conoce, por URL (tal y como se pasan)."""
+        keys = {canonical_url(u): u for u in urls}
+        found = {}
+        items = list(keys)
+        with self._lock:
+            for i in range(0, len(items), _CHUNK):
+                chunk = items[i:i + _CHUNK]
+                rows = self._conn.execute(
+                    f"SELECT url, first_seen, last_crawled, pub_date FROM frontier_articles "
+                    f"WHERE url IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, first_seen, last_crawled, pub_date in rows:
+                    found[keys[key]] = FrontierEntry(first_seen, last_crawled, pub_date or "")
+        return found
+
+    def add_seen(self, source: str, urls: Iterable[str]):
+        """Registra los articulos de una portada (los que ya estaban no se tocan)."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO frontier_articles (url, source, first_seen) VALUES (?, ?, ?)",
+                [(canonical_url(u), source, now) for u in urls],
+            )
+            self._conn.commit()
+
+    def mark_crawled(self, url: str, source: str, pub_date: str = ""):
+        """Anota que un articulo se acaba de descargar (y su fecha de publicacion)."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO frontier_articles (url, source, first_seen, last_crawled, pub_date) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET last_crawled = excluded.last_crawled, "
+                "pub_date = COALESCE(NULLIF(excluded.pub_date, ''), frontier_articles.pub_date)",
+                (canonical_url(url), source, now, now, pub_date or ""),
+            )
+            self._conn.commit()
+
+    def recently_crawled(self, entry: Optional[FrontierEntry]) -> bool:
+        """Si un articulo se descargo hace menos de revisit_after segundos."""
+        return bool(entry and entry.last_crawled and time.time() - entry.last_crawled < self.revisit_after)
+
+    # ——————————————————————————————————————————————————————————————————————
+    # Portadas y paginacion
+    # ——————————————————————————————————————————————————————————————————————
+    def put_listing(self, url: str, source: str, next_page: Optional[str]):
+        """Guarda el next_page de una portada recien descargada."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO frontier_listings VALUES (?, ?, ?, ?)",
+                (canonical_url(url), source, next_page, time.time()),
+            )
+            self._conn.commit()
+
+    def next_page(self, url: str) -> Optional[str]:
+        """next_page guardado para una portada (para las portadas servidas desde la cache)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT next_page FROM frontier_listings WHERE url = ?", (canonical_url(url),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def paginate_reason(self, links: Iterable[str], known: Dict[str, FrontierEntry]) -> Optional[str]:
+        """
+    Decide si merece la pena pasar a la siguiente pagina de una portada.
+
+    Args:
+        links: URLs de articulos de la pagina actual.
+        known: Lo que ``known`` devolvio para esas URLs antes de registrarlas.
+
+    Returns:
+        None para seguir paginando, o el motivo para parar: "empty" (la pagina no trae articulos), "known" (no
+        hay ningun articulo nuevo) u "horizon" (todos los articulos con fecha conocida son anteriores al horizonte).
+        """
+        links = list(links)
+        if not links:
+            return "empty"
+        if all(link in known for link in links):
+            return "known"
+        if self.horizon_days:
+            limit = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=self.horizon_days)
+            dates = [d for d in (parse_pub_date(e.pub_date) for e in known.values()) if d is not None]
+            if dates and all(d < limit for d in dates):
+                return "horizon"
+        return None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,83 @@
+"""
+Busqueda de articulos relevantes para un contrato en el indice de texto completo.
+
+Es el equivalente a un crawl de ``MultiSourceSpider`` pero sobre los articulos ya indexados: la
+consulta FTS5 preselecciona los articulos que contienen algun termino del contrato y algun indicador
+de corrupcion, y sobre ellos aplicamos el mismo matcher, la misma puntuacion de riesgo
+(``assess_risk``) y el mismo enriquecimiento (``enrich_item``) que en el crawl. Los items tienen por
+tanto el mismo formato que los de un fichero de resultados (sin entidades, que solo se extraen en el crawl).
+"""
+
+import datetime
+from typing import Dict, Iterable, List, Optional
+
+from corruption_detector.article_index import ArticleIndex
+from corruption_detector.matcher import TermMatcher
+from corruption_detector.pipelines import enrich_item
+from corruption_detector.sentiment import SentimentScore
+from corruption_detector.spiders.corruption_spider import (
+    BASE_CORRUPTION_INDICATORS, CRITICAL_TERMS, MIN_RISK_SCORE, assess_risk, attribute_notices, term_notices_map,
+)
+from corruption_detector.textnorm import normalize_term
+
+#numero maximo de candidatos que pedimos a FTS5 antes de puntuar
+MAX_CANDIDATES = 1000
+
+
+def search_index(index: ArticleIndex, terms: Iterable[str], limit: int = 100,
+                 notice_terms: Optional[Dict[str, List[str]]] = None) -> List[dict]:
+    """
+Busca en el indice los articulos relevantes para los terminos de un contrato.
+
+Args:
+    index: Indice de articulos.
+    terms: Terminos del contrato (sin normalizar, tal y como llegan al endpoint /scrape).
+    limit: Numero maximo de items a devolver.
+    notice_terms: Para un lote de avisos, id del aviso -> sus terminos (se anota ``notices`` en cada item).
+
+Returns:
+    List[dict]: Items ordenados por risk_score descendente.
+    """
+    contract_terms = {normalize_term(t) for t in terms} - {""}
+    indicators = {normalize_term(kw) for kw in BASE_CORRUPTION_INDICATORS}
+    critical = {normalize_term(t) for t in CRITICAL_TERMS}
+    if not contract_terms:
+        return []
+    matcher = TermMatcher(contract_terms | indicators)
+    term_notices = term_notices_map(notice_terms)
+
+    items = []
+    for art in index.search(contract_terms, indicators, limit=MAX_CANDIDATES):
+        #FTS5 solo preselecciona: el matcher decide igual que en el crawl
+        found = matcher.scan(art.norm_text).found()
+        found_contract = found & contract_terms
+        found_corr = found & indicators
+        if not found_contract or not found_corr:
+            continue
+        sentiment = SentimentScore(art.sentiment, {"POS": art.pos, "NEG": art.neg}) if art.sentiment else None
+        score, level, polarity = assess_risk(found_corr, critical, sentiment)
+        if score < MIN_RISK_SCORE:
+            continue
+        item = {
+            "title": art.title,
+            "link": art.url,
+            "content_preview": art.preview,
+            "source": art.source,
+            "author": art.author,
+            "publication_date": art.pub_date,
+            "contract_terms_found": list(found_contract),
+            "corruption_keywords_found": list(found_corr),
+            "sentiment_polarity": round(polarity, 2),
+            "risk_score": score,
+            "alert_level": level,
+            "normalized_text": art.norm_text,
+        }
+        if term_notices:
+            item["notices"] = attribute_notices(found_contract, term_notices)
+        enrich_item(item)
+        #la fecha de scraping de un acierto del indice es la de su indexacion
+        item["date_scraped"] = datetime.datetime.fromtimestamp(art.indexed_at, datetime.timezone.utc).isoformat()
+        item["entities"] = []
+        items.append(item)
+    items.sort(key=lambda it: it["risk_score"], reverse=True)
+    return items[:limit]
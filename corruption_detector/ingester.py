@@ -0,0 +1,85 @@
+"""
+Ingester de fondo que mantiene al dia el indice de articulos.
+
+Lanza periodicamente ``MultiSourceSpider`` en modo ``ingest`` sobre todas las fuentes de SOURCES:
+cada articulo extraido se guarda en el indice de texto completo (``ArticleIndex``) junto con su
+sentimiento, sin filtrar por terminos de contrato. Los jobs en modo ``index`` o ``index_then_crawl``
+y el endpoint ``/search`` consultan despues ese indice en lugar de lanzar un crawl.
+
+Uso:
+    python -m corruption_detector.ingester --interval 900
+"""
+
+import argparse
+import logging
+import os
+import subprocess
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+class Ingester:
+    """
+Encadena crawls de ingesta en un mismo reactor, uno cada ``interval`` segundos.
+
+Args:
+    interval: Segundos entre el final de un crawl y el inicio del siguiente.
+    """
+
+    def __init__(self, interval: float):
+        from scrapy.crawler import CrawlerRunner
+        from scrapy.utils.project import get_project_settings
+
+        self.interval = interval
+        self.runner = CrawlerRunner(get_project_settings())
+
+    def crawl(self):
+        from twisted.internet import reactor
+        from corruption_detector.spiders.corruption_spider import MultiSourceSpider
+
+        crawler = self.runner.create_crawler(MultiSourceSpider)
+        d = self.runner.crawl(crawler, mode="ingest")
+        d.addErrback(lambda f: logger.error(f"Error en el crawl de ingesta: {f.value}"))
+        d.addBoth(lambda _: reactor.callLater(self.interval, self.crawl))
+
+    def run(self):
+        from twisted.internet import reactor
+
+        self.crawl()
+        reactor.run()
+
+
+def ingester_main(interval: float):
+    """Punto de entrada del proceso ingester: instala el reactor asyncio y encadena crawls de ingesta."""
+    os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "corruption_detector.settings")
+    from scrapy.utils.log import configure_logging
+    from scrapy.utils.project import get_project_settings
+    from scrapy.utils.reactor import install_reactor
+
+    settings = get_project_settings()
+    install_reactor(settings.get("TWISTED_REACTOR"))
+    configure_logging(settings)
+    Ingester(interval).run()
+
+
+def start_ingester_process(interval: float = None) -> subprocess.Popen:
+    """
+Arranca el ingester como subproceso.
+
+Returns:
+    subprocess.Popen: el proceso del ingester (el llamador es responsable de terminarlo).
+    """
+    cmd = [sys.executable, "-m", "corruption_detector.ingester"]
+    if interval is not None:
+        cmd += ["--interval", str(interval)]
+    return subprocess.Popen(cmd)
+
+
+if __name__ == "__main__":
+    from corruption_detector.settings import INGEST_INTERVAL
+
+    parser = argparse.ArgumentParser(description="Ingester de fondo del indice de articulos")
+    parser.add_argument("--interval", type=float, default=INGEST_INTERVAL)
+    args = parser.parse_args()
+    ingester_main(args.interval)
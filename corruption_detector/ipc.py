@@ -0,0 +1,136 @@
+"""
+Direcciones y claves de los canales locales del proyecto (servidor NLP y eventos de los jobs).
+
+Los dos canales usan ``multiprocessing.connection``, que deserializa con pickle todo lo que recibe: quien
+pueda conectarse con la clave puede ejecutar codigo en el otro extremo. Por eso:
+
+- la clave es la de la variable de entorno del canal (CD_NLP_AUTHKEY, CD_EVENTS_AUTHKEY) o, si no esta
+  definida, una clave aleatoria de esta instalacion que se genera la primera vez en ``data/ipc/<canal>.key``
+  (directorio 0700, fichero 0600).
+- los sockets Unix se crean en un directorio privado del usuario (0700): CD_RUNTIME_DIR,
+  ``$XDG_RUNTIME_DIR/corruption_detector`` o ``<tmp>/corruption_detector-<uid>``, nunca directamente en /tmp.
+- un servidor solo borra un socket que ha quedado huerfano; si en la direccion responde otro servidor vivo
+  no arranca (``AddressInUseError``).
+"""
+
+import os
+import secrets
+import stat
+import sys
+import tempfile
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+from corruption_detector.settings import DATA_DIR
+
+WINDOWS = sys.platform.startswith("win")
+#directorio con las claves generadas de esta instalacion
+KEY_DIR = DATA_DIR / "ipc"
+
+
+class AddressInUseError(RuntimeError):
+    """Ya hay un servidor vivo escuchando en la direccion."""
+
+
+def _check_private(path: str, is_dir: bool):
+    #en Windows los permisos no se expresan con modos POSIX
+    if WINDOWS:
+        return
+    st = os.lstat(path)
+    kind_ok = stat.S_ISDIR(st.st_mode) if is_dir else stat.S_ISREG(st.st_mode)
+    if not kind_ok or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        expected = "un directorio 0700" if is_dir else "un fichero 0600"
+        raise PermissionError(f"{path} tiene que ser {expected} del usuario actual")
+
+
+def private_dir(path) -> str:
+    """Crea (si no existe) y comprueba un directorio que solo puede leer el usuario actual."""
+    path = str(path)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    _check_private(path, is_dir=True)
+    return path
+
+
+def runtime_dir() -> str:
+    """Directorio privado de los sockets Unix."""
+    path = os.environ.get("CD_RUNTIME_DIR")
+    if not path:
+        base = os.environ.get("XDG_RUNTIME_DIR")
+        if base:
+            path = os.path.join(base, "corruption_detector")
+        else:
+            path = os.path.join(tempfile.gettempdir(), f"corruption_detector-{os.getuid()}")
+    return private_dir(path)
+
+
+def channel_address(name: str, env_var: str) -> str:
+    """
+Direccion de un canal: la variable de entorno ``env_var`` o la direccion por defecto.
+
+Args:
+    name: Nombre del canal ("nlp", "events").
+    env_var: Variable de entorno con la direccion.
+    """
+    address = os.environ.get(env_var)
+    if address:
+        return address
+    if WINDOWS:
+        return rf"\\.\pipe\corruption_detector_{name}"
+    return os.path.join(runtime_dir(), f"{name}.sock")
+
+
+def channel_authkey(name: str, env_var: str) -> bytes:
+    """
+Clave de un canal: la variable de entorno ``env_var`` o la clave aleatoria de la instalacion.
+
+Args:
+    name: Nombre del canal ("nlp", "events").
+    env_var: Variable de entorno con la clave.
+    """
+    value = os.environ.get(env_var)
+    if value:
+        return value.encode("utf-8")
+    key_dir = private_dir(KEY_DIR)
+    path = os.path.join(key_dir, f"{name}.key")
+    if not os.path.exists(path):
+        #la escribimos en un temporal (mkstemp ya lo crea 0600) y la enlazamos: si otro proceso se adelanta,
+        #nos quedamos con la suya y nadie lee nunca un fichero a medio escribir
+        fd, tmp = tempfile.mkstemp(dir=key_dir)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+            os.link(tmp, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp)
+    _check_private(path, is_dir=False)
+    with open(path, encoding="utf-8") as f:
+        return f.read().strip().encode("utf-8")
+
+
+def server_alive(address: str, authkey: bytes) -> bool:
+    """Si hay un servidor aceptando conexiones en la direccion (aunque sea con otra clave)."""
+    try:
+        conn = Client(address, authkey=authkey)
+    except (AuthenticationError, EOFError):
+        #alguien escucha, pero no nos entiende o ha cortado el saludo
+        return True
+    except OSError:
+        return False
+    conn.close()
+    return True
+
+
+def claim_address(address: str, authkey: bytes):
+    """
+Prepara la direccion para abrir un Listener: borra el socket si ha quedado huerfano.
+
+Raises:
+    AddressInUseError: Si en la direccion responde un servidor vivo.
+    """
+    if address.startswith("\\\\") or not os.path.exists(address):
+        return
+    if server_alive(address, authkey):
+        raise AddressInUseError(f"Ya hay un servidor escuchando en {address}")
+    os.unlink(address)
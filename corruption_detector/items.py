@@ -23,3 +23,8 @@ para su normalización, enriquecimiento y posterior volcado a JSON/CSV.
     alert_level = scrapy.Field()
     indicator_count = scrapy.Field()
     content_length = scrapy.Field()
+    #ids de los avisos de un lote (/upload_contracts) cuyos terminos aparecen en el articulo
+    notices = scrapy.Field()
+    #texto normalizado (textnorm.normalize) del titulo y el articulo completo: solo viaja del spider al
+    #pipeline para contar los indicadores sin volver a normalizar, y enrich_item lo quita antes de guardar
+    normalized_text = scrapy.Field()
@@ -0,0 +1,119 @@
+"""
+Matcher multi-patron (Aho-Corasick) para buscar terminos de contrato e indicadores de corrupcion.
+
+En lugar de recorrer el texto una vez por cada termino (``t in texto``), compilamos todos los
+terminos en un unico automata al arrancar el spider y recorremos cada articulo una sola vez.
+El automata trabaja sobre palabras (tokens) del texto ya normalizado, de forma que solo se
+aceptan coincidencias de palabras completas: "caos" ya no coincide dentro de "caoss" ni
+"alerta" dentro de "alertas".
+"""
+
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple
+
+
+@dataclass
+class MatchResult:
+    """
+Resultado de recorrer un texto con el automata.
+
+Attributes:
+    positions: Mapa termino -> lista de offsets (en caracteres) donde empieza cada aparicion.
+    counts: Numero de apariciones de cada termino.
+    """
+    positions: Dict[str, List[int]] = field(default_factory=dict)
+    counts: Counter = field(default_factory=Counter)
+
+    def found(self) -> set:
+        """Devuelve el conjunto de terminos que han aparecido al menos una vez."""
+        return set(self.positions)
+
+
+class TermMatcher:
+    """
+Automata Aho-Corasick construido sobre secuencias de palabras.
+
+Los terminos y el texto deben llegar ya normalizados (minusculas, sin acentos ni puntuacion,
+palabras separadas por espacios), que es justo lo que produce ``MultiSourceSpider.normalize``.
+El coste de ``scan`` depende solo de la longitud del texto y no del numero de terminos.
+
+Args:
+    terms: Terminos normalizados a buscar. Los vacios se ignoran.
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        #cada nodo es un diccionario palabra -> nodo hijo, el nodo 0 es la raiz
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        #en cada nodo guardamos los terminos que terminan ahi (incluidos los heredados por el enlace de fallo) y su longitud en palabras
+        self._out: List[List[Tuple[str, int]]] = [[]]
+        self.terms = set()
+        for term in terms:
+            words = term.split()
+            if not words:
+                continue
+            self._add(" ".join(words), words)
+        self._build()
+
+    def _add(self, term: str, words: List[str]):
+        """Inserta un termino en el trie de palabras."""
+        node = 0
+        for w in words:
+            nxt = self._goto[node].get(w)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][w] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        if term not in self.terms:
+            self.terms.add(term)
+            self._out[node].append((term, len(words)))
+
+    def _build(self):
+        """Calcula los enlaces de fallo recorriendo el trie en anchura."""
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            for w, child in self._goto[node].items():
+                queue.append(child)
+                f = self._fail[node]
+                while f and w not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(w, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def scan(self, text: str) -> MatchResult:
+        """
+    Recorre el texto una unica vez y devuelve las posiciones y conteos de todos los terminos.
+
+    Args:
+        text (str): Texto normalizado.
+
+    Returns:
+        MatchResult: posiciones (offset del primer caracter) y numero de apariciones por termino.
+        """
+        result = MatchResult()
+        if not self.terms:
+            return result
+        goto, fail, out = self._goto, self._fail, self._out
+        words = text.split()
+        #offset en caracteres del inicio de cada palabra, el texto normalizado usa un unico espacio como separador
+        starts = []
+        offset = 0
+        node = 0
+        for i, w in enumerate(words):
+            starts.append(offset)
+            offset += len(w) + 1
+            while node and w not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(w, 0)
+            for term, length in out[node]:
+                result.positions.setdefault(term, []).append(starts[i - length + 1])
+                result.counts[term] += 1
+        return result
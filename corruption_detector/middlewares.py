@@ -2,10 +2,16 @@
 Middlewares de Scrapy para el proyecto Corruption Detector.
 - CorruptionDetectorSpiderMiddleware: hookea (es decir, intercepta) eventos del spider (como el: inicio, cierre, manejo de respuestas y excepciones).
 - CorruptionDetectorDownloaderMiddleware: maneja peticiones HTTP (headers, logging, errores de descarga).
+- PlaywrightPoolMiddleware: reparte las peticiones renderizadas entre el pool de contextos y les asigna una pagina reciclada.
+- DomainRateLimitMiddleware: asigna el slot del downloader de cada fuente y le aplica el Crawl-delay del robots.txt.
 """
 from scrapy import signals
-from scrapy.exceptions import IgnoreRequest
+from scrapy.exceptions import IgnoreRequest, NotConfigured
 from scrapy.http import Response
+from scrapy.utils.httpobj import urlparse_cached
+
+from corruption_detector.browser import match_domain, url_host
+from corruption_detector.politeness import apply_crawl_delay, robots_crawl_delay
 
 
 class CorruptionDetectorSpiderMiddleware:
@@ -135,3 +141,83 @@ Middleware de descarga que intercepta el siguiente flujo HTTP:
     def spider_closed(self, spider):
         """Señal de cierre del middleware (limpieza)"""
         spider.logger.info(f"Downloader middleware closed for spider: {spider.name}")
+
+
+class PlaywrightPoolMiddleware:
+    """
+Middleware de descarga para las peticiones con Playwright (ver corruption_detector.browser):
+    - asigna a cada peticion el contexto de su fuente (``playwright_context``) dentro del pool de contextos.
+    - si el spider tiene una pagina libre de ese contexto (``spider.pages``), la pasa en ``playwright_page``
+      para que scrapy-playwright navegue en ella en lugar de abrir una pestaña nueva.
+    """
+
+    def process_request(self, request, spider):
+        """Completa el meta de Playwright de la peticion antes de que llegue al handler de descarga."""
+        pages = getattr(spider, "pages", None)
+        if not request.meta.get("playwright") or pages is None:
+            return None
+        domain = request.meta.get("source_domain")
+        context = request.meta.setdefault("playwright_context", pages.context_for(domain) if domain else "default")
+        if request.meta.get("playwright_include_page") and request.meta.get("playwright_page") is None:
+            page = pages.acquire(context)
+            if page is not None:
+                request.meta["playwright_page"] = page
+                spider.crawler.stats.inc_value("playwright/page_reused")
+        return None
+
+
+class DomainRateLimitMiddleware:
+    """
+Middleware de descarga que completa los limites por fuente de los slots del downloader (ver corruption_detector.politeness):
+    - process_request: fija ``download_slot`` al dominio de la fuente si la peticion no lo trae y, si el robots.txt
+      del host tiene Crawl-delay, sube a ese valor el delay de su slot.
+
+No espera nada: el ritmo y la concurrencia de cada slot los aplica el propio downloader. Tiene que ir despues de
+RobotsTxtMiddleware (para que el robots.txt ya este leido).
+    """
+
+    def __init__(self, crawler):
+        #importamos SOURCES aqui para no crear un import circular con el spider
+        from corruption_detector.spiders.corruption_spider import SOURCES
+        settings = crawler.settings
+        self.crawler = crawler
+        self.domains = tuple(SOURCES)
+        self.obey_robots = settings.getbool("ROBOTSTXT_OBEY")
+        self.user_agent = settings.get("ROBOTSTXT_USER_AGENT") or settings.get("USER_AGENT")
+        self._robots = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("POLITENESS_ENABLED", True):
+            raise NotConfigured
+        return cls(crawler)
+
+    def domain_for(self, request) -> str:
+        """Fuente de la peticion (o su host si no es de ninguna fuente)."""
+        host = url_host(request.url)
+        return request.meta.get("source_domain") or match_domain(host, self.domains) or host
+
+    def crawl_delay(self, request):
+        """Crawl-delay del robots.txt del host de la peticion, si RobotsTxtMiddleware ya lo ha leido."""
+        if self._robots is None:
+            from scrapy.downloadermiddlewares.robotstxt import RobotsTxtMiddleware
+            middlewares = self.crawler.engine.downloader.middleware.middlewares
+            self._robots = next((mw for mw in middlewares if isinstance(mw, RobotsTxtMiddleware)), False)
+        if not self._robots:
+            return None
+        parser = self._robots._parsers.get(urlparse_cached(request).netloc)
+        return robots_crawl_delay(parser, self.user_agent)
+
+    def process_request(self, request, spider):
+        """Asigna el slot de la fuente y le aplica el Crawl-delay del robots.txt."""
+        url = urlparse_cached(request)
+        if url.scheme not in ("http", "https") or url.path == "/robots.txt":
+            return None
+        domain = request.meta.setdefault("download_slot", self.domain_for(request))
+        if self.obey_robots:
+            #el slot se crea con la primera peticion del dominio, asi que el Crawl-delay rige desde la segunda
+            slot = self.crawler.engine.downloader.slots.get(domain)
+            delay = self.crawl_delay(request)
+            if apply_crawl_delay(slot, delay):
+                self.crawler.stats.set_value(f"politeness/crawl_delay/{domain}", delay)
+        return None
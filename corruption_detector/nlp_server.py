@@ -0,0 +1,223 @@
+"""
+Servidor NLP local y persistente para el spider y los pipelines.
+
+Cada job de scraping arranca un proceso ``scrapy crawl`` nuevo que, sin este servidor, tiene que
+cargar spaCy y el modelo de pysentimiento antes de descargar una sola pagina (varios segundos y
+cientos de MB por job). Este modulo mantiene ambos modelos cargados en un proceso de larga
+duracion y atiende peticiones de NER y sentimiento por un socket Unix (o una named pipe en Windows)
+usando ``multiprocessing.connection``.
+
+Uso:
+    python -m corruption_detector.nlp_server            # arranca el servidor
+    CD_NLP_ADDRESS=/ruta/al.sock CD_NLP_AUTHKEY=clave   # (opcional) direccion y clave compartidas
+
+Sin CD_NLP_AUTHKEY se usa la clave aleatoria de la instalacion y el socket va en el directorio privado del
+usuario (ver ``corruption_detector.ipc``). Si ya hay un servidor NLP vivo en la direccion, no se arranca otro.
+
+El spider y el pipeline llaman a ``NLPClient.connect()``: si el servidor no esta disponible
+devuelve None y cargan los modelos en el propio proceso como hasta ahora.
+"""
+
+import logging
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import List, Optional, Tuple
+
+from corruption_detector import ipc
+from corruption_detector.sentiment import SentimentScore
+
+logger = logging.getLogger(__name__)
+
+SPACY_MODEL = "es_core_news_sm"
+
+
+def get_address() -> str:
+    """Direccion del servidor: la variable de entorno CD_NLP_ADDRESS o un socket en el directorio privado."""
+    return ipc.channel_address("nlp", "CD_NLP_ADDRESS")
+
+
+def get_authkey() -> bytes:
+    """Clave compartida entre servidor y clientes: CD_NLP_AUTHKEY o la clave aleatoria de la instalacion."""
+    return ipc.channel_authkey("nlp", "CD_NLP_AUTHKEY")
+
+
+def load_spacy():
+    """
+Carga el modelo spaCy de espaniol dejando activos solo los componentes que necesita el NER.
+
+Returns:
+    spacy.Language: el pipeline con tagger, parser, lemmatizer, etc. desactivados.
+    """
+    import spacy
+    nlp = spacy.load(SPACY_MODEL)
+    #solo usamos doc.ents, asi que desactivamos el resto de componentes (tok2vec lo dejamos por si el ner lo comparte)
+    nlp.select_pipes(disable=[name for name in nlp.pipe_names if name not in ("tok2vec", "ner")])
+    return nlp
+
+
+class NLPClient:
+    """
+Cliente del servidor NLP. Una instancia mantiene una conexion abierta y es segura entre hilos.
+
+Args:
+    conn: Conexion de multiprocessing ya autenticada.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._lock = threading.Lock()
+
+    @classmethod
+    def connect(cls, address: Optional[str] = None) -> Optional["NLPClient"]:
+        """
+    Intenta conectar con el servidor NLP.
+
+    Returns:
+        NLPClient si el servidor responde, o None si no esta arrancado.
+        """
+        try:
+            address = address or get_address()
+            conn = Client(address, authkey=get_authkey())
+        except (OSError, EOFError, AuthenticationError) as e:
+            logger.debug(f"Servidor NLP no disponible en {address}: {e}")
+            return None
+        client = cls(conn)
+        try:
+            client._call("ping")
+        except Exception as e:
+            logger.warning(f"El servidor NLP en {address} no responde correctamente: {e}")
+            client.close()
+            return None
+        return client
+
+    def _call(self, op: str, payload=None):
+        with self._lock:
+            self._conn.send((op, payload))
+            ok, result = self._conn.recv()
+        if not ok:
+            raise RuntimeError(f"Error en el servidor NLP ({op}): {result}")
+        return result
+
+    def ner(self, texts: List[str]) -> List[List[Tuple[str, str]]]:
+        """Devuelve, para cada texto, la lista de entidades (texto, etiqueta) reconocidas por spaCy."""
+        return self._call("ner", list(texts))
+
+    def sentiment(self, texts: List[str]) -> List[SentimentScore]:
+        """Devuelve el SentimentScore de pysentimiento para cada texto."""
+        return self._call("sentiment", list(texts))
+
+    def close(self):
+        try:
+            self._conn.close()
+        except OSError:
+            pass
+
+
+class NLPServer:
+    """
+Servidor que mantiene cargados spaCy y pysentimiento y atiende a varios clientes a la vez.
+
+Args:
+    address: Direccion en la que escuchar (socket Unix o named pipe).
+    """
+
+    def __init__(self, address: Optional[str] = None):
+        self.address = address or get_address()
+        self._ner_lock = threading.Lock()
+        self._sentiment_lock = threading.Lock()
+        self.nlp = None
+        self.analyzer = None
+
+    def load(self):
+        """Carga ambos modelos una unica vez."""
+        from pysentimiento import create_analyzer
+        t0 = time.perf_counter()
+        self.nlp = load_spacy()
+        self.analyzer = create_analyzer(task="sentiment", lang="es")
+        logger.info(f"Modelos NLP cargados en {time.perf_counter() - t0:.1f}s")
+
+    def handle(self, op: str, payload):
+        if op == "ping":
+            return "pong"
+        if op == "ner":
+            with self._ner_lock:
+                return [[(ent.text, ent.label_) for ent in doc.ents] for doc in self.nlp.pipe(payload)]
+        if op == "sentiment":
+            if not payload:
+                return []
+            with self._sentiment_lock:
+                outputs = self.analyzer.predict(payload)
+            return [SentimentScore(output=o.output, probas=dict(o.probas)) for o in outputs]
+        raise ValueError(f"Operacion desconocida: {op}")
+
+    def _serve_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    conn.send((True, self.handle(op, payload)))
+                except Exception as e:
+                    logger.exception(f"Error atendiendo la peticion {op}")
+                    conn.send((False, str(e)))
+
+    def serve_forever(self):
+        """
+    Carga los modelos y acepta conexiones hasta que se interrumpa el proceso.
+
+    Raises:
+        ipc.AddressInUseError: Si ya hay un servidor vivo en la direccion (se comprueba antes de cargar los modelos).
+        """
+        authkey = get_authkey()
+        ipc.claim_address(self.address, authkey)
+        self.load()
+        #por si mientras cargabamos los modelos ha arrancado otro
+        ipc.claim_address(self.address, authkey)
+        with Listener(self.address, authkey=authkey) as listener:
+            logger.info(f"Servidor NLP escuchando en {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    logger.warning(f"Conexion rechazada: {e}")
+                    continue
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+
+def start_server_process(wait: float = 120.0) -> subprocess.Popen:
+    """
+Arranca el servidor NLP como subproceso y espera a que acepte conexiones.
+
+Args:
+    wait: Segundos maximos de espera a que los modelos terminen de cargar (0 para no esperar).
+
+Returns:
+    subprocess.Popen: el proceso del servidor (el llamador es responsable de terminarlo).
+    """
+    proc = subprocess.Popen([sys.executable, "-m", "corruption_detector.nlp_server"])
+    if wait <= 0:
+        return proc
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline and proc.poll() is None:
+        client = NLPClient.connect()
+        if client:
+            client.close()
+            return proc
+        time.sleep(0.5)
+    logger.warning("El servidor NLP no ha quedado disponible a tiempo, los jobs cargaran los modelos en proceso.")
+    return proc
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s │ %(message)s")
+    try:
+        NLPServer().serve_forever()
+    except ipc.AddressInUseError as e:
+        logger.error(f"{e}: no se arranca otro servidor NLP")
+        sys.exit(1)
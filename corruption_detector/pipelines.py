@@ -5,67 +5,191 @@ Pipelines de Scrapy para el proyecto Corruption Detector.
 """
 
 import datetime
-import json
 import logging
 import shutil
 from itemadapter import ItemAdapter
-import spacy
-import csv
+from twisted.internet import defer
 from pathlib import Path
-import unicodedata
 from corruption_detector.spiders.corruption_spider import BASE_CORRUPTION_INDICATORS
+from corruption_detector.nlp_server import NLPClient, load_spacy
+from corruption_detector.results_io import CSV_HEADERS, ResultsWriter, iter_results, write_csv
+#strip_accents se sigue exportando desde aqui para el codigo que lo importaba de los pipelines
+from corruption_detector.textnorm import normalize, normalize_term, strip_accents
 
-#cargamos un modelo spaCy (espaniol) para reconocimiento de entidades
-nlp = spacy.load("es_core_news_sm")
+#el modelo spaCy (espaniol) para reconocimiento de entidades ya no se carga al importar el modulo:
+#si el servidor NLP persistente esta disponible lo usamos, y si no lo cargamos una sola vez bajo demanda.
+_nlp = None
 
 
-def strip_accents(text: str) -> str:
+def get_nlp():
     """
-Eliminamos acentos de una cadena usando unicodedata.normalize de la libreria unicodedata.
-Esto que hacemos aqui es muy util para normalizar el texto antes de realizar las comparaciones o conteos.
+Devuelve el modelo spaCy cargado en este proceso, cargandolo la primera vez que se pide.
+
+Returns:
+    spacy.Language: modelo es_core_news_sm con solo los componentes necesarios para el NER.
+    """
+    global _nlp
+    if _nlp is None:
+        _nlp = load_spacy()
+    return _nlp
+
+
+#formas normalizadas de los indicadores, calculadas una sola vez al importar en lugar de en cada item
+INDICATOR_FORMS = tuple(normalize_term(term) for term in BASE_CORRUPTION_INDICATORS)
+
+#etiquetas de entidades que conservamos en los resultados
+ALLOWED_LABELS = {"PER", "LOC", "ORG"}
+
+
+def clean_entities(entities) -> list:
+    """
+Filtra y deduplica las entidades reconocidas por spaCy.
+
+Iteramos sobre las entidades encontradas y filtramos por longitud y etiquetas permitidas ignorando algun
+resultado sin sentido como por ejemplo una entidad de mas de 4 palabras.
 
 Args:
-    text (str): Texto de entrada.
+    entities: Iterable de tuplas (texto, etiqueta).
 Returns:
-    str: Texto sin acentos.
+    list: Diccionarios {"text", "label"} sin duplicados.
+    """
+    seen = set()
+    cleaned_ents = []
+    for ent_text, lbl in entities:
+        txt = ent_text.strip()
+        if lbl not in ALLOWED_LABELS:
+            continue
+        words = txt.split()
+        if len(words) > 4 or len(txt) < 2:
+            continue
+        key = (txt, lbl)
+        if key in seen:
+            continue
+        #añadimos la entidad al set de entidades vistas para evitar duplicados.
+        seen.add(key)
+        cleaned_ents.append({"text": txt, "label": lbl})
+    return cleaned_ents
+
+
+def enrich_item(adapter):
+    """
+Normaliza y completa los metadatos de un item: fecha de publicacion en ISO, date_scraped,
+numero de indicadores de corrupcion y longitud del contenido. Lo usan el pipeline y las
+busquedas en el indice de articulos, para que ambos generen los mismos campos.
+
+Args:
+    adapter (ItemAdapter): Item a completar (se modifica en el sitio).
     """
-    return ''.join(
-        c for c in unicodedata.normalize("NFD", text)
-        if not unicodedata.combining(c)
-    )
+    #Convertimos la fecha de publicacion a formato ISO para analisis posteiores.
+    raw_pub = adapter.get("publication_date", "").strip()
+    if raw_pub:
+        parts = raw_pub.split()
+        cleaned = " ".join(parts[:2]) if len(parts) >= 2 else raw_pub
+        try:
+            dt = datetime.datetime.fromisoformat(cleaned)
+            adapter["publication_date"] = dt.isoformat()
+        except Exception:
+            adapter["publication_date"] = cleaned
+
+    adapter["date_scraped"] = datetime.datetime.now(
+        datetime.timezone.utc
+    ).isoformat()
+
+    #Calculamos metricas adicionales que serviran en etapas posteiores para realizar el analisis
+    #el texto ya normalizado viaja en el item desde el spider (o el indice); no se guarda en los resultados
+    norm_text = adapter.pop("normalized_text", None)
+    if norm_text is None:
+        norm_text = normalize(adapter.get("title", "") + " " + adapter.get("content_preview", ""))
+    adapter["indicator_count"] = sum(norm_text.count(term) for term in INDICATOR_FORMS)
+    adapter["content_length"] = len(adapter.get("content_preview", "").split())
+    return adapter
+
 
 class CorruptionDetectorPipeline:
     """
 Pipeline principal para realizar lo siguiente:
     1) Normalizamos fechas y metadatos.
-    2) Extraemos entidades con spaCy.
+    2) Extraemos entidades con spaCy, por lotes (NER_BATCH_SIZE items o NER_MAX_WAIT segundos) usando nlp.pipe.
     3) Contamos indicadores de corrupcion y longitud de contenido.
-    4) Serializamos cada item a JSON y escribimos en un array en disco.
-    5) Al cerrar el spider, generamos tambien un CSV 'latest.csv'.
+    4) Serializamos cada item a JSON y lo escribimos como una linea (JSON Lines) en un fichero que mantenemos abierto todo el crawl.
+    5) Al cerrar el spider, renombramos el fichero de forma atomica y generamos tambien un CSV 'latest.csv'.
     """
     def open_spider(self, spider):
         """
-    Se ejecuta al inicio del spider. Inicializa ruta de resultados y un flag first_item.
+    Se ejecuta al inicio del spider. Inicializa la ruta de resultados y abre el escritor JSON Lines
+    (comprimido con gzip si la ruta termina en .gz).
         """
         self.path = getattr(spider, "result_path", None)
-        self.first_item = True
+        #en modo "index_then_crawl" el fichero ya tiene los aciertos del indice y los nuevos items se aniaden detras
+        append = getattr(spider, "mode", "crawl") == "index_then_crawl"
+        self.writer = ResultsWriter(self.path, append=append) if self.path else None
+        #ajustes del NER por lotes: tamanio del lote, espera maxima y procesos de nlp.pipe
+        self.ner_batch_size = spider.settings.getint("NER_BATCH_SIZE", 32)
+        self.ner_max_wait = spider.settings.getfloat("NER_MAX_WAIT", 2.0)
+        self.ner_n_process = spider.settings.getint("NER_N_PROCESS", 1)
+        #items a la espera de sus entidades: (item, adapter, deferred)
+        self._pending = []
+        self._flush_call = None
+        #si hay un servidor NLP arrancado le pedimos a el las entidades, sino cargamos spaCy aqui
+        self.nlp_client = NLPClient.connect()
+        if self.nlp_client is None:
+            get_nlp()
+
+    def extract_entities(self, texts: list) -> list:
+        """
+    Reconoce las entidades de un lote de textos con spaCy, en el servidor NLP o en este proceso con nlp.pipe.
+
+    Returns:
+        list: para cada texto, las tuplas (texto, etiqueta) de sus entidades.
+        """
+        if self.nlp_client is not None:
+            return self.nlp_client.ner(texts)
+        docs = get_nlp().pipe(texts, batch_size=self.ner_batch_size, n_process=self.ner_n_process)
+        return [[(ent.text, ent.label_) for ent in doc.ents] for doc in docs]
+
+    def flush(self, spider):
+        """
+    Procesa de una vez todos los items en espera: extrae sus entidades por lotes, los escribe
+    en disco y libera el item para que siga su camino por Scrapy.
+        """
+        if self._flush_call is not None and self._flush_call.active():
+            self._flush_call.cancel()
+        self._flush_call = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        #Utilizamos la libreria de procesamiento de lenguaje natural spaCy para extraer entidades como personas, organizaciones y localizaciones.
+        texts = [adapter.get("title", "") + " " + adapter.get("content_preview", "") for _, adapter, _ in batch]
+        try:
+            entities = self.extract_entities(texts)
+        except Exception as e:
+            spider.logger.error(f"Error extrayendo entidades de {len(texts)} items: {e}")
+            entities = [[] for _ in texts]
+        for (item, adapter, d), ents in zip(batch, entities):
+            adapter["entities"] = clean_entities(ents)
+            self.write_item(adapter, spider)
+            d.callback(item)
 
     def close_spider(self, spider):
         """
     Esta funcion Scrapy la llama automaticamente una sola vez, eso pasa justo cuando el spider ha terminado todo su trabajo 
     es decir, (ha visitado todas las páginas y ha procesado todos los items), siempre:
-        - Cerramos el array JSON añadiendo ']' al final
+        - Cerramos el fichero JSON Lines y lo renombramos a su ruta final.
         - Generamos un CSV con nombre timestamped y lo copiamos a 'latest.csv'.
         """
+        #procesamos los items que quedasen en el buffer del NER antes de cerrar el fichero
+        self.flush(spider)
+        if self.nlp_client is not None:
+            self.nlp_client.close()
         if not self.path:
             spider.logger.warning("CorruptionDetectorPipeline: no result_path, saltando cierre de fichero")
             return
 
-        #1)cerramos el JSON array
+        #1)cerramos el fichero JSON Lines y lo movemos a su ruta definitiva
         try:
-            with open(self.path, 'a', encoding='utf-8') as f:
-                f.write('\n]')
-        except FileNotFoundError:
+            self.writer.close()
+        except OSError as e:
+            spider.logger.error(f"No se pudo cerrar el fichero de resultados {self.path}: {e}")
             return
 
         #2)generamos el CSV "latest.csv" 
@@ -73,30 +197,9 @@ Pipeline principal para realizar lo siguiente:
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         latest_csv = results_dir / f"latest_{timestamp}.csv"
         fixed_link = results_dir / "latest.csv"
-        #Lo que vamos a hacer es abrir el json en modo lectura y el csv en modo escritura, y vamos a volcar los datos del json al csv.
+        #Lo que vamos a hacer es recorrer el fichero de resultados item a item y volcar cada uno como una fila del csv.
         try:
-            with open(self.path, encoding='utf-8') as jf, \
-                 open(latest_csv, 'w', newline='', encoding='utf-8') as cf:
-
-                data = json.load(jf)
-                writer = csv.writer(cf)
-                headers = ["title","link","source","publication_date","date_scraped","sentiment_polarity","indicator_count","content_length","entities"]
-                writer.writerow(headers)
-
-                for it in data:
-                    ents = ";".join(f"{e['text']}[{e['label']}]" for e in it.get("entities", []))
-                    row = [
-                        it.get("title","").replace(",", " "),
-                        it.get("link",""),
-                        it.get("source",""),
-                        it.get("publication_date",""),
-                        it.get("date_scraped",""),
-                        str(it.get("sentiment_polarity","")),
-                        str(it.get("indicator_count",0)),
-                        str(it.get("content_length",0)),
-                        ents
-                    ]
-                    writer.writerow(row)
+            write_csv(iter_results(self.path), latest_csv, CSV_HEADERS)
         except Exception as e:
             spider.logger.error(f"Error generando latest.csv: {e}")
         #Tras haber creado el csv con su marca de tiempo lo copiamos a latest.csv y asi tenemos un archivo con un nombre fijo por si se quiere hacer un analisis posterior sin dejar de apuntar a un mismo archivo.
@@ -111,78 +214,35 @@ Pipeline principal para realizar lo siguiente:
     cada vez que se genera un item durante el scraping se debe procesar con esta funcion, normalizamos y enriquecemos cada item de las siguientes maneras:
         - Publicacion: convertimos fechas a ISO.
         - Aniadimos date_scraped.
-        - Extraemos entidades con spaCy (PER, LOC, ORG).
         - Contamos indicadores de corrupcion y longitud de contenido.
-        - Serializamos a JSON y escribimos en disco.
+        - Extraemos entidades con spaCy (PER, LOC, ORG) por lotes y despues serializamos a JSON y escribimos en disco.
+
+    Devuelve un Deferred que se resuelve con el item cuando se procesa su lote.
         """
         adapter = ItemAdapter(item)
 
-        #Convertimos la fecha de publicacion a formato ISO para analisis posteiores.
-        raw_pub = adapter.get("publication_date", "").strip()
-        if raw_pub:
-            parts = raw_pub.split()
-            cleaned = " ".join(parts[:2]) if len(parts) >= 2 else raw_pub
-            try:
-                dt = datetime.datetime.fromisoformat(cleaned)
-                adapter["publication_date"] = dt.isoformat()
-            except Exception:
-                adapter["publication_date"] = cleaned
-
-        adapter["date_scraped"] = datetime.datetime.now(
-            datetime.timezone.utc
-        ).isoformat()
-
-        text = adapter.get("title", "") + " " + adapter.get("content_preview", "")
-        #Utilizamos la libreria de procesamiento de lenguaje natural spaCy para extraer entidades como personas, organizaciones y localizaciones.
-        doc = nlp(text)
-        ALLOWED_LABELS = {"PER", "LOC", "ORG"}
-        seen = set()
-        cleaned_ents = []
-        #Iteramos sobre las entidades encontradas y filtramos por longitud y etiquetas permitidas ignorando algun resultado sin sentido como por ejemplo una entidad de mas de 4 palabras.
-        for ent in doc.ents:
-            txt = ent.text.strip()
-            lbl = ent.label_
-            if lbl not in ALLOWED_LABELS:
-                continue
-            words = txt.split()
-            if len(words) > 4 or len(txt) < 2:
-                continue
-            key = (txt, lbl)
-            if key in seen:
-                continue
-            #añadimos la entidad al set de entidades vistas para evitar duplicados.
-            seen.add(key)
-            cleaned_ents.append({"text": txt, "label": lbl})
-
-        adapter["entities"] = cleaned_ents
-
-        #Calculamos metricas adicionales que serviran en etapas posteiores para realizar el analisis
-        raw_for_count = (adapter.get("title","") + " " + adapter.get("content_preview","")).lower()
-        norm_for_count = strip_accents(raw_for_count)
-        adapter["indicator_count"] = sum(
-            norm_for_count.count(strip_accents(term))
-            for term in BASE_CORRUPTION_INDICATORS
-        )
-        adapter["content_length"] = len(adapter.get("content_preview", "").split())
+        enrich_item(adapter)
 
+        #en lugar de pasar spaCy item a item, dejamos el item en espera y lo procesamos por lotes
+        d = defer.Deferred()
+        self._pending.append((item, adapter, d))
+        if len(self._pending) >= self.ner_batch_size:
+            self.flush(spider)
+        elif self._flush_call is None:
+            from twisted.internet import reactor
+            self._flush_call = reactor.callLater(self.ner_max_wait, self.flush, spider)
+        return d
+
+    def write_item(self, adapter, spider):
+        """
+    Serializa un item ya enriquecido a JSON y lo escribe como una linea en el fichero de resultados.
+        """
+        if self.writer is None:
+            return
         try:
-            line = json.dumps(dict(adapter), ensure_ascii=False)
-        except Exception as e:
+            self.writer.write(dict(adapter))
+        except (TypeError, ValueError) as e:
             spider.logger.error(f"Error serializando item {adapter.get('link')}: {e}")
-            return item
-
-        if not self.path:
-            return item
-
-        if self.first_item:
-            with open(self.path, "w", encoding="utf-8") as f:
-                f.write("[\n" + line)
-            self.first_item = False
-        else:
-            with open(self.path, "a", encoding="utf-8") as f:
-                f.write(",\n" + line)
-
-        return item
 
 
 class TextCleanerPipeline:
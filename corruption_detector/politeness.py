@@ -0,0 +1,104 @@
+"""
+Limites de peticiones por fuente, aplicados con los slots del downloader de Scrapy.
+
+Con un DOWNLOAD_DELAY unico y AutoThrottle a concurrencia 1 las seis fuentes se recorrian practicamente en
+serie. Aqui cada dominio de SOURCES es un slot del downloader con sus propios limites, que se declaran en su
+modulo:
+
+    RATE_LIMIT = 0.5    peticiones por segundo (el slot espera 1 / RATE_LIMIT segundos entre peticiones)
+    CONCURRENCY = 2     peticiones en vuelo a la vez (una pagina renderizada cuenta hasta que termina)
+
+Las fuentes que no los declaran, y los hosts que no son fuentes, usan DOWNLOAD_DELAY y
+CONCURRENT_REQUESTS_PER_DOMAIN, que en Scrapy tambien son por slot. El spider pone ``download_slot`` (el
+dominio de la fuente) en todas sus peticiones y ``download_slots`` genera el DOWNLOAD_SLOTS correspondiente.
+
+Las peticiones que esperan turno se quedan en el scheduler, no ocupando huecos de CONCURRENT_REQUESTS: con
+SCHEDULER_PRIORITY_QUEUE = DownloaderAwarePriorityQueue el scheduler entrega antes las peticiones de los
+slots con menos descargas en marcha, asi que los articulos de una portada no dejan paradas a las demas
+fuentes. Si el robots.txt del sitio tiene Crawl-delay, ``middlewares.DomainRateLimitMiddleware`` sube el
+delay del slot a ese valor. Un job tarda aproximadamente lo que la fuente mas lenta y no la suma de todas.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class DomainLimits:
+    """
+Limites de una fuente.
+
+Attributes:
+    rate: Peticiones por segundo.
+    concurrency: Peticiones en vuelo a la vez.
+    """
+    rate: float
+    concurrency: int
+
+    @property
+    def delay(self) -> float:
+        """Segundos entre peticiones del slot."""
+        return 1.0 / self.rate if self.rate > 0 else 0.0
+
+
+def default_limits(settings) -> DomainLimits:
+    """Limites de las fuentes que no declaran los suyos: DOWNLOAD_DELAY y CONCURRENT_REQUESTS_PER_DOMAIN."""
+    delay = settings.getfloat("DOWNLOAD_DELAY", 0)
+    return DomainLimits(rate=1.0 / delay if delay > 0 else 0.0,
+                        concurrency=settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN", 8))
+
+
+def source_limits(sources: dict, default: DomainLimits) -> Dict[str, DomainLimits]:
+    """
+Limites de cada fuente.
+
+Args:
+    sources: Dominio -> modulo de la fuente (RATE_LIMIT y CONCURRENCY opcionales).
+    default: Limites de las fuentes que no los declaran.
+    """
+    return {
+        domain: DomainLimits(
+            rate=float(getattr(module, "RATE_LIMIT", default.rate)),
+            concurrency=max(1, int(getattr(module, "CONCURRENCY", default.concurrency))),
+        )
+        for domain, module in sources.items()
+    }
+
+
+def download_slots(sources: dict, default: DomainLimits) -> Dict[str, dict]:
+    """DOWNLOAD_SLOTS de Scrapy para las fuentes: un slot por dominio con su delay y su concurrencia."""
+    return {
+        domain: {"delay": limits.delay, "concurrency": limits.concurrency}
+        for domain, limits in source_limits(sources, default).items()
+    }
+
+
+def apply_crawl_delay(slot, delay: Optional[float]) -> bool:
+    """
+Sube el delay de un slot del downloader al Crawl-delay del robots.txt (nunca lo baja).
+
+Returns:
+    bool: Si se ha cambiado el delay.
+    """
+    if slot is None or not delay or slot.delay >= delay:
+        return False
+    slot.delay = float(delay)
+    return True
+
+
+def robots_crawl_delay(parser, user_agent: str) -> Optional[float]:
+    """
+Crawl-delay de un robots.txt ya descargado por RobotsTxtMiddleware (Protego o el de la libreria estandar).
+
+Args:
+    parser: Parser de scrapy.robotstxt (``None`` o un Deferred si aun no esta).
+    user_agent: Agente con el que se consulta.
+    """
+    rp = getattr(parser, "rp", None)
+    if rp is None or not hasattr(rp, "crawl_delay"):
+        return None
+    try:
+        delay = rp.crawl_delay(user_agent)
+    except Exception:
+        return None
+    return float(delay) if delay else None
@@ -0,0 +1,324 @@
+"""
+Lectura y escritura en streaming de los ficheros de resultados de los jobs.
+
+Los resultados se guardan en JSON Lines (un item por linea), opcionalmente comprimidos con gzip
+si la ruta termina en ``.gz``. El pipeline mantiene un unico fichero abierto durante todo el
+crawl, escribe en ``<ruta>.part`` y lo renombra de forma atomica al terminar, asi ningun lector
+ve nunca un fichero a medias. Los lectores (CSV, ``/jobs/{id}/results``, ``/results.csv``)
+recorren el fichero item a item en lugar de cargar el array completo en memoria.
+
+Junto a cada fichero se guarda un indice ``<ruta>.idx`` con el offset (en bytes, sin comprimir) de
+cada linea, de forma que una pagina de resultados se sirve saltando directamente al item ``skip``
+y decodificando solo ``limit`` items. En los ficheros sin comprimir el salto es un seek; en los ``.gz``
+gzip no permite saltar, asi que hay que descomprimir hasta el offset y el coste crece con la posicion.
+
+Los resultados antiguos guardados como un array JSON se siguen pudiendo leer.
+"""
+
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import struct
+import sys
+from array import array
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+INDEX_SUFFIX = ".idx"
+#cada entrada del indice es un entero sin signo de 64 bits little-endian
+OFFSET = struct.Struct("<Q")
+
+#cabeceras del CSV que genera el pipeline al cerrar el spider (latest.csv)
+CSV_HEADERS = ["title", "link", "source", "publication_date", "date_scraped",
+               "sentiment_polarity", "indicator_count", "content_length", "entities"]
+
+
+def is_gzip_path(path: str) -> bool:
+    """Indica si los resultados de esa ruta se escriben comprimidos."""
+    return str(path).endswith(".gz")
+
+
+def index_path(path: str) -> str:
+    """Ruta del indice de offsets asociado a un fichero de resultados."""
+    return str(path) + INDEX_SUFFIX
+
+
+def _write_index(path: str, offsets: array):
+    """Escribe el indice de offsets de forma atomica."""
+    idx = index_path(path)
+    if sys.byteorder != "little":
+        offsets = array("Q", offsets)
+        offsets.byteswap()
+    with open(idx + ".part", "wb") as f:
+        offsets.tofile(f)
+    os.replace(idx + ".part", idx)
+
+
+class ResultsWriter:
+    """
+Escritor de resultados JSON Lines con un unico descriptor abierto y renombrado atomico al cerrar.
+
+Args:
+    path: Ruta final del fichero de resultados (``.jsonl`` o ``.jsonl.gz``).
+    buffer_size: Tamanio del buffer de escritura en bytes.
+    append: Si el fichero ya existe, sus items se copian al principio del nuevo en lugar de descartarlos.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 16, append: bool = False):
+        self.path = str(path)
+        self.tmp_path = self.path + ".part"
+        self.count = 0
+        #offset (sin comprimir) en el que empieza cada linea, para el indice .idx
+        self.offsets = array("Q")
+        self._offset = 0
+        raw = open(self.tmp_path, "wb", buffering=buffer_size)
+        if is_gzip_path(self.path):
+            raw = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+        self._raw = raw
+        self._closed = False
+        if append:
+            #copiamos los items que ya habia (p. ej. los aciertos del indice de articulos) item a item
+            for record in iter_results(self.path):
+                self.write(record)
+
+    def write(self, record: dict):
+        """Serializa un item y lo escribe como una linea."""
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        self._raw.write(line)
+        self.offsets.append(self._offset)
+        self._offset += len(line)
+        self.count += 1
+
+    def close(self):
+        """Vacia el buffer, cierra el fichero y lo mueve a su ruta definitiva."""
+        if self._closed:
+            return
+        self._closed = True
+        fileobj = getattr(self._raw, "fileobj", None)
+        self._raw.close()
+        if fileobj is not None:
+            fileobj.close()
+        #el indice se publica antes que los datos para que nunca haya datos nuevos con un indice viejo
+        _write_index(self.path, self.offsets)
+        os.replace(self.tmp_path, self.path)
+
+
+def open_results(path: str) -> IO[bytes]:
+    """Abre un fichero de resultados en binario, descomprimiendolo si es gzip."""
+    f = open(path, "rb")
+    if f.read(2) == GZIP_MAGIC:
+        f.close()
+        return gzip.open(path, "rb")
+    f.seek(0)
+    return f
+
+
+def iter_results(path: str) -> Iterator[dict]:
+    """
+Recorre los items de un fichero de resultados de uno en uno.
+
+Args:
+    path: Ruta al fichero (JSON Lines, JSON Lines gzip o array JSON antiguo).
+
+Yields:
+    dict: cada item.
+    """
+    if not path or not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return
+    with open_results(path) as f:
+        head = f.read(64).lstrip()
+        f.seek(0)
+        if head.startswith(b"["):
+            #formato antiguo: un unico array JSON, no queda mas remedio que cargarlo entero
+            try:
+                data = json.load(f)
+            except ValueError:
+                logger.warning(f"Resultados mal formados en {path}")
+                return
+            yield from data
+            return
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                logger.warning(f"Linea {lineno} mal formada en {path}, la saltamos")
+
+
+def _is_legacy_array(path: str) -> bool:
+    with open_results(path) as f:
+        return f.read(64).lstrip().startswith(b"[")
+
+
+def ensure_index(path: str) -> bool:
+    """
+Comprueba que el fichero tiene un indice de offsets al dia y, si no lo tiene, lo construye
+recorriendo las lineas una vez (sin decodificar el JSON).
+
+Returns:
+    bool: True si hay indice utilizable, False para ficheros antiguos en formato array.
+    """
+    idx = index_path(path)
+    if os.path.isfile(idx) and os.path.getmtime(idx) >= os.path.getmtime(path) - 1:
+        return True
+    if _is_legacy_array(path):
+        return False
+    offsets = array("Q")
+    pos = 0
+    with open_results(path) as f:
+        for line in f:
+            if line.strip():
+                offsets.append(pos)
+            pos += len(line)
+    _write_index(path, offsets)
+    return True
+
+
+def count_results(path: str) -> Optional[int]:
+    """Numero de items del fichero segun su indice, o None si no hay indice."""
+    if not os.path.isfile(path) or not ensure_index(path):
+        return None
+    return os.path.getsize(index_path(path)) // OFFSET.size
+
+
+def offset_of(path: str, position: int) -> Optional[int]:
+    """
+Devuelve el offset en bytes del item numero ``position`` leyendo solo 8 bytes del indice.
+
+Returns:
+    int o None si la posicion esta fuera del fichero.
+    """
+    with open(index_path(path), "rb") as f:
+        f.seek(position * OFFSET.size)
+        raw = f.read(OFFSET.size)
+    if len(raw) < OFFSET.size:
+        return None
+    return OFFSET.unpack(raw)[0]
+
+
+def read_page(path: str, skip: int = 0, limit: int = 100) -> Tuple[List[dict], Optional[int]]:
+    """
+Lee una pagina de resultados saltando directamente al primer item pedido.
+
+La posicion se traduce a un offset con el indice ``.idx``, asi que solo se empieza a leer en offsets
+en los que empieza una linea. En los ficheros ``.gz`` saltar a un offset obliga a descomprimir todo lo
+anterior (O(n) en la posicion): el indice solo ahorra decodificar el JSON de los items saltados.
+
+Args:
+    path: Fichero de resultados.
+    skip: Posicion del primer item (la que devuelve una pagina anterior como cursor).
+    limit: Numero maximo de items a devolver.
+
+Returns:
+    (items, next_position): los items de la pagina y la posicion del siguiente item, o None si no quedan mas.
+    """
+    if not path or not os.path.isfile(path) or os.path.getsize(path) == 0:
+        return [], None
+    if not ensure_index(path):
+        #ficheros antiguos en formato array: sin indice, recorremos el array
+        items = []
+        for i, it in enumerate(iter_results(path)):
+            if i >= skip + limit:
+                return items, skip + limit
+            if i >= skip:
+                items.append(it)
+        return items, None
+    offset = offset_of(path, skip)
+    if offset is None:
+        return [], None
+    items = []
+    with open_results(path) as f:
+        f.seek(offset)
+        while len(items) < limit:
+            line = f.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                logger.warning(f"Linea mal formada en {path}, la saltamos")
+    next_position = skip + len(items)
+    return items, next_position if next_position < count_results(path) else None
+
+
+def format_entities(entities: Iterable[dict]) -> str:
+    """Convierte la lista de entidades en el formato 'texto[ETIQUETA];...' que usamos en los CSV."""
+    return ";".join(f"{e['text']}[{e['label']}]" for e in entities or [])
+
+
+def csv_row(record: dict, headers: List[str]) -> list:
+    """
+Construye la fila CSV de un item para las cabeceras indicadas.
+
+Args:
+    record: Item leido del fichero de resultados.
+    headers: Nombres de columna, en orden.
+    """
+    row = []
+    for h in headers:
+        if h == "entities":
+            row.append(format_entities(record.get("entities")))
+        elif h in ("indicator_count", "content_length"):
+            row.append(record.get(h, 0))
+        else:
+            value = record.get(h, "")
+            row.append("" if value is None else value)
+    return row
+
+
+def iter_csv_chunks(records: Iterable[dict], headers: List[str], chunk_rows: int = 500) -> Iterator[str]:
+    """
+Genera un CSV por trozos a medida que se leen los items, con memoria constante.
+
+Las filas se escriben con csv.writer (que escapa comas, comillas y saltos de linea) sobre un
+buffer que se reutiliza y se vacia cada ``chunk_rows`` filas.
+
+Args:
+    records: Items a exportar (normalmente ``iter_results(ruta)``).
+    headers: Nombres de columna, en orden.
+    chunk_rows: Filas por trozo emitido.
+
+Yields:
+    str: trozos de texto CSV.
+    """
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(headers)
+    pending = 0
+    for it in records:
+        writer.writerow(csv_row(it, headers))
+        pending += 1
+        if pending >= chunk_rows:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    tail = buf.getvalue()
+    if tail:
+        yield tail
+
+
+def write_csv(records: Iterable[dict], csv_path: str, headers: List[str] = CSV_HEADERS) -> int:
+    """
+Vuelca en un CSV los items recibidos sin cargarlos todos en memoria.
+
+Returns:
+    int: numero de filas escritas (sin contar la cabecera).
+    """
+    n = 0
+    with open(csv_path, "w", newline="", encoding="utf-8") as cf:
+        writer = csv.writer(cf)
+        writer.writerow(headers)
+        for it in records:
+            writer.writerow(csv_row(it, headers))
+            n += 1
+    return n
@@ -0,0 +1,200 @@
+"""
+Etapa de analisis de sentimiento por lotes para el spider.
+
+El modelo de pysentimiento es lento y, si lo llamamos directamente desde ``parse_article``,
+bloquea el reactor y con el todas las paginas de Playwright que esten en vuelo. Aqui
+encolamos los textos, los agrupamos en micro-lotes y los pasamos al modelo en un hilo
+aparte. El spider recibe un ``Future`` que puede esperar sin bloquear el reactor.
+
+Tambien aplicamos una politica de truncado por tokens para que los articulos largos no
+disparen la latencia:
+    - "head": nos quedamos con los primeros ``max_tokens`` tokens.
+    - "head_tail": mitad del principio y mitad del final del articulo.
+    - "chunks": partimos en ventanas de ``max_tokens`` (hasta ``max_chunks``) y promediamos las probabilidades.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("head", "head_tail", "chunks")
+
+#aproximacion de caracteres por token que usamos para recortar antes de tokenizar y no tokenizar articulos enteros
+CHARS_PER_TOKEN = 8
+
+
+@dataclass
+class SentimentScore:
+    """
+Resultado de sentimiento de un texto, con la misma forma que la salida de pysentimiento.
+
+Attributes:
+    output: Etiqueta ganadora ('POS', 'NEG' o 'NEU').
+    probas: Probabilidad de cada etiqueta.
+    """
+    output: str
+    probas: Dict[str, float] = field(default_factory=dict)
+
+
+class SentimentBatcher:
+    """
+Cola de inferencia de sentimiento que agrupa textos en micro-lotes y los procesa en un hilo.
+
+Args:
+    predict: Funcion que recibe una lista de textos y devuelve una lista de resultados con ``output`` y ``probas``.
+    tokenizer: Tokenizer de HuggingFace del modelo (opcional). Sin el, contamos palabras.
+    batch_size: Numero maximo de textos por lote.
+    max_wait: Segundos maximos que esperamos a completar un lote antes de lanzarlo.
+    max_tokens: Tokens maximos por texto (o por trozo en la politica "chunks").
+    policy: Politica de truncado, una de POLICIES.
+    max_chunks: Numero maximo de trozos por texto en la politica "chunks".
+    """
+
+    def __init__(self, predict: Callable[[List[str]], list], tokenizer=None, batch_size: int = 16,
+                 max_wait: float = 0.5, max_tokens: int = 128, policy: str = "head", max_chunks: int = 4):
+        if policy not in POLICIES:
+            raise ValueError(f"Politica de truncado desconocida: {policy} (validas: {', '.join(POLICIES)})")
+        self.predict = predict
+        self.tokenizer = tokenizer
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.max_tokens = max_tokens
+        self.policy = policy
+        self.max_chunks = max(1, max_chunks)
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="sentiment-batcher", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_analyzer(cls, analyzer, **kwargs) -> "SentimentBatcher":
+        """Construye el batcher a partir de un analizador de pysentimiento."""
+        return cls(analyzer.predict, tokenizer=getattr(analyzer, "tokenizer", None), **kwargs)
+
+    def submit(self, text: str) -> Future:
+        """
+    Encola un texto y devuelve un Future que se resolvera con su SentimentScore.
+
+    Args:
+        text (str): Texto completo del articulo.
+        """
+        fut: Future = Future()
+        self._queue.put((text, fut))
+        return fut
+
+    def close(self, timeout: float = 10.0):
+        """Detiene el hilo de trabajo tras vaciar los textos pendientes."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    # ——————————————————————————————————————————————————————————————————————
+    # Truncado por tokens
+    # ——————————————————————————————————————————————————————————————————————
+    def _tokenize(self, text: str) -> List[str]:
+        if self.tokenizer is not None:
+            return self.tokenizer.tokenize(text)
+        return text.split()
+
+    def _detokenize(self, tokens: List[str]) -> str:
+        if self.tokenizer is not None:
+            return self.tokenizer.convert_tokens_to_string(tokens)
+        return " ".join(tokens)
+
+    def split(self, text: str) -> List[str]:
+        """
+    Aplica la politica de truncado y devuelve los trozos de texto que se pasaran al modelo.
+
+    Args:
+        text (str): Texto completo.
+
+    Returns:
+        List[str]: Un unico texto para "head"/"head_tail", o varios trozos para "chunks".
+        """
+        n = self.max_tokens
+        if self.policy == "head":
+            tokens = self._tokenize(text[: n * CHARS_PER_TOKEN])
+            return [self._detokenize(tokens[:n])]
+        if self.policy == "head_tail":
+            limit = n * CHARS_PER_TOKEN
+            if len(text) <= limit:
+                tokens = self._tokenize(text)
+            else:
+                tokens = self._tokenize(text[: limit // 2]) + self._tokenize(text[-limit // 2:])
+            if len(tokens) <= n:
+                return [self._detokenize(tokens)]
+            half = n // 2
+            return [self._detokenize(tokens[:half] + tokens[-(n - half):])]
+        tokens = self._tokenize(text[: n * self.max_chunks * CHARS_PER_TOKEN])
+        chunks = [self._detokenize(tokens[i:i + n]) for i in range(0, len(tokens), n)]
+        return chunks[: self.max_chunks] or [""]
+
+    # ——————————————————————————————————————————————————————————————————————
+    # Hilo de trabajo
+    # ——————————————————————————————————————————————————————————————————————
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                batch.append(nxt)
+            self._process(batch)
+
+    def _process(self, batch: List[tuple]):
+        """Trocea los textos del lote, lanza una unica prediccion y reagrupa los resultados."""
+        texts, owners = [], []
+        for idx, (text, fut) in enumerate(batch):
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                chunks = self.split(text)
+            except Exception as e:
+                fut.set_exception(e)
+                continue
+            texts.extend(chunks)
+            owners.extend([idx] * len(chunks))
+        if not texts:
+            return
+        try:
+            outputs = self.predict(texts)
+        except Exception as e:
+            logger.error(f"Error en la inferencia de sentimiento ({len(texts)} textos): {e}")
+            for text, fut in batch:
+                if fut.running():
+                    fut.set_exception(e)
+            return
+
+        grouped: Dict[int, list] = {}
+        for owner, out in zip(owners, outputs):
+            grouped.setdefault(owner, []).append(out)
+        for idx, outs in grouped.items():
+            batch[idx][1].set_result(self._merge(outs))
+
+    @staticmethod
+    def _merge(outputs: list) -> SentimentScore:
+        """Promedia las probabilidades de los trozos de un mismo texto."""
+        probas: Dict[str, float] = {}
+        for out in outputs:
+            for label, p in out.probas.items():
+                probas[label] = probas.get(label, 0.0) + p / len(outputs)
+        if len(outputs) == 1:
+            return SentimentScore(output=outputs[0].output, probas=probas)
+        return SentimentScore(output=max(probas, key=probas.get), probas=probas)
@@ -1,12 +1,26 @@
 # corruption_detector/settings.py
 
+import os
+from pathlib import Path
+
+# Directorio de datos locales persistentes entre jobs (caches, indices...)
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
 BOT_NAME = "corruption_detector"
 SPIDER_MODULES = ["corruption_detector.spiders"]
 NEWSPIDER_MODULE = "corruption_detector.spiders"
 
 USER_AGENT = "CorruptionDetectorBot/1.0 (+https://tudominio.com)"
 ROBOTSTXT_OBEY = True  
+# Limites por slot del downloader: cada fuente es un slot con el ritmo y la concurrencia de su modulo de sources
+# (RATE_LIMIT y CONCURRENCY, ver corruption_detector/politeness.py) y el Crawl-delay de su robots.txt.
+# DOWNLOAD_DELAY y CONCURRENT_REQUESTS_PER_DOMAIN son los de las fuentes que no los declaran y del resto de hosts
 DOWNLOAD_DELAY = 2
+CONCURRENT_REQUESTS = 32
+CONCURRENT_REQUESTS_PER_DOMAIN = 2
+POLITENESS_ENABLED = True
+# El scheduler entrega antes las peticiones de los slots con menos descargas en marcha
+SCHEDULER_PRIORITY_QUEUE = "scrapy.pqueues.DownloaderAwarePriorityQueue"
 COOKIES_ENABLED = False
 LOG_LEVEL = "INFO"
 
@@ -20,8 +34,14 @@ ITEM_PIPELINES = {
 # para evitar que intente escribir por FEED_URI.
 EXTENSIONS = {
     "scrapy.extensions.feedexport.FeedExporter": None,
+    "corruption_detector.extensions.JobEventsExtension": 500,
 }
 
+# Eventos de progreso de los jobs (/jobs/{job_id}/events)
+JOB_EVENTS_ENABLED = True
+JOB_EVENTS_INTERVAL = 1.0          # segundos entre eventos de progreso
+JOB_EVENTS_BATCH_SIZE = 20         # items maximos por evento "items"
+
 # Handlers de Playwright
 DOWNLOAD_HANDLERS = {
     "http": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
@@ -29,20 +49,74 @@ DOWNLOAD_HANDLERS = {
 }
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
 
-# Control de crawling
-DEPTH_LIMIT = 1
+# Control de crawling (la profundidad de las portadas la controla la frontera, no DEPTH_LIMIT)
+DEPTH_LIMIT = 0
 CLOSESPIDER_PAGECOUNT = 200
 
-# AutoThrottle
-AUTOTHROTTLE_ENABLED = True
+# Frontera de crawl persistente: paginacion de portadas y articulos ya vistos (corruption_detector.frontier)
+FRONTIER_ENABLED = True
+FRONTIER_PATH = str(DATA_DIR / "frontier.db")
+FRONTIER_MAX_DEPTH = 3             # paginas por cadena de next_page (1 = solo la portada)
+FRONTIER_MAX_PAGES = 10            # portadas por fuente en un crawl (portada, secciones y paginas siguientes)
+FRONTIER_HORIZON_DAYS = 7          # no se pagina hacia articulos mas antiguos (0 para no limitar por fecha)
+FRONTIER_REVISIT_AFTER = 604800    # segundos durante los que el ingester no vuelve a descargar un articulo
+
+# Huellas de las URLs de articulos descargados, para no volver a pedir por otra URL un articulo ya visto
+# (alias declarados con rel=canonical / og:url) en crawls posteriores (corruption_detector.fingerprints)
+URL_FINGERPRINTS_ENABLED = True
+URL_FINGERPRINTS_PATH = str(DATA_DIR / "url_fingerprints.db")
+URL_FINGERPRINTS_CACHE_MB = 8      # memoria maxima de SQLite para la tabla de huellas
+
+# AutoThrottle: desactivado, lo sustituyen los limites por fuente de los slots del downloader
+AUTOTHROTTLE_ENABLED = False
 AUTOTHROTTLE_START_DELAY = 3
 AUTOTHROTTLE_MAX_DELAY = 10
 AUTOTHROTTLE_TARGET_CONCURRENCY = 1.0
 
 # Ajustes de Playwright
 PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT = 15000  # 15 s
-PLAYWRIGHT_MAX_CONTEXTS = 1
+# Pool de contextos (uno por nucleo, como mucho uno por fuente) y paginas recicladas (corruption_detector.browser)
+PLAYWRIGHT_CONTEXT_POOL_SIZE = max(1, min(os.cpu_count() or 1, 6))
+PLAYWRIGHT_MAX_CONTEXTS = PLAYWRIGHT_CONTEXT_POOL_SIZE
 PLAYWRIGHT_MAX_PAGES_PER_CONTEXT = 4
+PLAYWRIGHT_PAGE_MAX_USES = 20      # navegaciones tras las que una pagina se cierra en vez de reciclarse
 PLAYWRIGHT_BROWSER_TYPE = "chromium"
+# Aborta imagenes, fuentes, estilos, publicidad... (BLOCKED_RESOURCE_TYPES en cada modulo de sources para cambiarlo)
+PLAYWRIGHT_ABORT_REQUEST = "corruption_detector.browser.abort_request"
+
+DOWNLOADER_MIDDLEWARES = {
+    "corruption_detector.middlewares.DomainRateLimitMiddleware": 650,
+    "corruption_detector.middlewares.PlaywrightPoolMiddleware": 700,
+}
+
+# Descarga estatica primero y Playwright solo cuando hace falta (fetch_strategy.FetchStrategy)
+FETCH_STATS_ENABLED = True
+FETCH_STATS_PATH = str(DATA_DIR / "fetch_stats.db")
+FETCH_STATIC_MIN_SAMPLES = 10      # intentos estaticos antes de decidir que una fuente necesita navegador
+FETCH_STATIC_MIN_RATE = 0.2        # proporcion minima de paginas estaticas con contenido
+FETCH_STATIC_PROBE_EVERY = 20      # cada cuantas paginas se vuelve a probar en estatico una fuente que necesita navegador
+
+# Sentimiento por lotes (pysentimiento en un hilo aparte)
+SENTIMENT_BATCH_SIZE = 16
+SENTIMENT_MAX_WAIT = 0.5        # segundos maximos para completar un lote
+SENTIMENT_MAX_TOKENS = 128      # tokens por texto (o por trozo)
+SENTIMENT_POLICY = "head"       # "head", "head_tail" o "chunks"
+SENTIMENT_MAX_CHUNKS = 4
+
+# NER por lotes en CorruptionDetectorPipeline (nlp.pipe)
+NER_BATCH_SIZE = 32
+NER_MAX_WAIT = 2.0              # segundos maximos que un item espera a completar su lote
+NER_N_PROCESS = 1
+
+# Cache de articulos compartida entre jobs
+ARTICLE_CACHE_ENABLED = True
+ARTICLE_CACHE_PATH = str(DATA_DIR / "articles.db")
+ARTICLE_CACHE_TTL = 86400          # segundos que un articulo se considera fresco
+ARTICLE_CACHE_LISTING_TTL = 3600   # segundos que se reutilizan los enlaces de una portada
+
+# Indice de texto completo de articulos (busquedas sin crawl) y periodo del ingester de fondo
+ARTICLE_INDEX_ENABLED = True
+ARTICLE_INDEX_PATH = str(DATA_DIR / "index.db")
+INGEST_INTERVAL = 900              # segundos entre crawls de ingesta
 
 FEED_URI = ""
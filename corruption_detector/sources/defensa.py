@@ -1,6 +1,9 @@
 # sources/defensa.py
 
 START_URL = "https://www.defensa.com/"
+#ritmo de peticiones a esta fuente (ver corruption_detector/politeness.py)
+RATE_LIMIT = 0.5
+CONCURRENCY = 2
 
 def extract_article_links(selector):
     """
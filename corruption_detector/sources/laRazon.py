@@ -1,5 +1,9 @@
 # Fichero: sources/laRazon.py
 
+#ritmo de peticiones a esta fuente (ver corruption_detector/politeness.py)
+RATE_LIMIT = 0.5
+CONCURRENCY = 2
+
 def extract_article_links(selector):
     """
     Recibe un scrapy.Selector de la portada de larazon.es y devuelve:
@@ -1,6 +1,9 @@
 # sources/rtve.py
 
 START_URL = "https://www.rtve.es/noticias/"
+#ritmo de peticiones a esta fuente (ver corruption_detector/politeness.py)
+RATE_LIMIT = 1.0
+CONCURRENCY = 3
 
 def extract_article_links(selector):
     """
@@ -1,6 +1,11 @@
 # sources/veinteMinutos.py
 
 START_URL = "https://www.20minutos.es/"
+#ritmo de peticiones a esta fuente (ver corruption_detector/politeness.py)
+RATE_LIMIT = 1.0
+CONCURRENCY = 3
+#los articulos de 20minutos traen el cuerpo en el HTML estatico: nunca hace falta Playwright (ver fetch_strategy)
+STATIC_ARTICLES = True
 
 def extract_article_links(selector):
     """
@@ -1,6 +1,9 @@
 # Fichero: sources/vozPopuli.py
 
 START_URL = "https://www.vozpopuli.com/"
+#ritmo de peticiones a esta fuente (ver corruption_detector/politeness.py)
+RATE_LIMIT = 0.5
+CONCURRENCY = 2
 
 def extract_article_links(selector):
     """
@@ -4,11 +4,24 @@ import scrapy
 import asyncio
 from scrapy_playwright.page import PageMethod
 from scrapy.exceptions import CloseSpider
+from scrapy.utils.defer import deferred_from_coro
 from corruption_detector.items import CorruptionItem
 from corruption_detector.sources import elConfidencial, rtve, veinteMinutos, defensa, laRazon, vozPopuli
-import unicodedata
-import re
-from pysentimiento import create_analyzer
+from corruption_detector.matcher import TermMatcher
+from corruption_detector.sentiment import SentimentBatcher
+from corruption_detector.nlp_server import NLPClient
+from corruption_detector.article_cache import ArticleCache, canonical_url
+from corruption_detector.article_index import ArticleIndex
+from corruption_detector.fetch_strategy import ARTICLE, LISTING, FetchStrategy
+from corruption_detector.browser import PagePool
+from corruption_detector.frontier import CrawlFrontier
+from corruption_detector.fingerprints import FingerprintStore
+from corruption_detector.politeness import default_limits, download_slots
+from corruption_detector.urlnorm import page_canonical_url
+from corruption_detector.results_io import iter_results
+from corruption_detector import textnorm
+from corruption_detector.textnorm import normalize_term
+import json
 
 
 MIN_RISK_SCORE = 3
@@ -88,6 +101,109 @@ SOURCES = {
     "vozpopuli.com": vozPopuli
 }
 
+#modos del spider: "crawl" (job normal), "index_then_crawl" (completa un fichero de resultados que ya tiene
+#los aciertos del indice, saltandose esos articulos) e "ingest" (ingester de fondo: indexa todo sin filtrar)
+SPIDER_MODES = ("crawl", "index_then_crawl", "ingest")
+
+
+def assess_risk(found_corr, critical_terms, sentiment=None):
+    """
+Calcula la puntuacion de riesgo, el nivel de alerta y la polaridad de un articulo.
+
+Args:
+    found_corr: Indicadores de corrupcion encontrados (normalizados).
+    critical_terms: Terminos criticos (normalizados).
+    sentiment: Resultado de sentimiento con ``output`` y ``probas``, o None si no se conoce.
+
+Returns:
+    (score, level, polarity)
+    """
+    #puntuacion base a partir de los terminos encontrados, asignando 10 puntos por terminos criticos y 5 por terminos normales
+    score = sum(10 if kw in critical_terms else 5 for kw in found_corr)
+    polarity = 0.0
+    if sentiment is not None:
+        #como lo que devuelve pysentimiento es un diccionario con las probabilidades de cada sentimiento, calculamos la polaridad como la diferencia entre la probabilidad positiva y negativa
+        #de esta manera, si es positivo, la polaridad sera positiva y si es negativo, la polaridad sera un numero negativo.
+        polarity = sentiment.probas.get('POS', 0.0) - sentiment.probas.get('NEG', 0.0)
+        #si es negativo aniadimos hasta 10 puntos extra, proporcionales a que tan negativo es
+        if sentiment.output == 'NEG':
+            score += int(sentiment.probas.get('NEG', 0.0) * 10)
+    #definimos el nivel de alerta segun los terminos encontrados y la puntuacion de riesgo
+    if any(kw in critical_terms for kw in found_corr):
+        level = "CRÍTICA"
+    elif score > 15:
+        level = "ALTA"
+    else:
+        level = "MEDIA"
+    return score, level, polarity
+
+
+def parse_contract_terms(contract_terms) -> list:
+    """
+Terminos de contrato del argumento del spider.
+
+Args:
+    contract_terms: Lista, lista en JSON (la que pasa la cola de jobs, para que un termino con comas como
+        "Suministro de papel, toner y material de oficina" llegue entero) o cadena separada por comas (-a en la
+        linea de comandos).
+
+Returns:
+    list: Terminos sin normalizar, sin los vacios.
+    """
+    if isinstance(contract_terms, str):
+        value = contract_terms.strip()
+        if value.startswith("["):
+            contract_terms = json.loads(value)
+        else:
+            contract_terms = value.split(",")
+    return [t for t in (contract_terms or ()) if t and t.strip()]
+
+
+def term_notices_map(notice_terms) -> dict:
+    """
+Invierte el reparto de terminos de un lote de avisos (ver /upload_contracts) para poder atribuir cada articulo
+a los avisos cuyos terminos contiene.
+
+Args:
+    notice_terms: id del aviso -> lista de terminos del aviso, como dict o como JSON (argumento del spider).
+
+Returns:
+    dict: termino normalizado -> ids de los avisos que lo tienen.
+    """
+    if isinstance(notice_terms, str):
+        notice_terms = json.loads(notice_terms)
+    term_notices = {}
+    for notice_id, terms in (notice_terms or {}).items():
+        for term in terms:
+            ids = term_notices.setdefault(normalize_term(term), [])
+            if notice_id not in ids:
+                ids.append(notice_id)
+    return term_notices
+
+
+def attribute_notices(found_contract, term_notices: dict) -> list:
+    """Ids de los avisos de un lote cuyos terminos (normalizados) aparecen en found_contract."""
+    ids = []
+    for term in found_contract:
+        ids.extend(i for i in term_notices.get(term, ()) if i not in ids)
+    return sorted(ids)
+
+
+#analizador de pysentimiento compartido por todos los spiders de un mismo proceso (por ejemplo un worker de la cola de jobs que ejecuta varios crawls seguidos)
+_sentiment_analyzer = None
+
+
+def get_sentiment_analyzer():
+    """
+Devuelve el analizador de sentimiento de pysentimiento de este proceso, creandolo la primera vez.
+    """
+    global _sentiment_analyzer
+    if _sentiment_analyzer is None:
+        from pysentimiento import create_analyzer
+        _sentiment_analyzer = create_analyzer(task="sentiment", lang="es")
+    return _sentiment_analyzer
+
+
 class MultiSourceSpider(scrapy.Spider):
     
     """
@@ -97,26 +213,29 @@ calcula score de riesgo y sentimiento, y retorna los items para ser procesados p
 
 Settings específicos:
     - Usamos Playwright para renderizar javascript y cargar contenido dinámico.
-    - definimos un límite de páginas y retrasos para no saturar las webs
+    - definimos un límite de páginas y, por fuente, un ritmo de peticiones para no saturar las webs
     """
     
     name = "multisource_spider"
     custom_settings = {
         "PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT": 15000,
         "CLOSESPIDER_PAGECOUNT": 200,
-        "DEPTH_LIMIT": 1,
-        "DOWNLOAD_DELAY": 2,
-        "AUTOTHROTTLE_ENABLED": True,
-        "AUTOTHROTTLE_START_DELAY": 3,
-        "AUTOTHROTTLE_MAX_DELAY": 10,
+        #la profundidad la controlamos nosotros (FRONTIER_MAX_DEPTH paginas por cadena de portadas)
+        "DEPTH_LIMIT": 0,
+        #los retardos son por fuente (slots del downloader, ver update_settings), no los de AutoThrottle
+        "AUTOTHROTTLE_ENABLED": False,
     }
 
+    #portadas (inicial, secciones y paginas siguientes) por fuente y paginas por cadena de next_page; from_crawler
+    #los toma de FRONTIER_MAX_PAGES y FRONTIER_MAX_DEPTH
     MAX_PAGES_PER_SOURCE = 1
+    MAX_LISTING_DEPTH = 1
     MAX_LINKS_PER_PAGE = 30
 
     # # Normaliza el texto: elimina acentos, convierte a minúsculas, quita puntuación y espacios extra
     # # Devuelve el texto normalizado.
-    def normalize(self, text: str) -> str:
+    @staticmethod
+    def normalize(text: str) -> str:
         """
     Normalizamos un texto eliminando acentos, pasando a ASCII,
     convirtiendo a minúsculas y quitando puntuación / espacios extra.
@@ -127,70 +246,174 @@ Settings específicos:
     Returns:
         str: Texto limpio y normalizado.
         """
-        text = unicodedata.normalize("NFKD", text)
-        text = text.encode("ascii", "ignore").decode("ascii")
-        text = text.lower()
-        text = re.sub(r"[^\w\s]", " ", text)
-        text = re.sub(r"\s+", " ", text).strip()
-        return text
-
-    def __init__(self, *args, contract_terms=None, result_path=None, **kwargs):
+        #la implementacion (tabla de translate y regex compilada) vive en textnorm, compartida con los pipelines
+        return textnorm.normalize(text)
+
+    def __init__(self, *args, contract_terms=None, result_path=None, mode="crawl", notice_terms=None, **kwargs):
         """
     Inicializa el spider con los terminos de contrato y la ruta de resultados.
 
     Args:
-        contract_terms (str): Cadena con los terminos separados por comas.
+        contract_terms (str): Terminos como lista JSON o separados por comas (ver parse_contract_terms).
         result_path (str): Ruta del fichero JSON donde volcar el output.
+        mode (str): Uno de SPIDER_MODES. En "ingest" no hacen falta terminos de contrato.
+        notice_terms (str): JSON id de aviso -> terminos, si el crawl es de un lote de avisos; cada item
+            lleva en ``notices`` los avisos a los que corresponde.
         """
         super().__init__(*args, **kwargs)
-        if not contract_terms:
+        if mode not in SPIDER_MODES:
+            raise CloseSpider(f"Modo desconocido: {mode} (validos: {', '.join(SPIDER_MODES)})")
+        self.mode = mode
+        if not contract_terms and mode != "ingest":
             raise CloseSpider("Debes pasar los terminos del contrato con: -a contract_terms=\"T1,T2,...\"")
         self.result_path = result_path
         #normalizamos los terminos necesarios como los terminos de contrato, los indicadores de corrupcion y los terminos criticos.
-        self.contract_terms = {self.normalize(t) for t in contract_terms.split(",")}
-        self.corruption_indicators = {self.normalize(kw) for kw in BASE_CORRUPTION_INDICATORS}
-        self.critical_terms = {self.normalize(t) for t in CRITICAL_TERMS}
+        self.contract_terms = {normalize_term(t) for t in parse_contract_terms(contract_terms)} - {""}
+        self.corruption_indicators = {normalize_term(kw) for kw in BASE_CORRUPTION_INDICATORS}
+        self.critical_terms = {normalize_term(t) for t in CRITICAL_TERMS}
+        self.term_notices = term_notices_map(notice_terms)
+        #compilamos todos los terminos en un unico automata para recorrer cada articulo una sola vez
+        self.matcher = TermMatcher(self.contract_terms | self.corruption_indicators)
         #inicializamos un contador de páginas procesadas por fuente
         self._pages_done = {domain: 0 for domain in SOURCES}
-        #inicializamos el analizador de sentimientos de pysentimiento para analizar el sentimiento de los articulos 
-        self.sentiment_analyzer = create_analyzer(task="sentiment", lang="es")
+        #el analizador de sentimientos y su cola de inferencia por lotes se crean en from_crawler, cuando ya tenemos acceso a los settings
+        self.sentiment_analyzer = None
+        self.nlp_client = None
+        #estatico o Playwright por fuente; from_crawler la sustituye por la que guarda los contadores en disco
+        self.fetch = FetchStrategy()
+        #paginas de Playwright que se reciclan entre peticiones en lugar de cerrarlas
+        self.pages = PagePool()
+        self.sentiment = None
+        #cache de articulos compartida entre jobs e indice de texto completo (tambien se crean en from_crawler)
+        self.cache = None
+        self.frontier = None
+        self.fingerprints = None
+        self.index = None
+        #URLs canonicas de los articulos ya procesados en este crawl (un articulo puede salir en varias portadas);
+        #en "index_then_crawl" empieza con los aciertos del indice que ya estan en el fichero de resultados
+        self.seen_links = set()
+        if mode == "index_then_crawl" and result_path:
+            self.seen_links = {canonical_url(it["link"]) for it in iter_results(result_path) if it.get("link")}
+
+    @classmethod
+    def update_settings(cls, settings):
+        """
+    Anade a DOWNLOAD_SLOTS un slot por fuente con su RATE_LIMIT y su CONCURRENCY (ver corruption_detector.politeness).
+    Los slots que ya vengan en DOWNLOAD_SLOTS desde los ajustes tienen prioridad.
+        """
+        super().update_settings(settings)
+        if settings.getbool("POLITENESS_ENABLED", True):
+            slots = download_slots(SOURCES, default_limits(settings))
+            slots.update(settings.getdict("DOWNLOAD_SLOTS"))
+            settings.set("DOWNLOAD_SLOTS", slots, priority="spider")
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        """
+    Crea el spider, arranca la cola de sentimiento por lotes con los ajustes SENTIMENT_* del proyecto y abre la cache de articulos.
+    Si el servidor NLP persistente esta arrancado usamos su modelo ya cargado; si no, cargamos pysentimiento en este proceso.
+        """
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        settings = crawler.settings
+        batch_kwargs = dict(
+            batch_size=settings.getint("SENTIMENT_BATCH_SIZE", 16),
+            max_wait=settings.getfloat("SENTIMENT_MAX_WAIT", 0.5),
+            max_tokens=settings.getint("SENTIMENT_MAX_TOKENS", 128),
+            policy=settings.get("SENTIMENT_POLICY", "head"),
+            max_chunks=settings.getint("SENTIMENT_MAX_CHUNKS", 4),
+        )
+        spider.nlp_client = NLPClient.connect()
+        if spider.nlp_client:
+            spider.logger.info("Usando el servidor NLP persistente para el sentimiento")
+            spider.sentiment = SentimentBatcher(spider.nlp_client.sentiment, **batch_kwargs)
+        else:
+            spider.sentiment_analyzer = get_sentiment_analyzer()
+            spider.sentiment = SentimentBatcher.from_analyzer(spider.sentiment_analyzer, **batch_kwargs)
+        spider.cache = ArticleCache.from_settings(settings)
+        spider.index = ArticleIndex.from_settings(settings)
+        spider.fetch = FetchStrategy.from_settings(settings)
+        spider.pages = PagePool.from_settings(settings)
+        spider.frontier = CrawlFrontier.from_settings(settings)
+        spider.fingerprints = FingerprintStore.from_settings(settings)
+        spider.MAX_PAGES_PER_SOURCE = settings.getint("FRONTIER_MAX_PAGES", cls.MAX_PAGES_PER_SOURCE)
+        spider.MAX_LISTING_DEPTH = settings.getint("FRONTIER_MAX_DEPTH", cls.MAX_LISTING_DEPTH)
+        return spider
+
+    def closed(self, reason):
+        """
+    Al cerrar el spider paramos el hilo de inferencia de sentimiento y cerramos la cache.
+    Las paginas del pool de Playwright se cierran de forma asincrona: devolvemos su Deferred y Scrapy espera a que
+    terminen antes de parar el navegador y el reactor (y registra el error si alguna falla).
+        """
+        if self.sentiment is not None:
+            self.sentiment.close()
+        if self.nlp_client is not None:
+            self.nlp_client.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.index is not None:
+            self.index.close()
+        if self.frontier is not None:
+            self.frontier.close()
+        if self.fingerprints is not None:
+            self.fingerprints.close()
+        self.fetch.close()
+        return deferred_from_coro(self.pages.close())
 
    
     def start_requests(self):
         """
     Generamos aqui las peticiones iniciales a cada dominio de SOURCES.
-    Usamos Playwright para renderizado o espera de selectores segun el modulo que estemos utilizando.
+    Segun FetchStrategy la portada se pide primero sin Playwright (si no trae enlaces, parse_source la vuelve a
+    pedir renderizada) o directamente con Playwright, esperando al selector de lista del modulo si lo tiene.
+    Si la cache de articulos tiene todavia fresca la lista de enlaces de una portada, no la volvemos a descargar.
         """
         for domain, module in SOURCES.items():
             #cada modulo tiene definida su STAT_URL asi que la pegamos al dominio para iniciar el scraping.
             start_url = getattr(module, "START_URL", f"https://{domain}")
-            #si en el modulo hay un selector de lista definido, usamos ese para esperar a que cargue la lista de articulos. sino usamos el estado de carga por defecto
-            if hasattr(module, "LIST_SELECTOR"):
-                pw_methods = [PageMethod("wait_for_selector", module.LIST_SELECTOR, timeout=15000)]
-            else:
-                pw_methods = [PageMethod("wait_for_load_state", "domcontentloaded", timeout=15000)]
-            #generamos la peticion inicial con Playwright y el callback parse_source.
-            yield scrapy.Request(
-                start_url,
-                callback=self.parse_source,
-                errback=self.on_timeout,
-                meta={
-                    "source_domain": domain,
-                    "playwright": True,
-                    "playwright_include_page": True,
-                    "playwright_page_methods": pw_methods,
-                }
-            )
+            #ademas de la portada, las secciones que declare el modulo (cada una con su propia cadena de next_page)
+            for url in [start_url, *getattr(module, "SECTION_URLS", ())]:
+                yield self.listing_request(domain, url, depth=0)
+
+    def listing_request(self, domain: str, url: str, depth: int) -> scrapy.Request:
+        """
+    Peticion de una portada (o de una de sus paginas siguientes) con el callback parse_source.
+
+    Args:
+        domain: Dominio de la fuente.
+        url: URL de la portada.
+        depth: Posicion en la cadena de next_page (0 para la portada o seccion inicial).
+        """
+        module = SOURCES[domain]
+        meta = {"source_domain": domain, "listing_url": url, "listing_depth": depth}
+        #si la portada esta en la cache usamos una peticion data: (no sale a la red) que lleva los enlaces guardados hasta parse_source
+        #(el ingester siempre vuelve a leer la portada para descubrir articulos nuevos)
+        cached_links = self.cache.get_listing(url) if self.cache and self.mode != "ingest" else None
+        if cached_links is not None:
+            self.logger.info(f"{domain}: portada servida desde la cache ({len(cached_links)} enlaces)")
+            meta["cached_links"] = cached_links
+            return scrapy.Request("data:,", callback=self.parse_source, dont_filter=True, meta=meta)
+        #el slot del downloader es el de la fuente (sus limites de ritmo y concurrencia), tambien para el scheduler
+        meta["download_slot"] = domain
+        if self.fetch.use_static(domain, module, LISTING):
+            meta["fetch_static"] = LISTING
+        else:
+            meta.update(self.listing_playwright_meta(module))
+        return scrapy.Request(url, callback=self.parse_source, errback=self.on_timeout, meta=meta)
     
    
     async def parse_source(self, response):
         """
     Parseamos la pagina de listado de artículos de una determinada fuente,
     extraemos los enlaces y reenviamos a parse_article, se define como una funcion asincrona porque necesitamos que interactue con playwright.
+    Los articulos que estan frescos en la cache no se descargan: se les pasa directamente el matcher de terminos.
+    Si la pagina tiene next_page lo seguimos mientras la frontera de crawl diga que sigue habiendo articulos nuevos.
 
     Args:
         response (scrapy.Response): Respuesta de la petición de listado.
         """
+        #si es una pagina de Playwright, usamos su metodo content() para obtener el HTML completo (y la devolvemos al pool aunque no la usemos)
+        html = await self.page_html(response)
         if response.status != 200:
             self.logger.warning(f"Skipping non-200 page {response.status}: {response.url}")
             return
@@ -200,70 +423,239 @@ Settings específicos:
         self._pages_done[domain] += 1
         if self._pages_done[domain] > self.MAX_PAGES_PER_SOURCE:
             return
-        
-        #obtenemos el html de la respuesta, si es una pagina de Playwright, usamos su metodo content() para obtener el HTML completo.
-        page = response.meta.get("playwright_page")
-        html = ""
-        if page:
-            try:
-                html = await page.content()
-            finally:
-                await page.close()
-        #creamos un selector de Scrapy a partir del HTML obtenido, si no hay HTML, usamos el texto de la respuesta.
-        selector = scrapy.Selector(text=html or response.text)
-        #extraemos los enlaces de los articulos usando el metodo extract_article_links del modulo correspondiente al dominio y limitamos a MAX_LINKS_PER_PAGE.
-        links, _ = SOURCES[domain].extract_article_links(selector)
-        links = links[: self.MAX_LINKS_PER_PAGE]
-        
+
+        listing_url = response.meta.get("listing_url", response.url)
+        depth = response.meta.get("listing_depth", 0)
+        links = response.meta.get("cached_links")
+        next_page = None
+        if links is None:
+            #creamos un selector de Scrapy a partir del HTML obtenido, si no hay HTML, usamos el de la respuesta (con response para los modulos que usan urljoin).
+            selector = scrapy.Selector(text=html) if html else response.selector
+            #extraemos los enlaces de los articulos usando el metodo extract_article_links del modulo correspondiente al dominio y limitamos a MAX_LINKS_PER_PAGE.
+            links, next_page = SOURCES[domain].extract_article_links(selector)
+            #sin parametros de seguimiento ni variante AMP (urlnorm.canonical_url)
+            links = [(title, canonical_url(response.urljoin(link))) for title, link in links[: self.MAX_LINKS_PER_PAGE]]
+            next_page = response.urljoin(next_page) if next_page else None
+            self.record_fetch(domain, LISTING, response.meta, ok=bool(links))
+            #portada pedida sin Playwright y sin enlaces: la volvemos a pedir renderizada
+            if not links and response.meta.get("fetch_static"):
+                self._pages_done[domain] -= 1
+                yield self.render_request(response.url, response.meta, LISTING)
+                return
+            if self.cache:
+                self.cache.put_listing(listing_url, links)
+            if self.frontier:
+                self.frontier.put_listing(listing_url, domain, next_page)
+        elif self.frontier:
+            #portada servida desde la cache: el next_page lo guardo la frontera cuando se descargo
+            next_page = self.frontier.next_page(listing_url)
+
+        #los enlaces que ya sabemos que son alias de otra URL (por su rel=canonical / og:url) pasan a la canonica
+        if self.fingerprints:
+            resolved = self.fingerprints.resolve(link for _, link in links)
+            aliases = sum(1 for _, link in links if resolved.get(link, link) != link)
+            if aliases:
+                self.crawler.stats.inc_value("fingerprints/alias", aliases)
+                links = [(title, resolved.get(link, link)) for title, link in links]
+
+        known = {}
+        if self.frontier:
+            known = self.frontier.known(link for _, link in links)
+            self.frontier.add_seen(domain, [link for _, link in links if link not in known])
+
+        #siguiente pagina de la portada, mientras queden paginas en la cadena y la pagina actual traiga articulos nuevos
+        if next_page and depth + 1 < self.MAX_LISTING_DEPTH:
+            if self.frontier:
+                stop = self.frontier.paginate_reason([link for _, link in links], known)
+            else:
+                stop = None if links else "empty"
+            if stop is None:
+                yield self.listing_request(domain, next_page, depth + 1)
+            else:
+                self.crawler.stats.inc_value(f"frontier/stop/{stop}")
+                self.logger.info(f"{domain}: no seguimos a {next_page} ({stop})")
+
         self.logger.info(f"{domain}: procesando {len(links)} enlaces (página {self._pages_done[domain]})")
-        #para todos los dominios excepto 20minutos.es, usamos Playwright para cargar los articulos, esto es tras haber detectado que 20minutos.es no requiere Playwright para cargar sus articulos correctamente
-        for title, link in links:
-            meta = {"source_domain": domain, "original_title": title}
-            if domain != "20minutos.es":
-                meta.update({
-                    "playwright": True,
-                    "playwright_include_page": True,
-                    "playwright_page_methods": [
-                        PageMethod("wait_for_load_state", "domcontentloaded", timeout=15000)
-                    ]
-                })
-            #enviamos una nueva peticion a cada enlace de articulo, con el callback parse_article y el errback on_timeout.
-            yield response.follow(
-                link,
-                callback=self.parse_article,
-                errback=self.on_timeout,
-                meta=meta
-            )
-   
+        #los aciertos de la cache se puntuan todos a la vez: se lanzan como tareas segun aparecen (uno a uno, cada
+        #articulo esperaria solo a que el lote de sentimiento venza por SENTIMENT_MAX_WAIT) y se recogen al final
+        cache_hits = []
+        failure = None
+        try:
+            for title, link in links:
+                key = canonical_url(link)
+                #un mismo articulo puede salir en varias portadas o paginas: solo lo procesamos una vez por crawl
+                if key in self.seen_links:
+                    continue
+                self.seen_links.add(key)
+                #el ingester no vuelve a descargar lo que ya descargo hace poco (ya esta en el indice)
+                if self.mode == "ingest" and self.frontier and self.frontier.recently_crawled(known.get(link)):
+                    self.crawler.stats.inc_value("frontier/skipped")
+                    continue
+                cached = self.cache.get(link) if self.cache else None
+                #articulo fresco en la cache: solo hay que pasarle el matcher, sin descargar nada
+                if cached is not None and cached.fresh:
+                    self.crawler.stats.inc_value("article_cache/hit")
+                    cache_hits.append(asyncio.ensure_future(self.score_article(
+                        link, domain, cached.title, cached.paragraphs, cached.author, cached.pub_date, cached.norm_text)))
+                    continue
+
+                meta = {"source_domain": domain, "download_slot": domain, "original_title": title, "article_url": link}
+                headers = cached.validators() if cached is not None else {}
+                if headers:
+                    #articulo caducado con ETag/Last-Modified: lo revalidamos con una peticion condicional sin Playwright y si contesta 304 usamos la copia
+                    self.crawler.stats.inc_value("article_cache/revalidate")
+                    meta.update({"cached_article": True, "handle_httpstatus_list": [304]})
+                elif self.fetch.use_static(domain, SOURCES[domain], ARTICLE):
+                    #primero sin Playwright: si los selectores del modulo vuelven vacios, parse_article lo pide renderizado
+                    meta["fetch_static"] = ARTICLE
+                else:
+                    meta.update(self.article_playwright_meta())
+                if cached is None:
+                    self.crawler.stats.inc_value("article_cache/miss")
+                #enviamos una nueva peticion a cada enlace de articulo, con el callback parse_article y el errback on_timeout.
+                yield scrapy.Request(
+                    link,
+                    headers=headers or None,
+                    callback=self.parse_article,
+                    errback=self.on_timeout,
+                    meta=meta
+                )
+        except GeneratorExit:
+            #el spider se esta cerrando y ya nadie va a recoger los items
+            for task in cache_hits:
+                task.cancel()
+            raise
+        except Exception as e:
+            failure = e
+        #los aciertos ya lanzados se entregan aunque el bucle se haya cortado por una excepcion
+        for item in await asyncio.gather(*cache_hits):
+            if item is not None:
+                yield item
+        if failure is not None:
+            raise failure
+
+    @staticmethod
+    def listing_playwright_meta(module) -> dict:
+        """Meta de Playwright para renderizar una portada: esperamos al LIST_SELECTOR del modulo si lo tiene."""
+        #si en el modulo hay un selector de lista definido, usamos ese para esperar a que cargue la lista de articulos. sino usamos el estado de carga por defecto
+        if hasattr(module, "LIST_SELECTOR"):
+            pw_methods = [PageMethod("wait_for_selector", module.LIST_SELECTOR, timeout=15000)]
+        else:
+            pw_methods = [PageMethod("wait_for_load_state", "domcontentloaded", timeout=15000)]
+        return {
+            "playwright": True,
+            "playwright_include_page": True,
+            "playwright_page_methods": pw_methods,
+        }
+
+    @staticmethod
+    def article_playwright_meta() -> dict:
+        """Meta de Playwright que usamos para renderizar un articulo."""
+        return {
+            "playwright": True,
+            "playwright_include_page": True,
+            "playwright_page_methods": [
+                PageMethod("wait_for_load_state", "domcontentloaded", timeout=15000)
+            ]
+        }
+
+    def render_request(self, url: str, meta: dict, kind: str) -> scrapy.Request:
+        """
+    Vuelve a pedir con Playwright una portada o un articulo cuya version sin Playwright no tenia contenido
+    (o no se pudo descargar).
+
+    Args:
+        url: URL de la pagina.
+        meta: Meta de la peticion original (se conservan solo los datos de la fuente y del articulo).
+        kind: LISTING o ARTICLE.
+        """
+        keep = ("source_domain", "download_slot", "listing_url", "listing_depth", "original_title", "article_url")
+        new_meta = {k: v for k, v in meta.items() if k in keep}
+        if kind == LISTING:
+            new_meta.update(self.listing_playwright_meta(SOURCES[new_meta["source_domain"]]))
+            callback = self.parse_source
+        else:
+            new_meta.update(self.article_playwright_meta())
+            callback = self.parse_article
+        return scrapy.Request(url, callback=callback, errback=self.on_timeout, meta=new_meta, dont_filter=True)
+
+    async def page_html(self, response) -> str:
+        """
+    HTML renderizado de una respuesta de Playwright ("" si la peticion no llevaba pagina). La pagina no se
+    cierra: vuelve al pool de su contexto para la siguiente peticion renderizada.
+        """
+        page = response.meta.get("playwright_page")
+        if not page:
+            return ""
+        try:
+            return await page.content()
+        finally:
+            await self.pages.release(page, response.meta.get("playwright_context"))
+
+    def record_fetch(self, domain: str, kind: str, meta: dict, ok: bool = True):
+        """Anota en FetchStrategy (y en las stats del crawl) si una pagina descargada traia contenido."""
+        static = not meta.get("playwright")
+        self.fetch.record(domain, kind, static, ok)
+        outcome = "rendered" if not static else "static_ok" if ok else "static_empty"
+        self.crawler.stats.inc_value(f"fetch/{kind}/{outcome}")
     
     async def parse_article(self, response):
         """
-    Extraemos aqui el contenido de un articulo, tambien se filtra por terminos de contrato y corrupcion,
-    calculamos puntuaciones de riesgo y sentimiento y generamos un CorruptionItem.
+    Extraemos aqui el contenido de un articulo, lo guardamos en la cache de articulos y lo pasamos
+    a score_article, que filtra por terminos de contrato y corrupcion y genera el CorruptionItem.
 
     Args:
         response (scrapy.Response): Respuesta de la petición al artículo.
         """
+        domain = response.meta["source_domain"]
+        module = SOURCES[domain]
+        url = response.meta.get("article_url", response.url)
+        html = await self.page_html(response)
+
+        #revalidacion de un articulo de la cache: el servidor dice que no ha cambiado
+        if response.status == 304 and response.meta.get("cached_article") and self.cache:
+            cached = self.cache.get(url)
+            if cached is not None:
+                self.cache.touch(url)
+                if self.frontier:
+                    self.frontier.mark_crawled(url, domain, cached.pub_date)
+                item = await self.score_article(url, domain, cached.title, cached.paragraphs,
+                                                cached.author, cached.pub_date, cached.norm_text)
+                if item is not None:
+                    yield item
+            return
         if response.status != 200:
             self.logger.warning(f"Skipping non-200 page {response.status}: {response.url}")
             return
-        domain = response.meta["source_domain"]
-        module = SOURCES[domain]
-
-        page = response.meta.get("playwright_page")
-        html = ""
-        if page:
-            try:
-                html = await page.content()
-            finally:
-                await page.close()
 
-        selector = scrapy.Selector(text=html or response.text)
+        selector = scrapy.Selector(text=html) if html else response.selector
         #cada modulo tiene su propio metodo para extraer el contenido del articulo, asi que llamamos al metodo correspondiente para cada fuente sino usamos el metodo por defecto
         try:
             title, paragraphs, author, pub_date = module.extract_article_content(selector, response.meta)
         except TypeError:
             title, paragraphs, author, pub_date = module.extract_article_content(selector)
+
+        self.record_fetch(domain, ARTICLE, response.meta, ok=bool(paragraphs))
+        #la revalidacion y el primer intento se hacen sin Playwright: si el HTML estatico viene vacio, lo volvemos a pedir renderizado
+        #(salvo en las fuentes que declaran que sus articulos no necesitan navegador)
+        static_try = response.meta.get("cached_article") or response.meta.get("fetch_static")
+        if static_try and not paragraphs and getattr(module, "STATIC_ARTICLES", None) is not True:
+            yield self.render_request(url, response.meta, ARTICLE)
+            return
+
+        #la pagina puede declarar otra URL canonica (la version no AMP, otra ruta...): el articulo se guarda con esa
+        #y la URL pedida queda como alias suyo para los siguientes crawls
+        if paragraphs:
+            declared = page_canonical_url(selector, url, domain)
+            if self.fingerprints:
+                self.fingerprints.add(url, declared)
+            if declared and declared != canonical_url(url):
+                if declared in self.seen_links:
+                    #otra URL del mismo articulo ya se ha procesado en este crawl
+                    self.crawler.stats.inc_value("fingerprints/duplicate")
+                    return
+                self.seen_links.add(declared)
+                url = declared
         
         #sino hemos conseguido extraer la fecha de publicacion, intentamos con metadatos alternativos genericos(implementado por problemas con algunos sitios que no tienen el selector de fecha esperado)
         if not pub_date:
@@ -279,66 +671,77 @@ Settings específicos:
                 except ValueError:
                     pub_date = ""
         pub_date = pub_date or ""
+        if self.frontier and paragraphs:
+            self.frontier.mark_crawled(url, domain, pub_date)
 
         #normalizamos el titulo y el contenido del articulo, eliminamos espacios extra y saltos de linea
         raw_full = " ".join(p.strip() for p in paragraphs if p.strip())
         norm_text = self.normalize(title + " " + raw_full)
 
-        #creamos un conjunto de terminos de contrato encontrados y otro de indicadores de corrupcion encontrados
-        found_contract = {
-            t for t in self.contract_terms
-            if t in norm_text
-        }
+        #guardamos el articulo en la cache para que los siguientes jobs no tengan que volver a descargarlo
+        if self.cache and paragraphs:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            self.cache.put(
+                url, title, paragraphs, author, pub_date, norm_text,
+                etag=etag.decode("latin-1") if etag else None,
+                last_modified=last_modified.decode("latin-1") if last_modified else None,
+            )
+
+        item = await self.score_article(url, domain, title, paragraphs, author, pub_date, norm_text)
+        if item is not None:
+            yield item
+
+    async def score_article(self, url, domain, title, paragraphs, author, pub_date, norm_text):
+        """
+    Indexa el articulo, lo filtra por terminos de contrato y corrupcion, calcula las puntuaciones de riesgo
+    y sentimiento y construye el CorruptionItem. Se usa tanto para articulos recien descargados
+    como para los servidos desde la cache.
+
+    Returns:
+        CorruptionItem o None si el articulo no es relevante (siempre None en modo "ingest").
+        """
+        raw_full = " ".join(p.strip() for p in paragraphs if p.strip())
+        preview = (title + " " + raw_full)[:800].rstrip() + "…"
+
+        #todo articulo extraido pasa al indice de texto completo para las busquedas sin crawl
+        if self.index is not None and paragraphs:
+            self.index.add(url, domain, title.strip(), author, pub_date, preview, norm_text)
+        if self.mode == "ingest":
+            #el ingester no filtra: calcula el sentimiento de cada articulo nuevo para que /search pueda puntuar sin el modelo
+            if self.index is not None and paragraphs and not self.index.has_sentiment(url):
+                sentiment_result = await asyncio.wrap_future(self.sentiment.submit(raw_full))
+                self.index.set_sentiment(url, sentiment_result)
+            return None
+
+        #recorremos el texto una sola vez con el automata y separamos los terminos de contrato de los indicadores de corrupcion encontrados
+        matches = self.matcher.scan(norm_text)
+        found = matches.found()
+        found_contract = found & self.contract_terms
         if not found_contract:
-            return
+            return None
 
-        found_corr = {
-            kw for kw in self.corruption_indicators
-            if kw in norm_text
-        }
+        found_corr = found & self.corruption_indicators
         if not found_corr:
-            return
+            return None
 
-        #calculamos una puntuacion base a partir de los terminos encontrados, asignando 10 puntos por terminos criticos y 5 por terminos normales
-        score = sum(10 if kw in self.critical_terms else 5 for kw in found_corr)
-        
-        #llamamos al analizador de sentimientos de pysentimiento para analizar el sentimiento del texto completo del articulo
-        sentiment_result = self.sentiment_analyzer.predict(raw_full)
-        
-        #sentiment_result.output es el label del sentimiento (ej: 'POS' o 'NEG')
-        sentiment_label = sentiment_result.output 
-        
-        # Guardamos la probabilidad del sentimiento detectado (ej: 0.9 si es 90% negativo, etc)
-        pos_proba = sentiment_result.probas.get('POS', 0.0)
-        neg_proba = sentiment_result.probas.get('NEG', 0.0)
-        #como lo que devuelve pysentimiento es un diccionario con las probabilidades de cada sentimiento, calculamos la polaridad como la diferencia entre la probabilidad positiva y negativa
-        #de esta manera, si es positivo, la polaridad sera positiva y si es negativo, la polaridad sera un numero negativo.
-        sentiment_polarity = pos_proba - neg_proba
+        #encolamos el texto en la etapa de sentimiento por lotes y esperamos su resultado sin bloquear el reactor
+        sentiment_result = await asyncio.wrap_future(self.sentiment.submit(raw_full))
+        if self.index is not None:
+            self.index.set_sentiment(url, sentiment_result)
 
-        #ajustamos la puntuación de riesgo segun el sentimiento:
-        if sentiment_label == 'NEG':
-            #aniadimos hasta 10 puntos extra, proporcionales a que tan negativo es
-            score += int(sentiment_result.probas['NEG'] * 10)
+        #puntuacion de riesgo (terminos + sentimiento), nivel de alerta y polaridad
+        score, level, sentiment_polarity = assess_risk(found_corr, self.critical_terms, sentiment_result)
         
         #si el score es menor que el minimo, no generamos el item
         if score < MIN_RISK_SCORE:
-            return
-
-        #definimos el nivel de alerta segun los terminos encontrados y la puntuacion de riesgo
-        if any(kw in self.critical_terms for kw in found_corr):
-            level = "CRÍTICA"
-        elif score > 15:
-            level = "ALTA"
-        else:
-            level = "MEDIA"
-
-        preview = (title + " " + raw_full)[:800].rstrip() + "…"
+            return None
 
         #finalmente creamos el item de Scrapy con los datos extraídos
         #y lo devolvemos para que sea procesado por el pipeline.
-        yield CorruptionItem(
+        item = CorruptionItem(
             title=title.strip(),
-            link=response.url,
+            link=url,
             content_preview=preview,
             source=domain,
             author=author,
@@ -348,13 +751,21 @@ Settings específicos:
             sentiment_polarity=round(sentiment_polarity, 2),
             risk_score=score,
             alert_level=level,
+            normalized_text=norm_text,
         )
+        #en el crawl de un lote de avisos anotamos a que avisos corresponde el articulo
+        if self.term_notices:
+            item["notices"] = attribute_notices(found_contract, self.term_notices)
+        return item
 
 
     def on_timeout(self, failure):
         """
     Manejador de errores de Playwright: cierra la página si existe,
     y reintenta la petición sin Playwright si procede.
+    Un error HTTP o de red en un intento sin Playwright de FetchStrategy no dice nada de si la fuente necesita
+    renderizar, asi que no se registra ni se escala: eso solo se decide con los selectores vacios en
+    parse_source / parse_article.
 
     Args:
         failure: Failure object de Scrapy con la request que ha fallado.
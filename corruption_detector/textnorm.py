@@ -0,0 +1,66 @@
+"""
+Normalizacion de texto compartida por el spider, los pipelines y la busqueda en el indice de articulos.
+
+Antes cada sitio tenia su version: el spider hacia NFKD + encode/decode ASCII + dos regex y el pipeline
+recorria caracter a caracter la forma NFD para quitar acentos. Aqui todo el trabajo por caracter se hace en C:
+
+- normalize: NFKD y paso a ASCII (que ya elimina acentos, ñ -> n...), y despues una unica tabla de
+  ``bytes.translate`` precalculada que pasa a minusculas y convierte en espacio todo lo que no es letra,
+  digito o "_"; ``split``/``join`` colapsa los espacios. Mismo resultado que la version con regex.
+- normalize_term: lo mismo con memoria, para terminos e indicadores que se normalizan una y otra vez.
+- strip_accents: NFD y una regex compilada que quita las marcas diacriticas del bloque U+0300-U+036F (todas
+  las del español); solo si queda alguna otra marca combinante se recorre el texto caracter a caracter.
+
+Una tabla de ``str.translate`` sobre los caracteres acentuados era mas lenta que NFKD: con caracteres no ASCII
+CPython resuelve cada caracter con una busqueda en el dict.
+"""
+
+import functools
+import re
+import unicodedata
+
+#byte ASCII -> el mismo en minuscula si es letra, digito o "_", y espacio en cualquier otro caso
+_WORD_BYTES = bytes(
+    c if chr(c).isascii() and (chr(c).isalnum() or c == ord("_")) else ord(" ") for c in range(256)
+).lower()
+#marcas diacriticas combinantes (acentos, tilde de la ñ, dieresis...)
+_MARKS_RE = re.compile(r"[\u0300-\u036f]+")
+_NON_ASCII_RE = re.compile(r"[^\x00-\x7f]")
+
+
+def normalize(text: str) -> str:
+    """
+Normalizamos un texto eliminando acentos, pasando a ASCII, convirtiendo a minúsculas y quitando
+puntuación / espacios extra. Es la forma que usan el matcher, la cache y el indice de articulos.
+
+Args:
+    text (str): Cadena original.
+
+Returns:
+    str: Texto limpio y normalizado.
+    """
+    data = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").translate(_WORD_BYTES)
+    return b" ".join(data.split()).decode("ascii")
+
+
+@functools.lru_cache(maxsize=8192)
+def normalize_term(term: str) -> str:
+    """normalize con memoria, para terminos de contrato, indicadores y terminos criticos."""
+    return normalize(term)
+
+
+def strip_accents(text: str) -> str:
+    """
+Eliminamos los acentos (marcas diacriticas) de una cadena, sin tocar mayusculas ni puntuacion.
+
+Args:
+    text (str): Texto de entrada.
+Returns:
+    str: Texto sin acentos.
+    """
+    if text.isascii():
+        return text
+    text = _MARKS_RE.sub("", unicodedata.normalize("NFD", text))
+    if text.isascii() or not any(unicodedata.combining(c) for c in _NON_ASCII_RE.findall(text)):
+        return text
+    return "".join(c for c in text if not unicodedata.combining(c))
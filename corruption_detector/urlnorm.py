@@ -0,0 +1,99 @@
+"""
+Forma canonica de las URLs de los articulos, compartida por la cache, el indice, la frontera y el spider.
+
+Un mismo articulo llega con URLs distintas segun desde donde se enlaza: con parametros de campaña
+(``utm_*``, ``fbclid``, ``ssm``...), en su version AMP (``/amp``, ``.amp.html``, ``?outputType=amp`` o a traves
+de la cache de AMP de Google) o con la query en otro orden. canonical_url quita todo eso y despues aplica
+``w3lib.url.canonicalize_url``, asi que todas esas variantes tienen la misma clave.
+
+Lo que no se puede deducir de la URL (un articulo publicado bajo dos rutas) lo declara la propia pagina con
+``<link rel="canonical">`` u ``og:url``: page_canonical_url lo lee y ``fingerprints.FingerprintStore`` guarda
+el alias para los siguientes crawls.
+"""
+
+import functools
+import hashlib
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from w3lib.url import canonicalize_url
+
+from corruption_detector.browser import match_domain, url_host
+
+#parametros de seguimiento que se quitan de la query (exactos y por prefijo)
+TRACKING_PARAMS = frozenset({
+    "fbclid", "gclid", "dclid", "gbraid", "wbraid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "_ga", "_gl", "ocid", "cmpid", "intcmp", "ns_campaign", "ns_mchannel", "ns_source", "ns_linkname",
+    "ssm", "autoref",
+})
+TRACKING_PREFIXES = ("utm_", "pk_", "mtm_", "__twitter")
+
+#variantes AMP: parametros de query y sufijos / segmentos de la ruta
+_AMP_PARAMS = {"amp": None, "outputtype": "amp", "output": "amp"}
+_AMP_SUFFIX_RE = re.compile(r"(?:/amp/?|\.amp)$")
+_AMP_EXT_RE = re.compile(r"[._]amp(\.html?)$")
+_AMP_CACHE_RE = re.compile(r"^/[a-z]/(s/)?(.+)$")
+
+
+def _tracking(key: str, value: str) -> bool:
+    key = key.lower()
+    if key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES):
+        return True
+    if key in _AMP_PARAMS:
+        return _AMP_PARAMS[key] is None or value.lower() == _AMP_PARAMS[key]
+    return False
+
+
+@functools.lru_cache(maxsize=16384)
+def canonical_url(url: str) -> str:
+    """
+Clave de una URL: sin fragmento, sin parametros de seguimiento, sin la variante AMP y con la query ordenada.
+
+Args:
+    url (str): URL absoluta.
+
+Returns:
+    str: URL canonica.
+    """
+    parts = urlsplit(url.strip())
+    #https://www-elpais-com.cdn.ampproject.org/c/s/elpais.com/... -> https://elpais.com/...
+    if (parts.hostname or "").endswith(".cdn.ampproject.org"):
+        m = _AMP_CACHE_RE.match(parts.path)
+        if m:
+            parts = urlsplit(("https://" if m.group(1) else "http://") + m.group(2)
+                             + (f"?{parts.query}" if parts.query else ""))
+    path = _AMP_EXT_RE.sub(r"\1", _AMP_SUFFIX_RE.sub("", parts.path)) or "/"
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _tracking(k, v)])
+    return canonicalize_url(urlunsplit((parts.scheme, parts.netloc, path, query, "")), keep_fragments=False)
+
+
+def page_canonical_url(selector, url: str, domain: str) -> Optional[str]:
+    """
+URL canonica que declara una pagina (``<link rel="canonical">`` u ``og:url``), si es de la misma fuente.
+
+Args:
+    selector (scrapy.Selector): HTML del articulo.
+    url (str): URL con la que se descargo (para resolver rutas relativas).
+    domain (str): Dominio de la fuente; una canonica de otro dominio se ignora.
+
+Returns:
+    str | None: Forma canonica de la URL declarada, o None si no hay, no es de la fuente o es la portada.
+    """
+    for query in ('link[rel="canonical"]::attr(href)', 'meta[property="og:url"]::attr(content)'):
+        href = (selector.css(query).get() or "").strip()
+        if not href:
+            continue
+        target = urljoin(url, href)
+        #algunas paginas ponen la portada como canonica: eso no identifica al articulo
+        if not urlsplit(target).path.strip("/"):
+            continue
+        if target.startswith(("http://", "https://")) and match_domain(url_host(target), (domain,)):
+            return canonical_url(target)
+    return None
+
+
+def url_fingerprint(url: str) -> int:
+    """Huella de 64 bits (con signo, para SQLite) de la forma canonica de una URL."""
+    digest = hashlib.blake2b(canonical_url(url).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
@@ -95,12 +95,22 @@ export default function App() {
    * @param {any[]} res Resultados obtenidos
    */
   const handleJobFinished = (id, res) => {
-    setJobs(js => js.map(j => j.id === id ? { ...j, results: res } : j))
+    setJobs(js => js.map(j => j.id === id ? { ...j, results: res, finished: true } : j))
     if (id === currentJobId) {
       setAllItems(res)
     }
   }
 
+  /**
+   * Callback con los resultados parciales de un job que sigue en marcha (llegan por el stream de eventos),
+   * asi se pueden consultar los primeros resultados sin esperar a que termine el crawl.
+   * @param {string} id Identificador del job
+   * @param {any[]} res Resultados recibidos hasta ahora
+   */
+  const handleJobPartial = (id, res) => {
+    setJobs(js => js.map(j => j.id === id && !j.finished ? { ...j, results: res } : j))
+  }
+
   /**
    * Handle: tras crear un job, lo añade a la lista y avanza a "Resultados" donde esperaremos hasta que termine y se muestren los mismos.
    * @param {string} id Identificador del nuevo job
@@ -154,7 +164,8 @@ export default function App() {
             {jobs.map(j => (
               <div key={j.id} className="p-4 border rounded-lg shadow-sm">
                 <JobStatus jobId={j.id}
-                  onFinished={res => handleJobFinished(j.id, res)} />
+                  onFinished={res => handleJobFinished(j.id, res)}
+                  onPartial={res => handleJobPartial(j.id, res)} />
                 {j.results && (
                   <Button variant="link"
                     className="mt-2"
@@ -1,59 +1,89 @@
 /**
  * @fileoverview
  * Componente que muestra el estado de un job de scraping/análisis y, cuando se completa,
- * solicita automáticamente sus resultados. Realiza polling al endpoint `/jobs/:jobId`
- * cada 5 segundos hasta que el estado es `finished`, y entonces llama a `onFinished(data)`.
+ * solicita automáticamente sus resultados. Se suscribe al stream de eventos `/jobs/:jobId/events`
+ * (Server-Sent Events) para recibir los cambios de estado, el progreso y los resultados parciales en cuanto
+ * se producen. Si el navegador no soporta EventSource o el stream falla, vuelve al polling de `/jobs/:jobId`
+ * cada 5 segundos. Cuando el estado es `finished` llama a `onFinished(data)`.
  */
 
 import React, { useEffect, useState, useRef } from 'react'
 const API = import.meta.env.VITE_API_URL
 
 /**
- * Basicamente este JobStatus.jsx realizara un polling periodico sobre el estado de un job y notificara
+ * Basicamente este JobStatus.jsx escucha los eventos de un job (o hace polling si no puede) y notificara
  * al final cuando haya resultados disponibles.
  *
  * @param {object} props
  * @param {string} props.jobId      Identificador del job a monitorizar.
  * @param {function(Array):void} props.onFinished  Callback que recibe el array de resultados
  *                                                (`/jobs/:jobId/results`) cuando el job termina.
+ * @param {function(Array):void} [props.onPartial] Callback opcional que recibe los resultados parciales
+ *                                                acumulados mientras el job sigue en marcha.
  *
  * @returns {JSX.Element|null}
- * - Mientras carga o hace polling, renderiza:  
- *   `Job <jobId>: <estado>`  
- * - Si ocurre un error en la peticion, muestra un mensaje en rojo con la cruz:  
+ * - Mientras carga, renderiza:
+ *   `Job <jobId>: <estado>` y, si hay progreso, las paginas, articulos e items encontrados.
+ * - Si ocurre un error en la peticion, muestra un mensaje en rojo con la cruz:
  *   `❌ <mensaje de error>`
  */
 
 
-export default function JobStatus({ jobId, onFinished }) {
+export default function JobStatus({ jobId, onFinished, onPartial }) {
   //estado actual del job: 'pending', 'running', 'finished', etc.
   const [status, setStatus] = useState('')
+  //progreso del crawl que envia el backend: { pages: {fuente: n}, articles: {fuente: n}, items: n }
+  const [progress, setProgress] = useState(null)
   //para en caso de que ocurra un error
   const [error, setError] = useState('')
   //creamos tambien la referencia para manejar el timeout del polling
   const timeoutRef = useRef(null)
   //y la referencia para evitar que se llame varias veces a onFinished
   const finishedRef = useRef(false)
-  //finalmente creamos una referencia para mantener la ultima version de onFinished
+  //finalmente creamos una referencia para mantener la ultima version de onFinished (y de onPartial)
   const onFinishedRef = useRef(onFinished)
+  const onPartialRef = useRef(onPartial)
 
   //mantenemos la referencia actualizada de onFinished para evitar problemas de cierre (closure) en el useEffect
   //esto es necesario porque si onFinished cambia, queremos que el useEffect use la nueva version
   //de esta forma, si el padre que en este caso es app.jsx cambia la funcion onFinished, el componente JobStatus usara la nueva version
   //Esto ha sido necesario hacerlo para desacoplar la logica del polling de los cambios que puedan producirse en el componente padre
   useEffect(() => { onFinishedRef.current = onFinished }, [onFinished])
+  useEffect(() => { onPartialRef.current = onPartial }, [onPartial])
 
-  //Cuando recibe un nuevo jobId, reinicia el estado y comienza el polling
+  //Cuando recibe un nuevo jobId, reinicia el estado y se suscribe a sus eventos
   useEffect(() => {
     if (!jobId) return
 
     //reiniciamos el estado y limpiamos el timeout
     finishedRef.current = false
     clearTimeout(timeoutRef.current)
+    setProgress(null)
+    let source = null
+    //resultados parciales recibidos por el stream
+    let partial = []
+
+    /**
+     * Solicita los resultados completos del job y se los pasa al callback `onFinished` (una sola vez).
+     */
+    const fetchResults = async () => {
+      if (finishedRef.current) return
+      finishedRef.current = true
+      //cancelamos el temporizador de polling, muy importante o sino podria seguir llamando a poll sin sentido (es un problema que he encontrado en el desarrollo de este componente).
+      clearTimeout(timeoutRef.current)
+      //solicitamos los resultados del job haciendo una llamada al endpoint /jobs/:jobId/results
+      const r2 = await fetch(`${API}/jobs/${jobId}/results`)
+      if (!r2.ok) throw new Error(`Error resultados (${r2.status})`)
+      const data = await r2.json()
+      //llamamos a onFinished con los datos obtenidos, esto es lo que hara que el componente padre (app.jsx) reciba los resultados del job
+      onFinishedRef.current(data)
+    }
+
     /**
      * Función que consulta el estado del job y, si ha terminado,
      * solicita y pasa los resultados al callback `onFinished`.
      * En caso contrario, vuelve a programarse tras 5s para seguir consultando.
+     * Solo se usa si no podemos recibir los eventos del job.
      */
     const poll = async () => {
       try {
@@ -64,36 +94,68 @@ export default function JobStatus({ jobId, onFinished }) {
         const { status: st } = await res.json()
         setStatus(st)
         //si el estado es finished y finishedRef.current es falso, significa que es la primera vez que recibimos el estado finished
-        if (st === 'finished' && !finishedRef.current) {
-
-          finishedRef.current = true
-          //cancelamos el temporizador de polling, muy importante o sino podria seguir llamando a poll sin sentido (es un problema que he encontrado en el desarrollo de este componente).
-          clearTimeout(timeoutRef.current)
-          //solicitamos los resultados del job haciendo una llamada al endpoint /jobs/:jobId/results
-          const r2 = await fetch(`${API}/jobs/${jobId}/results`)
-          if (!r2.ok) throw new Error(`Error resultados (${r2.status})`)
-          const data = await r2.json()
-          //llamamos a onFinished con los datos obtenidos, esto es lo que hara que el componente padre (app.jsx) reciba los resultados del job
-          onFinishedRef.current(data)
-        } else if (st !== 'finished') {
-          //si el estado no es finished, programamos el siguiente polling que como hemos dicho es cada 5 segundos
+        if (st === 'finished') {
+          await fetchResults()
+        } else if (st !== 'failed' && st !== 'cancelled') {
+          //si el estado no es final, programamos el siguiente polling que como hemos dicho es cada 5 segundos
           timeoutRef.current = setTimeout(poll, 5000)
         }
       } catch (e) {
         //si ocurre un error, lo guardamos en el estado de error
-        //y limpiamos el timeout para evitar que siga llamando a poll 
+        //y limpiamos el timeout para evitar que siga llamando a poll
         setError(e.message)
         clearTimeout(timeoutRef.current)
       }
     }
 
-    poll()
-    //limpiamos el timeout al desmontar o cambiar jobId, esta segunda llamada es estrictamente necesaria para evitar que se acumulen timeouts si el jobId cambia antes de que se complete el polling.
+    /**
+     * Se suscribe al stream de eventos del job. Si el navegador no soporta EventSource, o la conexion
+     * se pierde, cerramos el stream y seguimos con el polling.
+     */
+    const listen = () => {
+      if (typeof EventSource === 'undefined') return poll()
+      source = new EventSource(`${API}/jobs/${jobId}/events`)
+      source.addEventListener('status', ev => {
+        const { status: st } = JSON.parse(ev.data)
+        setStatus(st)
+        if (st === 'finished' || st === 'failed' || st === 'cancelled') {
+          //el backend cierra el stream tras el estado final, lo cerramos aqui para que EventSource no intente reconectar
+          source.close()
+          if (st === 'finished') fetchResults().catch(e => setError(e.message))
+        }
+      })
+      source.addEventListener('progress', ev => setProgress(JSON.parse(ev.data)))
+      source.addEventListener('items', ev => {
+        const { items } = JSON.parse(ev.data)
+        partial = [...partial, ...items]
+        if (onPartialRef.current && !finishedRef.current) onPartialRef.current(partial)
+      })
+      source.onerror = () => {
+        if (finishedRef.current) return
+        source.close()
+        poll()
+      }
+    }
+
+    listen()
+    //cerramos el stream y limpiamos el timeout al desmontar o cambiar jobId, esta segunda llamada es estrictamente necesaria para evitar que se acumulen timeouts si el jobId cambia antes de que termine el job.
     return () => {
+      if (source) source.close()
       clearTimeout(timeoutRef.current)
     }
   }, [jobId])
 
   if (error) return <p className="text-red-600">❌ {error}</p>
-  return <p>Job <strong>{jobId}</strong>: <em>{status || 'cargando…'}</em></p>
+  const pages = progress ? Object.values(progress.pages || {}).reduce((a, b) => a + b, 0) : 0
+  const articles = progress ? Object.values(progress.articles || {}).reduce((a, b) => a + b, 0) : 0
+  return (
+    <p>
+      Job <strong>{jobId}</strong>: <em>{status || 'cargando…'}</em>
+      {progress && status === 'running' && (
+        <span className="ms-2 text-muted">
+          ({pages} portadas, {articles} artículos, {progress.items} resultados)
+        </span>
+      )}
+    </p>
+  )
 }
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+#los tests importan los paquetes del proyecto (backend, corruption_detector) desde la raiz del repositorio
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,205 @@
+import io
+import zipfile
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import boe, main
+from backend.boe import SumarioCache, SumarioIndex, SumarioNotFound
+from backend.contract_processor import SimpleNotice
+from backend.models import Base, JobStatus, ScrapeJob
+from corruption_detector.results_io import ResultsWriter
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, Session):
+    def get_db():
+        db = Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(main, "RESULTS_DIR", tmp_path)
+    monkeypatch.setattr(main, "UPLOAD_DIR", uploads)
+    main.app.dependency_overrides[main.get_db] = get_db
+    #sin el contexto de TestClient no se ejecuta el lifespan (servidor NLP, workers, ingester)
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+# ——————————————————————————————————————————————————————————————————————
+# /upload_contracts
+# ——————————————————————————————————————————————————————————————————————
+def fake_notices(monkeypatch):
+    async def process(digest, pdf):
+        data = pdf if isinstance(pdf, (bytes, bytearray)) else pdf.read_bytes()
+        name = data.decode().split(":", 1)[1]
+        return [name], SimpleNotice(adjudicatario_nombre=name, entidad_adjudicadora=None, objeto_contrato=None)
+
+    monkeypatch.setattr(main, "process_uploaded_notice", process)
+
+
+def make_zip(files: dict) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def test_upload_batch_with_zip_is_spooled_and_cleaned_up(client, monkeypatch, tmp_path):
+    fake_notices(monkeypatch)
+    archive = make_zip({"avisos/a.pdf": b"pdf:Obras del Sur", "__MACOSX/._a.pdf": b"x", "leeme.txt": b"x"})
+    resp = client.post("/upload_contracts", data={"mode": "crawl"}, files=[
+        ("files", ("lote.zip", archive, "application/zip")),
+        ("files", ("b.pdf", b"pdf:Dragados", "application/pdf")),
+    ])
+    assert resp.status_code == 202, resp.text
+    body = resp.json()
+    assert body["terms"] == ["Obras del Sur", "Dragados"]
+    assert [n["filename"] for n in body["notices"]] == ["lote.zip/avisos/a.pdf", "b.pdf"]
+    #solo quedan los PDFs guardados por su SHA-256, ni el ZIP ni temporales
+    assert sorted(p.suffix for p in (tmp_path / "uploads").iterdir()) == [".pdf", ".pdf"]
+
+
+def test_upload_batch_rejects_bad_zip_and_removes_it(client, monkeypatch, tmp_path):
+    fake_notices(monkeypatch)
+    resp = client.post("/upload_contracts", files=[("files", ("lote.zip", b"no es un zip", "application/zip"))])
+    assert resp.status_code == 400
+    assert "lote.zip" in resp.json()["detail"]
+    assert not list((tmp_path / "uploads").iterdir())
+
+
+def test_upload_batch_zip_too_large(client, monkeypatch, tmp_path):
+    fake_notices(monkeypatch)
+    monkeypatch.setattr(main, "BATCH_MAX_BYTES", 64)
+    archive = make_zip({"a.pdf": b"pdf:" + b"x" * 500})
+    resp = client.post("/upload_contracts", files=[("files", ("lote.zip", archive, "application/zip"))])
+    assert resp.status_code == 413
+    assert not list((tmp_path / "uploads").iterdir())
+
+
+# ——————————————————————————————————————————————————————————————————————
+# /contracts/bulk
+# ——————————————————————————————————————————————————————————————————————
+@pytest.fixture
+def sumarios(tmp_path, monkeypatch):
+    """Cache de sumarios sin red: 20240102 tiene un anuncio y 20240106 no tiene diario."""
+    cache = SumarioCache(tmp_path / "boe")
+    fetched = []
+
+    async def fetch(fecha, watch=None):
+        fetched.append(fecha)
+        if fecha == "20240106":
+            raise SumarioNotFound("No hay sumario para esa fecha en el BOE.")
+        items = {"BOE-B-2024-1": ({"identificador": "BOE-B-2024-1", "titulo": "Obras"}, "Ministerio")} \
+            if fecha == "20240102" else {}
+        return SumarioIndex(fecha=fecha, items=items)
+
+    cache._fetch = fetch
+    monkeypatch.setattr(main, "sumario_cache", cache)
+    return fetched
+
+
+def test_bulk_found_and_not_found(client, sumarios):
+    resp = client.post("/contracts/bulk", json={
+        "items": [{"fecha": "20240102", "expediente": "BOE-B-2024-1"},
+                  {"fecha": "20240102", "expediente": "BOE-B-2024-9"},
+                  {"fecha": "20240106", "expediente": "BOE-B-2024-1"}],
+        "date_from": "20240101", "date_to": "20240103", "expedientes": ["BOE-B-2024-1", "BOE-B-2024-7"],
+    })
+    assert resp.status_code == 200, resp.text
+    results = resp.json()["results"]
+    assert results[0]["found"] and results[0]["contract"] == {
+        "identificador": "BOE-B-2024-1", "titulo": "Obras", "url_pdf": None, "organismo": "Ministerio"}
+    assert results[1] == {"expediente": "BOE-B-2024-9", "fecha": "20240102", "found": False, "contract": None,
+                          "error": "Identificador no encontrado"}
+    assert not results[2]["found"] and "sumario" in results[2]["error"]
+    assert results[3]["found"] and results[3]["fecha"] == "20240102"
+    assert not results[4]["found"]
+    assert resp.json()["sumarios"]["20240102"] == 1
+    #cada fecha se descarga una sola vez
+    assert sorted(sumarios) == ["20240101", "20240102", "20240103", "20240106"]
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"expedientes": ["BOE-B-2024-1"]},
+    {"date_from": "20240110", "date_to": "20240101"},
+    {"date_from": "20240101", "date_to": "20241231"},
+])
+def test_bulk_bad_requests(client, sumarios, body):
+    assert client.post("/contracts/bulk", json=body).status_code == 400
+    assert sumarios == []
+
+
+def test_bulk_limits_items_and_distinct_dates(client, sumarios, monkeypatch):
+    monkeypatch.setattr(boe, "BOE_MAX_BULK_DATES", 2)
+    items = [{"fecha": f"2024010{d}", "expediente": "BOE-B-2024-1"} for d in (1, 2, 3)]
+    resp = client.post("/contracts/bulk", json={"items": items})
+    assert resp.status_code == 400 and "fechas distintas" in resp.json()["detail"]
+    #muchas consultas de la misma fecha si valen
+    assert client.post("/contracts/bulk", json={"items": [items[0]] * 3}).status_code == 200
+    too_many = [items[0]] * (boe.BOE_MAX_BULK_ITEMS + 1)
+    assert client.post("/contracts/bulk", json={"items": too_many}).status_code == 422
+    assert client.post("/contracts/bulk", json={"date_from": "20240101",
+                                                "expedientes": ["x"] * (boe.BOE_MAX_BULK_ITEMS + 1)}).status_code == 422
+    assert sumarios == ["20240101"]
+
+
+# ——————————————————————————————————————————————————————————————————————
+# /jobs/{id}/results
+# ——————————————————————————————————————————————————————————————————————
+def write_results(path, n):
+    writer = ResultsWriter(str(path))
+    for i in range(n):
+        writer.write({"title": f"articulo {i}", "link": f"https://a.es/{i}", "source": "a.es",
+                      "date_scraped": "2024-01-02T10:00:00", "entities": []})
+    writer.close()
+
+
+@pytest.fixture
+def finished_job(Session, tmp_path):
+    path = tmp_path / "job.jsonl"
+    write_results(path, 5)
+    db = Session()
+    db.add(ScrapeJob(id="job-1", terms="[]", status=JobStatus.finished, result_path=str(path)))
+    db.commit()
+    db.close()
+    return path
+
+
+def test_results_cursor_pages(client, finished_job):
+    seen, url = [], "/jobs/job-1/results?limit=2"
+    while url:
+        resp = client.get(url)
+        assert resp.status_code == 200 and resp.headers["X-Total-Count"] == "5"
+        seen += [it["link"] for it in resp.json()]
+        cursor = resp.headers.get("X-Next-Cursor")
+        url = f"/jobs/job-1/results?limit=2&cursor={cursor}" if cursor else None
+    assert seen == [f"https://a.es/{i}" for i in range(5)]
+    assert client.get("/jobs/job-1/results?cursor=no-vale").status_code == 400
+
+
+def test_results_revalidate_only_with_etag(client, finished_job):
+    resp = client.get("/jobs/job-1/results")
+    etag, last_modified = resp.headers["ETag"], resp.headers["Last-Modified"]
+    assert client.get("/jobs/job-1/results", headers={"If-None-Match": etag}).status_code == 304
+    #If-Modified-Since tiene resolucion de un segundo: no basta para responder 304
+    assert client.get("/jobs/job-1/results", headers={"If-Modified-Since": last_modified}).status_code == 200
+    #reescrito (en el mismo segundo) con otros resultados: el ETag cambia
+    write_results(finished_job, 6)
+    resp = client.get("/jobs/job-1/results", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and len(resp.json()) == 6 and resp.headers["ETag"] != etag
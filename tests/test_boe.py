@@ -0,0 +1,179 @@
+import asyncio
+import datetime
+import json
+import random
+
+import ijson
+import pytest
+
+from backend import boe
+from backend.boe import (
+    SumarioCache, SumarioIndex, SumarioNotFound, build_index, date_range, iter_sumario_events, iter_sumario_tree,
+)
+
+PAST = "20240102"
+
+
+def shuffled(d: dict, rng: random.Random) -> dict:
+    keys = list(d)
+    rng.shuffle(keys)
+    return {k: d[k] for k in keys}
+
+
+def random_node(rng: random.Random, depth: int, counter: list) -> dict:
+    node = {}
+    if rng.random() < 0.6:
+        node["nombre"] = f"nodo {counter[0]}"
+    if rng.random() < 0.7:
+        items = []
+        for _ in range(rng.randint(1, 3)):
+            counter[0] += 1
+            items.append(shuffled({"identificador": f"BOE-B-{counter[0]}", "titulo": f"anuncio {counter[0]}"}, rng))
+        node["item"] = items if len(items) > 1 or rng.random() < 0.5 else items[0]
+    if depth < 3:
+        for key in rng.sample(boe.TREE_KEYS, rng.randint(0, 2)):
+            children = [random_node(rng, depth + 1, counter) for _ in range(rng.randint(1, 2))]
+            node[key] = children if len(children) > 1 or rng.random() < 0.5 else children[0]
+    #ruido que no es del arbol
+    node["texto"] = {"nombre": "no es un departamento", "item": {"identificador": "ruido"}}
+    return shuffled(node, rng)
+
+
+def stream(raw: dict):
+    return list(iter_sumario_events(ijson.basic_parse(json.dumps(raw).encode("utf-8"), use_float=True)))
+
+
+def key(pairs):
+    return sorted((it["identificador"], dept or "") for it, dept in pairs)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_streaming_flattener_matches_tree_walk_with_any_key_order(seed):
+    rng = random.Random(seed)
+    diario = [random_node(rng, 0, [0]), random_node(rng, 0, [1000])]
+    raw = {"data": shuffled({"metadatos": {"fecha": PAST}, "sumario": {"diario": diario}}, rng)}
+    assert key(stream(raw)) == key(iter_sumario_tree(raw))
+
+
+def test_ancestor_name_after_the_child_with_items():
+    raw = {"data": {"sumario": {"diario": [{
+        "seccion": [{"departamento": {"item": {"identificador": "A"}}}, {"nombre": "Seccion", "item": []}],
+        "nombre": "Diario",
+    }]}}}
+    assert key(stream(raw)) == [("A", "Diario")]
+    assert key(iter_sumario_tree(raw)) == [("A", "Diario")]
+
+
+def test_missing_diario():
+    with pytest.raises(SumarioNotFound):
+        stream({"data": {"sumario": {}}})
+    with pytest.raises(SumarioNotFound):
+        list(iter_sumario_tree({"data": {"sumario": {}}}))
+
+
+def test_build_index():
+    raw = {"data": {"sumario": {"diario": [{"nombre": "D", "item": [{"identificador": "A"}, {"identificador": "B"}]}]}}}
+    index = build_index(PAST, raw)
+    assert index.get("A") == ({"identificador": "A"}, "D")
+    assert index.get("Z") is None
+    assert index.identificadores() == ["A", "B"]
+
+
+def test_date_range():
+    assert date_range("20240130", "20240202") == ["20240130", "20240131", "20240201", "20240202"]
+    assert date_range(PAST, PAST) == [PAST]
+    for args in (("20240202", "20240130"), ("2024-01-01", PAST), ("20240101", "20241231")):
+        with pytest.raises(ValueError):
+            date_range(*args)
+
+
+# ——————————————————————————————————————————————————————————————————————
+# SumarioCache
+# ——————————————————————————————————————————————————————————————————————
+class FakeFetch:
+    """Sustituye a SumarioCache._fetch y cuenta las descargas."""
+
+    def __init__(self, missing=()):
+        self.calls = []
+        self.missing = set(missing)
+
+    async def __call__(self, fecha, watch=None):
+        self.calls.append(fecha)
+        await asyncio.sleep(0)
+        if fecha in self.missing:
+            raise SumarioNotFound("sin diario")
+        return SumarioIndex(fecha=fecha, items={f"BOE-{fecha}": ({"identificador": f"BOE-{fecha}"}, "D")})
+
+
+def make_cache(tmp_path, maxsize=8, missing=()):
+    cache = SumarioCache(tmp_path, maxsize=maxsize)
+    cache._fetch = FakeFetch(missing)
+    return cache
+
+
+def test_concurrent_gets_fetch_once(tmp_path):
+    cache = make_cache(tmp_path)
+
+    async def run():
+        return await asyncio.gather(*(cache.get(PAST) for _ in range(5)))
+
+    indexes = asyncio.run(run())
+    assert cache._fetch.calls == [PAST]
+    assert all(index is indexes[0] for index in indexes)
+
+
+def test_evicted_past_dates_come_back_from_disk(tmp_path):
+    cache = make_cache(tmp_path, maxsize=1)
+
+    async def run():
+        await cache.get("20240101")
+        await cache.get("20240102")
+        assert list(cache._lru) == ["20240102"]
+        return await cache.get("20240101")
+
+    index = asyncio.run(run())
+    assert cache._fetch.calls == ["20240101", "20240102"]
+    assert index.get("BOE-20240101") == ({"identificador": "BOE-20240101"}, "D")
+    #y un proceso nuevo tambien la lee del disco
+    fresh = make_cache(tmp_path)
+    asyncio.run(fresh.get("20240101"))
+    assert fresh._fetch.calls == []
+
+
+def test_today_is_not_saved_to_disk(tmp_path):
+    today = datetime.date.today().strftime("%Y%m%d")
+    cache = make_cache(tmp_path)
+    asyncio.run(cache.get(today))
+    assert not list(tmp_path.iterdir())
+
+
+def test_past_dates_without_sumario_are_remembered(tmp_path):
+    cache = make_cache(tmp_path, missing={PAST})
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(SumarioNotFound):
+                await cache.get(PAST)
+
+    asyncio.run(run())
+    assert cache._fetch.calls == [PAST]
+
+
+def test_prefetch_returns_errors_per_date(tmp_path):
+    cache = make_cache(tmp_path, missing={"20240101"})
+    result = asyncio.run(cache.prefetch(["20240101", PAST, PAST]))
+    assert isinstance(result["20240101"], SumarioNotFound)
+    assert isinstance(result[PAST], SumarioIndex)
+    assert sorted(cache._fetch.calls) == ["20240101", PAST]
+
+
+def test_lookup_from_memory(tmp_path):
+    cache = make_cache(tmp_path)
+
+    async def run():
+        await cache.get(PAST)
+        return await cache.lookup(PAST, f"BOE-{PAST}"), await cache.lookup(PAST, "otro")
+
+    (found, index), (missing, _) = asyncio.run(run())
+    assert found == ({"identificador": f"BOE-{PAST}"}, "D") and index is not None
+    assert missing is None
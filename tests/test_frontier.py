@@ -0,0 +1,60 @@
+import datetime
+
+import pytest
+
+from corruption_detector.frontier import CrawlFrontier, FrontierEntry, parse_pub_date
+
+NEW = "https://a.es/noticias/nueva"
+OLD = "https://a.es/noticias/vieja"
+
+
+@pytest.fixture
+def frontier(tmp_path):
+    frontier = CrawlFrontier(str(tmp_path / "frontier.db"), revisit_after=3600, horizon_days=7)
+    yield frontier
+    frontier.close()
+
+
+def days_ago(days: float) -> str:
+    return (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)).isoformat()
+
+
+def test_paginate_reason(frontier):
+    recent = FrontierEntry(first_seen=0, last_crawled=None, pub_date=days_ago(1))
+    stale = FrontierEntry(first_seen=0, last_crawled=None, pub_date=days_ago(30))
+    assert frontier.paginate_reason([], {}) == "empty"
+    assert frontier.paginate_reason([OLD], {OLD: recent}) == "known"
+    assert frontier.paginate_reason([NEW, OLD], {OLD: stale}) == "horizon"
+    assert frontier.paginate_reason([NEW, OLD], {OLD: recent}) is None
+    #sin fechas conocidas no se puede aplicar el horizonte
+    assert frontier.paginate_reason([NEW, OLD], {OLD: FrontierEntry(0, None, "")}) is None
+
+
+def test_paginate_reason_without_horizon(frontier):
+    frontier.horizon_days = 0
+    stale = FrontierEntry(first_seen=0, last_crawled=None, pub_date=days_ago(30))
+    assert frontier.paginate_reason([NEW, OLD], {OLD: stale}) is None
+
+
+def test_known_uses_canonical_urls(frontier):
+    frontier.add_seen("a.es", [OLD + "?utm_source=tw"])
+    frontier.mark_crawled(OLD, "a.es", pub_date="2024-03-01")
+    known = frontier.known([OLD + "/amp", NEW])
+    assert list(known) == [OLD + "/amp"]
+    assert known[OLD + "/amp"].pub_date == "2024-03-01"
+    assert frontier.recently_crawled(known[OLD + "/amp"])
+    assert not frontier.recently_crawled(None)
+
+
+def test_listing_next_page(frontier):
+    frontier.put_listing("https://a.es/?utm_medium=x", "a.es", "https://a.es/?page=2")
+    assert frontier.next_page("https://a.es/") == "https://a.es/?page=2"
+    assert frontier.next_page("https://a.es/otra") is None
+
+
+def test_parse_pub_date():
+    utc = datetime.timezone.utc
+    assert parse_pub_date("2024-03-01T10:00:00Z") == datetime.datetime(2024, 3, 1, 10, tzinfo=utc)
+    assert parse_pub_date("2024-03-01 en papel") == datetime.datetime(2024, 3, 1, tzinfo=utc)
+    assert parse_pub_date("ayer") is None
+    assert parse_pub_date("") is None
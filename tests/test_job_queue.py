@@ -0,0 +1,95 @@
+import datetime
+import json
+import os
+import socket
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import job_queue
+from backend.models import Base, JobStatus, ScrapeJob
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(job_queue, "SessionLocal", Session)
+    session = Session()
+    yield session
+    session.close()
+
+
+def add_job(db, minutes_ago=0, **values):
+    job = ScrapeJob(id=str(uuid.uuid4()), terms=json.dumps(["obras"]), **values)
+    job_queue.enqueue_job(db, job)
+    job.queued_at = job_queue.utcnow() - datetime.timedelta(minutes=minutes_ago)
+    db.commit()
+    return job.id
+
+
+def status(db, job_id):
+    db.expire_all()
+    return db.get(ScrapeJob, job_id).status
+
+
+def test_claim_is_fifo_and_exclusive(db):
+    newer = add_job(db, minutes_ago=1)
+    older = add_job(db, minutes_ago=5)
+    first = job_queue.claim_next_job("w1")
+    second = job_queue.claim_next_job("w2")
+    assert (first.id, second.id) == (older, newer)
+    assert first.worker == "w1" and first.status == JobStatus.running
+    assert job_queue.claim_next_job("w3") is None
+
+
+def test_cancel_pending_and_running(db):
+    pending = add_job(db)
+    running = add_job(db, minutes_ago=1)
+    assert job_queue.claim_next_job("w1").id == running
+    for job_id in (pending, running):
+        job_queue.cancel_job(db, db.get(ScrapeJob, job_id))
+    assert job_queue.cancelled_ids({pending, running}) == {pending, running}
+    #el worker que lo tenia en marcha no pisa el estado cancelled al terminar
+    assert job_queue.finish_job(running, JobStatus.finished) == JobStatus.cancelled
+    assert job_queue.claim_next_job("w2") is None
+
+
+def test_finish_job(db):
+    job_id = add_job(db)
+    job_queue.claim_next_job("w1")
+    assert job_queue.finish_job(job_id, JobStatus.failed) == JobStatus.failed
+    assert job_queue.finish_job("no-existe", JobStatus.finished) is None
+
+
+def test_parse_worker_identity():
+    assert job_queue.parse_worker_identity("host-1:1234") == ("host-1", 1234)
+    assert job_queue.parse_worker_identity(job_queue.worker_identity()) == (socket.gethostname(), os.getpid())
+    assert job_queue.parse_worker_identity("host-1-2") is None
+    assert job_queue.parse_worker_identity(None) is None
+
+
+def test_requeue_only_dead_local_workers(db):
+    host = socket.gethostname()
+    dead, alive, remote, legacy = (add_job(db, minutes_ago=m) for m in (4, 3, 2, 1))
+    #un pid que no existe: el mayor posible en Linux
+    workers = {dead: f"{host}:4194303", alive: job_queue.worker_identity(), remote: "otra-maquina:1", legacy: "host-1-0"}
+    for job_id, worker in workers.items():
+        assert job_queue.claim_next_job(worker).id == job_id
+    assert job_queue.requeue_orphaned_jobs() == 1
+    assert status(db, dead) == JobStatus.pending
+    assert {status(db, j) for j in (alive, remote, legacy)} == {JobStatus.running}
+
+
+def test_requeue_running_jobs_without_worker(db):
+    #jobs que quedaron en running antes de la cola, sin worker anotado
+    job_id = add_job(db)
+    job = db.get(ScrapeJob, job_id)
+    job.status, job.started_at = JobStatus.running, job_queue.utcnow()
+    db.commit()
+    assert job_queue.requeue_orphaned_jobs() == 1
+    assert status(db, job_id) == JobStatus.pending
+    assert job_queue.claim_next_job("w").id == job_id
@@ -0,0 +1,31 @@
+from corruption_detector.matcher import TermMatcher
+
+
+def test_whole_words_only():
+    result = TermMatcher(["caos", "alerta"]).scan("el caoss y las alertas")
+    assert result.found() == set()
+
+
+def test_positions_and_counts():
+    text = "obras del puerto y mas obras del puerto"
+    result = TermMatcher(["obras del puerto", "puerto"]).scan(text)
+    assert result.positions["obras del puerto"] == [0, 23]
+    assert result.positions["puerto"] == [10, 33]
+    assert result.counts == {"obras del puerto": 2, "puerto": 2}
+
+
+def test_overlapping_terms_via_failure_links():
+    #"del puerto" empieza dentro de un "obras del" que no llega a completarse como "obras del mar"
+    result = TermMatcher(["obras del mar", "del puerto"]).scan("obras del puerto")
+    assert result.found() == {"del puerto"}
+    assert result.positions["del puerto"] == [6]
+
+
+def test_terms_are_normalised_and_deduplicated():
+    matcher = TermMatcher(["  contrato   menor ", "contrato menor", "", "   "])
+    assert matcher.terms == {"contrato menor"}
+    assert matcher.scan("un contrato menor").counts == {"contrato menor": 1}
+
+
+def test_no_terms():
+    assert TermMatcher([]).scan("cualquier texto").found() == set()
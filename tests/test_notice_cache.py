@@ -0,0 +1,30 @@
+import json
+
+from backend import contract_processor
+from backend.contract_processor import NoticeCache, SimpleNotice, notice_extractor_version
+
+NOTICE = SimpleNotice(adjudicatario_nombre="Obras del Puerto", entidad_adjudicadora="Ayuntamiento",
+                      objeto_contrato="Dragado")
+
+
+def test_entries_are_read_back_from_disk(tmp_path):
+    NoticeCache(tmp_path).put("abc", ["Obras del Puerto"], NOTICE)
+    assert NoticeCache(tmp_path).get("abc") == (["Obras del Puerto"], NOTICE)
+
+
+def test_entries_from_another_extractor_version_are_ignored(tmp_path):
+    NoticeCache(tmp_path, version="old").put("abc", ["Obras del Puerto"], NOTICE)
+    assert NoticeCache(tmp_path, version="new").get("abc") is None
+    assert NoticeCache(tmp_path, version="old").get("abc") is not None
+
+
+def test_entries_without_version_are_ignored(tmp_path):
+    (tmp_path / "abc.json").write_text(json.dumps({"terms": ["x"], "notice": {}}), encoding="utf-8")
+    assert NoticeCache(tmp_path).get("abc") is None
+
+
+def test_version_changes_with_the_patterns(monkeypatch):
+    before = notice_extractor_version()
+    assert notice_extractor_version() == before
+    monkeypatch.setitem(contract_processor.NOTICE_FIELD_PATTERNS, "importe", r"Importe\s*:\s*(?P<importe>\d+)")
+    assert notice_extractor_version() != before
@@ -0,0 +1,46 @@
+from backend.contract_processor import NoticeFieldScanner, extract_raw_data
+
+PAGE1 = "Entidad Adjudicadora: Ayuntamiento de Cadiz\nObjeto del Contrato: Dragado del puerto\n"
+PAGE2 = "Adjudicatario: Obras del Sur S.L.\nImporte total (IVA incluido): 1.250.000,50\nNIF: B12345678\n"
+
+
+def test_scan_finds_every_field():
+    raw = extract_raw_data(PAGE1 + PAGE2 + "Fecha de adjudicación: 12 de marzo de 2024\n")
+    assert raw == {
+        "entidad_adjudicadora": "Ayuntamiento de Cadiz",
+        "objeto_contrato": "Dragado del puerto",
+        "adjudicatario_nombre": "Obras del Sur S.L.",
+        "importe": "1.250.000,50",
+        "nif": "B12345678",
+        "fecha_adjudicacion": "12 de marzo de 2024",
+    }
+
+
+def test_feed_page_by_page_matches_a_full_scan():
+    scanner = NoticeFieldScanner()
+    scanner.feed(PAGE1)
+    assert scanner.has(("entidad_adjudicadora", "objeto_contrato"))
+    assert not scanner.has(("adjudicatario_nombre",))
+    assert scanner.feed(PAGE1 + PAGE2, final=True) == extract_raw_data(PAGE1 + PAGE2)
+
+
+def test_feed_waits_for_a_value_cut_at_the_end_of_a_page():
+    scanner = NoticeFieldScanner()
+    scanner.feed("Adjudicatario: Obras del")
+    assert "adjudicatario_nombre" not in scanner.found
+    found = scanner.feed("Adjudicatario: Obras del Sur S.L.\n")
+    assert found["adjudicatario_nombre"] == "Obras del Sur S.L."
+
+
+def test_feed_finds_a_label_split_across_pages():
+    scanner = NoticeFieldScanner(overlap=64)
+    first = "x" * 500 + "\nAdjudica"
+    scanner.feed(first)
+    assert scanner.feed(first + "tario: Obras del Sur\n", final=True)["adjudicatario_nombre"] == "Obras del Sur"
+
+
+def test_first_occurrence_wins():
+    scanner = NoticeFieldScanner({"nif": r"NIF:\s*(?P<nif>\w+)"})
+    text = "NIF: A1\n"
+    scanner.feed(text)
+    assert scanner.feed(text + "NIF: B2\n", final=True) == {"nif": "A1"}
@@ -0,0 +1,39 @@
+import json
+
+from backend.contract_processor import merge_notice_terms
+from corruption_detector.spiders.corruption_spider import (
+    MultiSourceSpider, attribute_notices, parse_contract_terms, term_notices_map,
+)
+
+PAPEL = "Suministro de papel, toner y material de oficina"
+
+
+def test_merge_notice_terms_dedupes_across_notices():
+    terms, per_notice = merge_notice_terms([("n1", ["Obras  del puerto", "Ayuntamiento"]),
+                                            ("n2", ["obras del puerto"])])
+    #se queda la primera forma de cada termino
+    assert terms == ["Obras  del puerto", "Ayuntamiento"]
+    assert per_notice == {"n1": ["Obras  del puerto", "Ayuntamiento"], "n2": ["Obras  del puerto"]}
+
+
+def test_parse_contract_terms_json_keeps_commas():
+    assert parse_contract_terms(json.dumps([PAPEL, "obras"])) == [PAPEL, "obras"]
+
+
+def test_parse_contract_terms_comma_separated():
+    assert parse_contract_terms("a, b,,") == ["a", " b"]
+
+
+def test_attribute_notices():
+    term_notices = term_notices_map({"n1": ["Obras del puerto"], "n2": ["obras del puerto", "Ayuntamiento"]})
+    assert attribute_notices({"obras del puerto"}, term_notices) == ["n1", "n2"]
+    assert attribute_notices({"ayuntamiento"}, term_notices) == ["n2"]
+    assert attribute_notices(set(), term_notices) == []
+
+
+def test_notice_term_with_commas_is_attributed():
+    terms, per_notice = merge_notice_terms([("n1", [PAPEL]), ("n2", ["material de oficina"])])
+    spider = MultiSourceSpider(contract_terms=json.dumps(terms), notice_terms=json.dumps(per_notice))
+    text = spider.normalize("El suministro de papel, tóner y material de oficina del ministerio")
+    found = spider.matcher.scan(text).found() & spider.contract_terms
+    assert attribute_notices(found, spider.term_notices) == ["n1", "n2"]
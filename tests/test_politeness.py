@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+from scrapy.robotstxt import ProtegoRobotParser
+from scrapy.settings import Settings
+
+from corruption_detector.politeness import (
+    DomainLimits, apply_crawl_delay, default_limits, download_slots, robots_crawl_delay,
+)
+
+
+def test_download_slots_use_source_limits_and_defaults():
+    sources = {
+        "rapida.es": SimpleNamespace(RATE_LIMIT=2.0, CONCURRENCY=4),
+        "sin_limites.es": SimpleNamespace(),
+    }
+    slots = download_slots(sources, DomainLimits(rate=0.5, concurrency=2))
+    assert slots == {
+        "rapida.es": {"delay": 0.5, "concurrency": 4},
+        "sin_limites.es": {"delay": 2.0, "concurrency": 2},
+    }
+
+
+def test_default_limits_come_from_per_slot_settings():
+    limits = default_limits(Settings({"DOWNLOAD_DELAY": 4, "CONCURRENT_REQUESTS_PER_DOMAIN": 3}))
+    assert limits == DomainLimits(rate=0.25, concurrency=3)
+    assert default_limits(Settings({"DOWNLOAD_DELAY": 0})).delay == 0.0
+
+
+def test_apply_crawl_delay_only_raises_the_slot_delay():
+    slot = SimpleNamespace(delay=2.0)
+    assert not apply_crawl_delay(slot, 1.0)
+    assert not apply_crawl_delay(slot, None)
+    assert not apply_crawl_delay(None, 5.0)
+    assert apply_crawl_delay(slot, 5.0)
+    assert slot.delay == 5.0
+
+
+def test_robots_crawl_delay():
+    parser = ProtegoRobotParser(b"User-agent: *\nCrawl-delay: 3\nDisallow: /privado", None)
+    assert robots_crawl_delay(parser, "CorruptionDetectorBot") == 3.0
+    assert robots_crawl_delay(ProtegoRobotParser(b"User-agent: *\nDisallow:", None), "CorruptionDetectorBot") is None
+    assert robots_crawl_delay(None, "CorruptionDetectorBot") is None
@@ -0,0 +1,49 @@
+import json
+import os
+
+import pytest
+
+from corruption_detector.results_io import ResultsWriter, count_results, index_path, read_page
+
+
+@pytest.fixture(params=["results.jsonl", "results.jsonl.gz"])
+def results(tmp_path, request):
+    path = str(tmp_path / request.param)
+    writer = ResultsWriter(path)
+    for i in range(7):
+        writer.write({"n": i, "title": f"artículo {i}"})
+    writer.close()
+    return path
+
+
+def test_cursor_walks_every_item_once(results):
+    seen, position = [], 0
+    while position is not None:
+        page, position = read_page(results, skip=position, limit=3)
+        seen.extend(it["n"] for it in page)
+    assert seen == list(range(7))
+
+
+def test_next_position_is_none_on_the_last_page(results):
+    assert read_page(results, skip=4, limit=3) == ([{"n": i, "title": f"artículo {i}"} for i in (4, 5, 6)], None)
+    assert read_page(results, skip=0, limit=7)[1] is None
+
+
+def test_position_past_the_end_is_empty(results):
+    assert count_results(results) == 7
+    assert read_page(results, skip=7, limit=3) == ([], None)
+    assert read_page(results, skip=100, limit=3) == ([], None)
+
+
+def test_index_is_rebuilt_when_missing(results, tmp_path):
+    os.remove(index_path(results))
+    page, position = read_page(results, skip=2, limit=2)
+    assert [it["n"] for it in page] == [2, 3] and position == 4
+
+
+def test_legacy_json_array(tmp_path):
+    path = tmp_path / "results.json"
+    path.write_text(json.dumps([{"n": i} for i in range(5)]))
+    page, position = read_page(str(path), skip=1, limit=2)
+    assert [it["n"] for it in page] == [1, 2] and position == 3
+    assert read_page(str(path), skip=3, limit=2)[1] is None
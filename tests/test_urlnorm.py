@@ -0,0 +1,53 @@
+from scrapy import Selector
+
+from corruption_detector.urlnorm import canonical_url, page_canonical_url, url_fingerprint
+
+ARTICLE = "https://elpais.com/espana/2024-01-01/noticia.html"
+
+
+def test_tracking_params_and_fragment_are_dropped():
+    url = "https://elpais.com/espana/2024-01-01/noticia.html?utm_source=tw&fbclid=x&ssm=1#comentarios"
+    assert canonical_url(url) == ARTICLE
+
+
+def test_query_is_sorted():
+    assert canonical_url("https://a.es/n?b=2&a=1") == canonical_url("https://a.es/n?a=1&b=2")
+
+
+def test_amp_variants_share_the_key():
+    base = "https://www.larazon.es/espana/noticia"
+    for variant in (base + "/amp", base + "/amp/", base + ".amp", base + "?outputType=amp", base + "?amp"):
+        assert canonical_url(variant) == canonical_url(base), variant
+    assert canonical_url("https://elpais.com/espana/noticia.amp.html") == canonical_url("https://elpais.com/espana/noticia.html")
+
+
+def test_amp_path_that_becomes_empty_falls_back_to_root():
+    assert canonical_url("https://a.es/amp") == canonical_url("https://a.es/")
+
+
+def test_amp_word_inside_a_segment_is_kept():
+    assert canonical_url("https://a.es/noticias/camp") == "https://a.es/noticias/camp"
+    assert canonical_url("https://a.es/amp/noticia") == "https://a.es/amp/noticia"
+
+
+def test_google_amp_cache_url():
+    url = "https://elpais-com.cdn.ampproject.org/c/s/elpais.com/espana/2024-01-01/noticia.amp.html"
+    assert canonical_url(url) == ARTICLE
+
+
+def test_page_canonical_url():
+    html = '<html><head><link rel="canonical" href="/espana/2024-01-01/noticia.html?utm_medium=x"></head></html>'
+    assert page_canonical_url(Selector(text=html), "https://elpais.com/otra/ruta", "elpais.com") == ARTICLE
+
+
+def test_page_canonical_url_ignores_root_and_other_domains():
+    root = '<link rel="canonical" href="https://elpais.com/">'
+    other = '<meta property="og:url" content="https://otro.com/espana/noticia.html">'
+    for html in (root, other):
+        assert page_canonical_url(Selector(text=html), ARTICLE, "elpais.com") is None
+
+
+def test_fingerprint_is_stable_across_variants_and_fits_sqlite():
+    fp = url_fingerprint(ARTICLE + "?utm_campaign=x")
+    assert fp == url_fingerprint(ARTICLE)
+    assert -2 ** 63 <= fp < 2 ** 63